@@ -1,20 +1,186 @@
 # simulacion_trafico/concurrency/tasks.py
 
 import asyncio
+import logging
+import math
+import threading
+import time
 
-async def simulation_loop(simulator, interval):
+_LOG = logging.getLogger(__name__)
+
+
+class TickScheduler:
+    """
+    Marcapasos de ticks a ritmo fijo con plazos absolutos.
+
+    El tick `s` vence en `t0 + s * interval / warp`, de modo que el coste
+    de cada `update()` no se acumula como deriva.  Si al despertar hay
+    varios ticks vencidos se ejecutan de seguido (como mucho
+    `1 + max_catchup`); el resto se descartan y se cuentan en `skipped`.
+
+    Con `epoch` (segundos Unix) la rejilla de plazos se ancla al reloj de
+    pared: varias zonas con el mismo `epoch` e `interval` tickean a la
+    vez y, si alguna se atrasa, al recuperarse vuelve a la misma rejilla.
+
+    No ejecuta nada por sí mismo: `due()` dice cuántos ticks tocan ahora
+    y `delay()` cuánto esperar hasta el siguiente.  Los métodos de
+    control (pause, resume, step, set_warp) pueden llamarse desde otro
+    hilo (p. ej. la GUI).
+    """
+
+    def __init__(self, interval, warp=1.0, max_catchup=4, epoch=None, clock=None):
+        if interval <= 0 or warp <= 0:
+            raise ValueError("interval y warp deben ser positivos")
+        self.interval = interval
+        self.warp = warp
+        self.max_catchup = max_catchup
+        self.epoch = epoch
+        self._clock = clock or (time.time if epoch is not None else time.monotonic)
+        self._lock = threading.Lock()
+
+        self.ticks = 0          # ticks entregados
+        self.overruns = 0       # despertares con más de un tick vencido
+        self.skipped = 0        # ticks descartados por exceso de retraso
+        self.paused = False
+        self._steps = 0
+
+        now = self._clock()
+        if epoch is None:
+            # El primer tick vence ya, como el bucle original
+            self._t0, self._s0, self._slot = now, 0, -1
+        else:
+            self._t0, self._s0 = epoch, 0
+            self._slot = self._slot_en(now)
+
+    # -------------------------------------------------------
+    @property
+    def period(self):
+        """Segundos reales entre ticks (interval / warp)."""
+        return self.interval / self.warp
+
+    def _slot_en(self, now):
+        """Último tick de la rejilla cuyo plazo ya ha llegado."""
+        return self._s0 + math.floor((now - self._t0) / self.period)
+
+    def _plazo(self, slot):
+        return self._t0 + (slot - self._s0) * self.period
+
+    # -------------------------------------------------------
+    def due(self, now=None):
+        """
+        Número de ticks a ejecutar ahora (0 si aún no toca).  Los marca
+        como entregados.
+        """
+        with self._lock:
+            n, self._steps = self._steps, 0
+            if not self.paused:
+                now = self._clock() if now is None else now
+                actual = self._slot_en(now)
+                pendientes = actual - self._slot
+                if pendientes > 0:
+                    self._slot = actual
+                    if pendientes > 1:
+                        self.overruns += 1
+                    limite = 1 + self.max_catchup
+                    if pendientes > limite:
+                        self.skipped += pendientes - limite
+                        pendientes = limite
+                    n += pendientes
+            self.ticks += n
+            return n
+
+    def delay(self, now=None):
+        """Segundos hasta el próximo plazo (en pausa, `interval`)."""
+        with self._lock:
+            if self.paused:
+                return 0.0 if self._steps else self.interval
+            now = self._clock() if now is None else now
+            return max(0.0, self._plazo(self._slot + 1) - now)
+
+    def lag(self, now=None):
+        """Retraso (s) respecto al plazo del próximo tick pendiente."""
+        with self._lock:
+            if self.paused:
+                return 0.0
+            now = self._clock() if now is None else now
+            return max(0.0, now - self._plazo(self._slot + 1))
+
+    # -------------------------------------------------------
+    def pause(self):
+        with self._lock:
+            self.paused = True
+
+    def resume(self):
+        """Reanuda sin ráfaga: el tiempo en pausa no cuenta como retraso."""
+        with self._lock:
+            if not self.paused:
+                return
+            self.paused = False
+            now = self._clock()
+            if self.epoch is None:
+                self._t0, self._s0 = now, self._slot + 1
+            else:
+                self._slot = self._slot_en(now)
+
+    def step(self, n=1):
+        """Pide `n` ticks inmediatos (pensado para usarse en pausa)."""
+        with self._lock:
+            self._steps += n
+
+    def set_warp(self, warp):
+        """
+        Cambia el factor de aceleración (10 = diez veces más rápido que
+        el tiempo real).  Con `epoch` la rejilla se recalcula desde el
+        epoch, así que zonas que apliquen el mismo factor siguen a la par.
+        """
+        if warp <= 0:
+            raise ValueError("warp debe ser positivo")
+        with self._lock:
+            now = self._clock()
+            if self.epoch is None:
+                siguiente = self._slot + 1
+                t_sig = self._plazo(siguiente)
+                self.warp = warp
+                self._t0, self._s0 = t_sig, siguiente
+            else:
+                self.warp = warp
+                self._t0, self._s0 = self.epoch, 0
+                self._slot = self._slot_en(now)
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "warp": self.warp,
+            "paused": self.paused,
+        }
+
+
+async def simulation_loop(simulator, interval, on_tick=None, scheduler=None):
     """
     Bucle principal que actualiza periódicamente la simulación.
+    El ritmo lo marca un `TickScheduler` (plazos absolutos, recuperación
+    acotada); `on_tick(simulator)` se llama tras cada tick.
     """
+    reloj = scheduler or TickScheduler(interval)
+    saltados = reloj.skipped
     while True:
-        simulator.update()
+        for _ in range(reloj.due()):
+            simulator.update()
+            if on_tick is not None:
+                on_tick(simulator)
+        if reloj.skipped != saltados:
+            _LOG.warning("Simulación atrasada: %d ticks descartados (total %d)",
+                         reloj.skipped - saltados, reloj.skipped)
+            saltados = reloj.skipped
         # print("[Simulación] Estado actualizado.")  # Descomenta para debug
-        await asyncio.sleep(interval)
+        await asyncio.sleep(reloj.delay())
 
-def run_simulation_tasks(simulator, update_interval=1.0):
+def run_simulation_tasks(simulator, update_interval=1.0, on_tick=None, scheduler=None):
     """
     Devuelve una lista de corutinas (no tareas) para ejecutar la simulación.
     El hilo que arranque estas corutinas será responsable de convertirlas en tareas.
     """
     # Simplemente devolvemos la corutina; no tocamos create_task aquí
-    return [simulation_loop(simulator, update_interval)]
+    return [simulation_loop(simulator, update_interval, on_tick=on_tick, scheduler=scheduler)]
@@ -0,0 +1,115 @@
+# test_tick_scheduler_runner.py
+
+from concurrency.tasks import TickScheduler
+
+# Potencias de dos: los plazos son exactos en coma flotante
+INTERVALO = 0.125
+COSTE = 0.03125
+
+
+class _Reloj:
+    """Reloj manual para `TickScheduler(clock=...)`."""
+
+    def __init__(self, t=0.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _ejecutar(reloj, sched, hasta, coste=COSTE):
+    """
+    Bucle de `simulation_loop` con reloj simulado: cada tick cuesta
+    `coste` y se duerme exactamente `delay()`.  Devuelve los instantes en
+    que empezó cada tick.
+    """
+    inicios = []
+    while reloj.t < hasta:
+        for _ in range(sched.due()):
+            inicios.append(reloj.t)
+            reloj.t += coste
+        reloj.t += sched.delay()
+    return inicios
+
+
+# ─────────────────────────────────────────────────────
+def test_sin_deriva():
+    reloj = _Reloj()
+    sched = TickScheduler(INTERVALO, clock=reloj)
+    inicios = _ejecutar(reloj, sched, 10.0)
+    # Un sleep(intervalo) tras cada tick daría 10 / (0.125 + 0.03125) = 64
+    assert len(inicios) == 80 == sched.ticks
+    assert inicios == [s * INTERVALO for s in range(80)]
+    assert sched.overruns == sched.skipped == 0
+
+
+def test_recuperacion_acotada():
+    reloj = _Reloj()
+    sched = TickScheduler(INTERVALO, max_catchup=4, clock=reloj)
+    _ejecutar(reloj, sched, 1.0)                # ticks 0..7
+    reloj.t += 10 * INTERVALO                   # un tick que tarda diez periodos
+    assert sched.due() == 5                     # 1 + max_catchup
+    assert sched.overruns == 1 and sched.skipped == 6
+    # Sigue en la misma rejilla de plazos
+    assert reloj.t + sched.delay() == 19 * INTERVALO
+
+
+def test_warp():
+    reloj = _Reloj()
+    sched = TickScheduler(INTERVALO, clock=reloj)
+    _ejecutar(reloj, sched, 1.0)
+    assert sched.due() == 1                     # tick 8, a t = 1.0
+    reloj.t += INTERVALO / 2                    # a mitad de periodo
+    sched.set_warp(4)
+    assert sched.due() == 0                     # sin ráfaga al cambiar
+    assert sched.period == INTERVALO / 4
+    antes = sched.ticks
+    inicios = _ejecutar(reloj, sched, 3.0, coste=0.0)
+    # El tick 9 mantiene su plazo; desde ahí, cuatro veces más seguidos
+    assert inicios[0] == 9 * INTERVALO
+    assert inicios == [inicios[0] + k * INTERVALO / 4 for k in range(len(inicios))]
+    assert sched.ticks - antes == (3.0 - inicios[0]) / (INTERVALO / 4)
+
+
+def test_warp_con_epoch_mantiene_la_rejilla():
+    relojes = [_Reloj(1000.0), _Reloj(1000.0)]
+    zonas = [TickScheduler(INTERVALO, epoch=0.0, clock=r) for r in relojes]
+    _ejecutar(relojes[0], zonas[0], 1001.0)
+    relojes[0].t = 1001.25
+    zonas[0].set_warp(2)
+    _ejecutar(relojes[0], zonas[0], 1003.0)
+    # La otra zona cambia el warp más tarde y después de un atasco
+    _ejecutar(relojes[1], zonas[1], 1001.5)
+    relojes[1].t = 1002.3
+    zonas[1].set_warp(2)
+    zonas[1].due()
+    _ejecutar(relojes[1], zonas[1], 1003.0)
+    plazos = [r.t + z.delay() for r, z in zip(relojes, zonas)]
+    assert plazos[0] == plazos[1]
+    assert plazos[0] % (INTERVALO / 2) == 0
+
+
+def test_pausa_y_pasos():
+    reloj = _Reloj()
+    sched = TickScheduler(INTERVALO, clock=reloj)
+    _ejecutar(reloj, sched, 1.0)
+    sched.pause()
+    reloj.t += 5.0
+    assert sched.due() == 0 and sched.delay() == INTERVALO
+    sched.step(2)
+    assert sched.delay() == 0.0 and sched.due() == 2
+    sched.resume()
+    # La pausa no cuenta como retraso: un tick al reanudar, sin ráfaga
+    assert sched.due() == 1
+    assert sched.delay() == INTERVALO and sched.skipped == sched.overruns == 0
+
+
+def main():
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("test_"):
+            prueba()
+            print(f"[OK] {nombre}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# simulacion_trafico/concurrency/worker.py
+"""
+Ejecución de los ticks en un hilo dedicado, fuera del event loop.
+
+`Simulator.update` es trabajo de CPU síncrono; si comparte el loop con
+RabbitMQ y los heart-beats, un tick largo retrasa ACKs y latidos.  Con
+`SimulationWorker` los ticks corren en su propio hilo (al ritmo de un
+`TickScheduler`) y el loop solo se comunica con él por colas:
+
+  • entrada: `add_vehicles()` encola vehículos que el hilo incorpora a
+    la ciudad justo antes del siguiente tick;
+  • comandos: `call()` / `acall()` ejecutan una función sobre el
+    simulador entre dos ticks y devuelven su resultado en un Future
+    (snapshots, checkpoints, extracción de vehículos salientes…);
+  • salida: `extract_vehicles()` da de baja los vehículos que cumplen
+    un criterio y devuelve copias independientes del motor.
+
+Nada fuera del hilo debe tocar `city.vehicles` directamente; para
+contar vehículos basta `city.vehicle_count`.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from environment.Vehicle import Vehicle
+from simulation.routing import Route
+from concurrency.tasks import TickScheduler
+
+_LOG = logging.getLogger(__name__)
+
+
+def _copia(v):
+    c = Vehicle(v.id_, (v.x, v.y), v.speed, v.direction)
+    c.moving = v.moving
+    if v.route is not None:
+        c.route = Route(v.route.nodes, v.route.index)
+    return c
+
+
+class SimulationWorker:
+    """
+    Hilo propietario del simulador.  `on_tick(simulator)` se llama tras
+    cada tick, dentro del hilo.
+    """
+
+    def __init__(self, simulator, scheduler=None, interval=1.0, on_tick=None, name="sim-worker"):
+        self.simulator = simulator
+        self.reloj = scheduler or TickScheduler(interval)
+        self.on_tick = on_tick
+        self._entrada = queue.SimpleQueue()     # listas de vehículos
+        self._comandos = queue.SimpleQueue()    # (Future, fn, args)
+        self._despertar = threading.Event()
+        self._parar = threading.Event()
+        self._cerrojo = threading.Lock()        # `call` frente al cierre del hilo
+        self._cerrado = False                   # ya no se atienden comandos
+        self.error = None                       # excepción que terminó el hilo
+        self._hilo = threading.Thread(target=self._run, name=name, daemon=True)
+
+    # -------------------------------------------------------
+    #  API (cualquier hilo)
+    # -------------------------------------------------------
+    def start(self):
+        self._hilo.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Detiene el hilo tras el tick en curso y atiende los comandos pendientes."""
+        self._parar.set()
+        self._despertar.set()
+        if self._hilo.ident is None:            # nunca arrancado
+            self._cerrar()
+        elif self._hilo.is_alive():
+            self._hilo.join(timeout)
+
+    @property
+    def alive(self):
+        return self._hilo.is_alive()
+
+    def add_vehicles(self, vehicles):
+        """Encola vehículos entrantes (se dan de alta antes del siguiente tick)."""
+        self._entrada.put(list(vehicles))
+
+    def call(self, fn, *args):
+        """
+        Ejecuta `fn(simulator, *args)` en el hilo de simulación, entre dos
+        ticks.  Devuelve un `concurrent.futures.Future`; si el hilo ya ha
+        terminado, falla en el acto (con la excepción que lo terminó, si
+        fue un error).
+        """
+        fut = Future()
+        with self._cerrojo:
+            if not self._cerrado:
+                self._comandos.put((fut, fn, args))
+                self._despertar.set()
+                return fut
+        fut.set_exception(self._motivo())
+        return fut
+
+    async def acall(self, fn, *args):
+        """Versión awaitable de `call` para el event loop."""
+        return await asyncio.wrap_future(self.call(fn, *args))
+
+    def extract_vehicles(self, criterio, bbox=None):
+        """
+        Da de baja, en el hilo de simulación, los vehículos para los que
+        `criterio(v)` es cierto y devuelve (Future) copias sin vínculo
+        con el motor.  Con `bbox` (x0, y0, x1, y1) solo se evalúa el
+        criterio sobre los vehículos de ese rectángulo, consultando
+        `simulator.vehicle_index` en lugar de recorrer la ciudad.
+        """
+        return self.call(_extraer, criterio, bbox)
+
+    # -------------------------------------------------------
+    #  Hilo de simulación
+    # -------------------------------------------------------
+    def _atender(self):
+        city = self.simulator.city
+        while True:
+            try:
+                lote = self._entrada.get_nowait()
+            except queue.Empty:
+                break
+            city.add_vehicles(lote)
+
+        while True:
+            try:
+                fut, fn, args = self._comandos.get_nowait()
+            except queue.Empty:
+                break
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(fn(self.simulator, *args))
+            except BaseException as exc:
+                fut.set_exception(exc)
+
+    def _motivo(self):
+        return self.error if self.error is not None else RuntimeError("SimulationWorker detenido")
+
+    def _cerrar(self):
+        """Deja de aceptar comandos y hace fallar los que queden en cola."""
+        with self._cerrojo:
+            self._cerrado = True
+        self._parar.set()
+        while True:
+            try:
+                fut, _fn, _args = self._comandos.get_nowait()
+            except queue.Empty:
+                break
+            if fut.set_running_or_notify_cancel():
+                fut.set_exception(self._motivo())
+
+    def _run(self):
+        sim, reloj = self.simulator, self.reloj
+        try:
+            while not self._parar.is_set():
+                self._despertar.clear()
+                self._atender()
+                for _ in range(reloj.due()):
+                    sim.update()
+                    if self.on_tick is not None:
+                        self.on_tick(sim)
+                self._despertar.wait(reloj.delay())
+        except Exception as exc:
+            # Se registra aquí y llega a quien espere un comando; sin
+            # relanzarla, que threading.excepthook la volvería a imprimir
+            self.error = exc
+            _LOG.exception("Error en el hilo de simulación")
+        finally:
+            # Lo ya encolado se atiende (p. ej. el checkpoint al parar);
+            # lo que llegue después, o no pueda atenderse, falla
+            try:
+                self._atender()
+            finally:
+                self._cerrar()
+
+
+def _extraer(sim, criterio, bbox=None):
+    city = sim.city
+    vehs = city.vehicles if bbox is None else sim.vehicle_index.query_bbox(*bbox)
+    salir = [v for v in vehs if criterio(v)]
+    if not salir:
+        return []
+    copias = [_copia(v) for v in salir]
+    city.remove_vehicles([v.id_ for v in salir])
+    return copias
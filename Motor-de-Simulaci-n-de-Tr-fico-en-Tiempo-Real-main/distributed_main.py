@@ -6,64 +6,54 @@ import os
 from pathlib import Path
 from importlib import import_module
 
-from environment.City import City
-from environment.Vehicle import Vehicle
-from environment.TrafficLight import TrafficLight
-from environment.intersection import Intersection
-from simulation.simulator import Simulator
-from ui.gui import launch_gui
+from simulation.scenario import load_scenario, build_simulator
 from concurrency.tasks import run_simulation_tasks
 
-ZONES_FILE = Path(__file__).parent.parent / "zones.json"
+ZONES_FILE = Path(__file__).parent / "zones.json"
 
-async def start_zone(zone_cfg):
+def zone_scenario(zone_cfg):
     """
-    Arranca un nodo simulador para una zona:
-    - Construye City con semáforos e intersecciones
-    - Añade vehículos aleatorios dentro de sus límites
-    - Inicia Simulator + GUI o runner específico
+    Escenario de la zona.  La clave opcional "scenario" de zones.json es
+    un fichero JSON (relativo a zones.json) o el escenario en línea; sin
+    ella se genera una cuadrícula 2×2 con 5 vehículos.  Si el escenario
+    usa "generate", la cuadrícula se ajusta a los límites de la zona y
+    los ids llevan el nombre de la zona como prefijo.
     """
-    name   = zone_cfg["name"]
-    xmin   = zone_cfg["xmin"]
-    xmax   = zone_cfg["xmax"]
-    ymin   = zone_cfg["ymin"]
-    ymax   = zone_cfg["ymax"]
-    queue  = zone_cfg["queue"]
+    name = zone_cfg["name"]
+    bounds = [zone_cfg["xmin"], zone_cfg["ymin"], zone_cfg["xmax"], zone_cfg["ymax"]]
 
-    # 1) Crear ciudad zonal
-    city = City(name=f"Zona-{name}")
+    scenario = zone_cfg.get("scenario")
+    if scenario is None:
+        scenario = {
+            "generate": {
+                "grid": {"rows": 2, "cols": 2},
+                "timing": {"green_time": 3, "yellow_time": 1, "red_time": 3},
+                "vehicles": {"count": 5, "speed": 3.0},
+            }
+        }
+    elif isinstance(scenario, str):
+        scenario = load_scenario(ZONES_FILE.parent / scenario)
 
-    # 2) Definir semáforos e intersecciones dentro de los límites
-    #    (Ejemplo: grid 2×2 dentro de zona)
-    xs = [xmin + (xmax - xmin) * frac for frac in (0.25, 0.75)]
-    ys = [ymin + (ymax - ymin) * frac for frac in (0.25, 0.75)]
-    idx = 1
-    for y in ys:
-        for x in xs:
-            tl = TrafficLight(
-                id_=f"{name.upper()}-T{idx}",
-                x=int(x), y=int(y),
-                green_time=3, yellow_time=1, red_time=3
-            )
-            city.add_traffic_light(tl)
-            inter = Intersection(id_=f"{name.upper()}-I{idx}", location=(int(x), int(y)))
-            city.add_intersection(inter)
-            idx += 1
+    cfg = {**scenario, "name": scenario.get("name", f"Zona-{name}")}
+    gen = cfg.get("generate")
+    if gen:
+        gen = cfg["generate"] = {**gen, "prefix": gen.get("prefix", f"{name.upper()}-")}
+        if "grid" in gen and "origin" not in gen["grid"]:
+            gen["grid"] = {"bounds": bounds, **gen["grid"]}
+    return cfg
 
-    # 3) Poblamos vehículos aleatorios dentro de la zona
-    num_veh = 5
-    for i in range(num_veh):
-        x = random.uniform(xmin, xmax)
-        y = random.uniform(ymin, ymax)
-        direction = random.choice(["NORTE", "SUR", "ESTE", "OESTO"])
-        veh = Vehicle(id_=f"{name.upper()}-V{i+1}", position=(x, y), speed=3.0, direction=direction)
-        city.add_vehicle(veh)
-
-    # 4) Iniciar simulación concurrente
-    simulator = Simulator(city)
+async def start_zone(zone_cfg):
+    """
+    Arranca un nodo simulador para una zona:
+    - Construye City + Simulator a partir del escenario de la zona
+    - Inicia Simulator + GUI o runner específico
+    """
+    name = zone_cfg["name"]
+    simulator = build_simulator(zone_scenario(zone_cfg))
+    city = simulator.city
     tasks = run_simulation_tasks(simulator, update_interval=0.1)
 
-    print(f"[{name}] nodo iniciado: {num_veh} vehículos, semáforos {len(city.traffic_lights)}")
+    print(f"[{name}] nodo iniciado: {city.vehicle_count} vehículos, semáforos {len(city.traffic_lights)}")
     await asyncio.gather(*tasks)
 
 async def main():
@@ -81,5 +71,4 @@ async def main():
     await asyncio.gather(*zone_tasks)
 
 if __name__ == "__main__":
-    import random
     asyncio.run(main())
@@ -0,0 +1,272 @@
+# simulacion_trafico/distribution/codec.py
+"""
+Codificación de mensajes en el cable: JSON o binario compacto.
+
+• JSON (`application/json`): el formato de siempre; todo nodo lo entiende.
+• Binario (`application/x-trafico-bin`): solo para migraciones y estado
+  de zona, los mensajes de volumen.  Cabecera fija (UUID en 16 bytes,
+  timestamp como float) y un registro de layout fijo por vehículo
+  (x, y, velocidad, dirección); los ids van detrás, concatenados.
+
+El formato viaja en la propiedad `content_type` del mensaje AMQP, de modo
+que el receptor sabe cómo decodificar cada uno.  Un nodo solo envía
+binario a quien lo ha anunciado: cada ACK lleva los `formatos` que
+acepta su emisor y `Negociacion` recuerda el elegido por destino.  Un
+par que no anuncia nada (versiones anteriores) sigue recibiendo JSON.
+
+Decodificación: el JSON se valida de una pasada en el núcleo de
+Pydantic.  El binario no se vuelve a validar: sus campos salen de un
+layout fijo, comprobado al desempaquetar, y `decodificar_mensaje` monta
+directamente los modelos tipados; los lotes quedan en columnas
+(`VehiculosColumnas`), sin un objeto por vehículo hasta que el
+consumidor crea los `Vehicle`.  Por eso el binario es el preferido:
+menos bytes y menos CPU por vehículo que el JSON en los lotes
+(`python -m performance.bench_mensajes`).
+
+Registro de vehículo (little-endian):
+
+    x f64 | y f64 | velocidad f64 | dirección u8 | longitud del id u8
+"""
+
+from __future__ import annotations
+import json, struct, uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Tuple
+
+from .protocolo import TipoMensaje
+from .message_models import (
+    Mensaje, validar_json, construir, VehiculosColumnas,
+    MensajeVehiculoEntrante, MensajeVehiculosEntrantes, MensajeEstadoZona,
+    DatosVehiculosEntrantes, DatosEstadoZona,
+)
+
+CT_JSON    = "application/json"
+CT_BINARIO = "application/x-trafico-bin"
+
+# Formatos que acepta este nodo, por orden de preferencia (ver arriba)
+FORMATOS_SOPORTADOS = ("bin", "json")
+
+_MAGIA   = b"TB"
+_VERSION = 1
+
+_DIRECCIONES = ("NORTE", "SUR", "ESTE", "OESTE")
+_COD_DIRECCION = {d: i for i, d in enumerate(_DIRECCIONES)}
+_TRAFICO = ("BAJO", "MODERADO", "ALTO")
+_COD_TRAFICO = {t: i for i, t in enumerate(_TRAFICO)}
+
+# Tipos con representación binaria
+_TIPOS = (TipoMensaje.VEHICULO_ENTRANTE, TipoMensaje.VEHICULOS_ENTRANTES,
+          TipoMensaje.ESTADO_ZONA)
+_COD_TIPO = {t.value: i for i, t in enumerate(_TIPOS)}
+
+_CABECERA = struct.Struct("<2sBB16sd")      # magia, versión, tipo, uuid, timestamp
+_VEHICULO = struct.Struct("<dddBB")         # x, y, velocidad, dirección, len(id)
+_CUENTA   = struct.Struct("<I")
+_ESTADO   = struct.Struct("<IBd")           # vehículos, tráfico, timestamp
+
+
+class ErrorCodec(ValueError):
+    """Cuerpo binario mal formado o tipo sin representación binaria."""
+
+
+# ──────────────────────────────────────────────────────────
+#  API
+# ──────────────────────────────────────────────────────────
+def codificar(mensaje: Dict[str, Any], formato: str = "json") -> Tuple[bytes, str]:
+    """
+    (cuerpo, content_type) del mensaje.  Los tipos sin representación
+    binaria se envían en JSON aunque se pida "bin".
+    """
+    if formato == "bin" and mensaje["tipo"] in _COD_TIPO:
+        return _codificar_binario(mensaje), CT_BINARIO
+    return json.dumps(mensaje).encode(), CT_JSON
+
+
+def decodificar(cuerpo: bytes, content_type: str | None = None) -> Dict[str, Any]:
+    """Mensaje (dict) a partir del cuerpo; sin content_type se asume JSON."""
+    if content_type == CT_BINARIO:
+        return _a_dict(*_leer_binario(cuerpo))
+    return json.loads(cuerpo)
+
+
+def decodificar_mensaje(cuerpo: bytes, content_type: str | None = None) -> Mensaje:
+    """
+    Cuerpo → mensaje tipado (`message_models`).  El JSON se valida
+    directamente desde los bytes, sin pasar por un dict intermedio; el
+    binario se construye sin segunda validación (ver arriba).
+    """
+    if content_type == CT_BINARIO:
+        return _a_mensaje(*_leer_binario(cuerpo))
+    return validar_json(cuerpo)
+
+
+class Negociacion:
+    """
+    Formato elegido para cada destino a partir de lo que anuncia en sus
+    ACK: el primero de `soportados` que el destino acepte.  Hasta saber
+    algo de él, JSON.
+    """
+
+    def __init__(self, soportados: Iterable[str] = FORMATOS_SOPORTADOS) -> None:
+        self.soportados = tuple(soportados)
+        self._por_destino: Dict[str, str] = {}
+
+    def anunciado(self, destino: str, formatos: Iterable[str] | None) -> None:
+        """Registra los formatos que acepta `destino` (None: solo JSON)."""
+        suyos = set(formatos or ("json",))
+        self._por_destino[destino] = next(
+            (f for f in self.soportados if f in suyos), "json"
+        )
+
+    def formato(self, destino: str) -> str:
+        return self._por_destino.get(destino, "json")
+
+
+# ──────────────────────────────────────────────────────────
+#  Binario
+# ──────────────────────────────────────────────────────────
+def _cadena(s: str) -> bytes:
+    b = s.encode()
+    if len(b) > 255:
+        raise ErrorCodec(f"Cadena demasiado larga para el formato binario: {s[:20]!r}…")
+    return bytes((len(b),)) + b
+
+
+def _leer_cadena(cuerpo: bytes, pos: int) -> Tuple[str, int]:
+    n = cuerpo[pos]
+    fin = pos + 1 + n
+    if fin > len(cuerpo):
+        raise ErrorCodec("Cuerpo binario truncado (cadena)")
+    return cuerpo[pos + 1:fin].decode(), fin
+
+
+def _segundos(ts: Any) -> float:
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    return datetime.fromisoformat(ts).timestamp()
+
+
+def _codificar_vehiculos(vehiculos) -> bytes:
+    registros, ids = [], []
+    pack = _VEHICULO.pack
+    for v in vehiculos:
+        id_ = str(v["id"]).encode()
+        if len(id_) > 255:
+            raise ErrorCodec(f"Id de vehículo demasiado largo: {v['id'][:20]!r}…")
+        x, y = v["posicion"]
+        d = _COD_DIRECCION.get(v["direccion"])
+        if d is None:
+            raise ErrorCodec(f"Dirección desconocida: {v['direccion']!r}")
+        registros.append(pack(x, y, v["velocidad"], d, len(id_)))
+        ids.append(id_)
+    return _CUENTA.pack(len(registros)) + b"".join(registros) + b"".join(ids)
+
+
+def _decodificar_vehiculos(cuerpo: bytes, pos: int) -> Tuple[VehiculosColumnas, int]:
+    (n,) = _CUENTA.unpack_from(cuerpo, pos)
+    if n == 0:
+        raise ErrorCodec("Lote binario sin vehículos")
+    pos += _CUENTA.size
+    fin = pos + n * _VEHICULO.size
+    total = len(cuerpo)
+    if fin > total:
+        raise ErrorCodec("Cuerpo binario truncado (registros de vehículo)")
+    # Registros → columnas en una pasada (sin un dict por vehículo)
+    xs, ys, velocidades, dirs, largos = zip(*_VEHICULO.iter_unpack(cuerpo[pos:fin]))
+    ids = []
+    for largo in largos:
+        ids.append(cuerpo[fin:fin + largo].decode())
+        fin += largo
+    if fin > total:
+        raise ErrorCodec("Cuerpo binario truncado (ids de vehículo)")
+    direcciones = [_DIRECCIONES[d] for d in dirs]
+    return VehiculosColumnas(ids, xs, ys, velocidades, direcciones), fin
+
+
+def _codificar_binario(m: Dict[str, Any]) -> bytes:
+    tipo = m["tipo"]
+    partes = [
+        _CABECERA.pack(_MAGIA, _VERSION, _COD_TIPO[tipo], uuid.UUID(m["id"]).bytes,
+                       _segundos(m["timestamp"])),
+        _cadena(m["origen"]),
+        _cadena(m["destino"]),
+    ]
+    datos = m["datos"]
+    if tipo == TipoMensaje.VEHICULOS_ENTRANTES.value:
+        partes.append(_codificar_vehiculos(datos["vehiculos"]))
+    elif tipo == TipoMensaje.VEHICULO_ENTRANTE.value:
+        partes.append(_codificar_vehiculos((datos,)))
+    else:                                   # ESTADO_ZONA
+        trafico = _COD_TRAFICO.get(datos["trafico"])
+        if trafico is None:
+            raise ErrorCodec(f"Nivel de tráfico desconocido: {datos['trafico']!r}")
+        partes.append(_ESTADO.pack(datos["vehiculos"], trafico,
+                                   float(datos.get("timestamp", 0.0))))
+        partes.append(_cadena(datos["zona"]))
+    return b"".join(partes)
+
+
+def _leer_binario(cuerpo: bytes):
+    """
+    (uid, timestamp, tipo, origen, destino, datos) de un cuerpo binario;
+    `datos` es `VehiculosColumnas` o la tupla (zona, vehículos, tráfico,
+    timestamp).
+    """
+    try:
+        magia, version, cod, uid, ts = _CABECERA.unpack_from(cuerpo, 0)
+        if magia != _MAGIA or version != _VERSION:
+            raise ErrorCodec(f"Cabecera binaria desconocida: {magia!r} v{version}")
+        tipo = _TIPOS[cod]
+        origen, pos = _leer_cadena(cuerpo, _CABECERA.size)
+        destino, pos = _leer_cadena(cuerpo, pos)
+
+        if tipo is TipoMensaje.ESTADO_ZONA:
+            vehiculos, trafico, marca = _ESTADO.unpack_from(cuerpo, pos)
+            zona, pos = _leer_cadena(cuerpo, pos + _ESTADO.size)
+            datos = (zona, vehiculos, _TRAFICO[trafico], marca)
+        else:
+            datos, pos = _decodificar_vehiculos(cuerpo, pos)
+            if tipo is TipoMensaje.VEHICULO_ENTRANTE and len(datos) != 1:
+                raise ErrorCodec("VEHICULO_ENTRANTE binario con más de un vehículo")
+    except (struct.error, IndexError, UnicodeDecodeError) as exc:
+        raise ErrorCodec(f"Cuerpo binario mal formado: {exc}") from exc
+    if pos != len(cuerpo):
+        raise ErrorCodec(f"Cuerpo binario con {len(cuerpo) - pos} bytes sobrantes")
+    h = uid.hex()
+    # Mismo texto que str(uuid.UUID(bytes=uid)), sin crear el objeto
+    id_ = f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+    return id_, ts, tipo, origen, destino, datos
+
+
+def _a_mensaje(id_, ts, tipo, origen, destino, datos) -> Mensaje:
+    comunes = {"id": id_, "timestamp": datetime.fromtimestamp(ts, timezone.utc),
+               "tipo": tipo, "origen": origen, "destino": destino}
+    if tipo is TipoMensaje.VEHICULOS_ENTRANTES:
+        return construir(MensajeVehiculosEntrantes, **comunes,
+                         datos=construir(DatosVehiculosEntrantes, vehiculos=datos))
+    if tipo is TipoMensaje.VEHICULO_ENTRANTE:
+        return construir(MensajeVehiculoEntrante, **comunes, datos=datos[0])
+    zona, vehiculos, trafico, _ = datos
+    return construir(MensajeEstadoZona, **comunes,
+                     datos=construir(DatosEstadoZona, zona=zona, vehiculos=vehiculos,
+                                     trafico=trafico))
+
+
+def _a_dict(id_, ts, tipo, origen, destino, datos) -> Dict[str, Any]:
+    if tipo is TipoMensaje.ESTADO_ZONA:
+        zona, vehiculos, trafico, marca = datos
+        datos = {"zona": zona, "vehiculos": vehiculos, "trafico": trafico, "timestamp": marca}
+    else:
+        lista = [
+            {"id": id_v, "posicion": list(pos), "velocidad": vel, "direccion": dir_}
+            for id_v, pos, vel, dir_ in datos.filas()
+        ]
+        datos = {"vehiculos": lista} if tipo is TipoMensaje.VEHICULOS_ENTRANTES else lista[0]
+    return {
+        "id": id_,
+        "timestamp": ts,
+        "tipo": tipo.value,
+        "origen": origen,
+        "destino": destino,
+        "datos": datos,
+    }
@@ -1,14 +1,27 @@
 """
 Modelos Pydantic que tipan y validan la mensajería entre nodos.
+
+Cada tipo de mensaje es un modelo propio (`tipo` literal + `datos`
+tipados) y todos forman una unión discriminada por `tipo`.  `ADAPTADOR`
+la compila una sola vez: `validar_json` pasa de bytes al mensaje tipado
+en una única pasada del núcleo de Pydantic (sin `json.loads` previo ni
+una segunda validación de `datos`) y `validar` hace lo mismo desde un
+dict.
+
+El codec binario no pasa por aquí: sus campos salen de layouts fijos
+ya comprobados al desempaquetar, así que `construir` monta los modelos
+sin validar, y los lotes llegan como `VehiculosColumnas` (columnas, sin
+un modelo por vehículo).
 """
 
 from enum import Enum
 from datetime import datetime
-from typing import List, Tuple, Literal
-from pydantic import BaseModel, Field
+from typing import Annotated, Any, Iterator, List, Literal, Sequence, Tuple, Type, TypeVar, Union
+from pydantic import BaseModel, Field, TypeAdapter, field_serializer
 
 class TipoMensaje(str, Enum):
     VEHICULO_ENTRANTE   = "VEHICULO_ENTRANTE"
+    VEHICULOS_ENTRANTES = "VEHICULOS_ENTRANTES"
     ESTADO_ZONA         = "ESTADO_ZONA"
     ACK                 = "ACK"
 
@@ -16,10 +29,54 @@ class TipoMensaje(str, Enum):
 
 class DatosVehiculoEntrante(BaseModel):
     id          : str
-    posicion    : Tuple[float, float] = Field(..., min_items=2, max_items=2)
+    posicion    : Tuple[float, float]
     velocidad   : float
     direccion   : Literal["NORTE", "SUR", "ESTE", "OESTE"]
 
+class VehiculosColumnas(Sequence):
+    """
+    Lote de vehículos en columnas, tal como lo desempaqueta el codec
+    binario.  Se recorre como la lista de `DatosVehiculoEntrante` (que
+    se crean al vuelo); `filas()` da las tuplas sin crear modelos, que
+    es lo que usa el consumidor.
+    """
+
+    __slots__ = ("ids", "x", "y", "velocidad", "direccion")
+
+    def __init__(self, ids: Sequence[str], x: Sequence[float], y: Sequence[float],
+                 velocidad: Sequence[float], direccion: Sequence[str]) -> None:
+        self.ids = ids
+        self.x = x
+        self.y = y
+        self.velocidad = velocidad
+        self.direccion = direccion
+
+    def filas(self) -> Iterator[Tuple[str, Tuple[float, float], float, str]]:
+        """(id, posición, velocidad, dirección) por vehículo."""
+        return zip(self.ids, zip(self.x, self.y), self.velocidad, self.direccion)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> DatosVehiculoEntrante:
+        return construir(DatosVehiculoEntrante, id=self.ids[i], posicion=(self.x[i], self.y[i]),
+                         velocidad=self.velocidad[i], direccion=self.direccion[i])
+
+    def __iter__(self) -> Iterator[DatosVehiculoEntrante]:
+        for id_, posicion, velocidad, direccion in self.filas():
+            yield construir(DatosVehiculoEntrante, id=id_, posicion=posicion,
+                            velocidad=velocidad, direccion=direccion)
+
+class DatosVehiculosEntrantes(BaseModel):
+    vehiculos   : List[DatosVehiculoEntrante] = Field(..., min_length=1)
+
+    @field_serializer("vehiculos", mode="wrap")
+    def _serializar_vehiculos(self, vehiculos, handler):
+        # Un lote binario se serializa como la lista equivalente
+        if isinstance(vehiculos, VehiculosColumnas):
+            vehiculos = list(vehiculos)
+        return handler(vehiculos)
+
 class DatosEstadoZona(BaseModel):
     zona        : str
     vehiculos   : int
@@ -28,26 +85,74 @@ class DatosEstadoZona(BaseModel):
 class DatosAck(BaseModel):
     acked_id    : str
     ok          : bool = True
+    cantidad    : int = 1               # vehículos integrados (lotes)
+    formatos    : List[str] | None = None   # codificaciones que acepta el emisor
 
-# ---------- Mensaje genérico ---------- #
+# ---------- Mensajes ---------- #
 
 class Mensaje(BaseModel):
+    """Campos comunes; los mensajes reales son las subclases tipadas."""
     id          : str
     timestamp   : datetime
     tipo        : TipoMensaje
     origen      : str
     destino     : str
-    datos       : dict              # se valida dinámicamente
 
-    # validación condicional según tipo
     @classmethod
     def validate(cls, obj):
-        m = super().validate(obj)
-
-        if m.tipo is TipoMensaje.VEHICULO_ENTRANTE:
-            m.datos = DatosVehiculoEntrante(**m.datos)
-        elif m.tipo is TipoMensaje.ESTADO_ZONA:
-            m.datos = DatosEstadoZona(**m.datos)
-        elif m.tipo is TipoMensaje.ACK:
-            m.datos = DatosAck(**m.datos)
-        return m
+        """Compatibilidad: equivale a `validar(obj)`."""
+        return validar(obj)
+
+class MensajeVehiculoEntrante(Mensaje):
+    tipo        : Literal[TipoMensaje.VEHICULO_ENTRANTE]
+    datos       : DatosVehiculoEntrante
+
+class MensajeVehiculosEntrantes(Mensaje):
+    tipo        : Literal[TipoMensaje.VEHICULOS_ENTRANTES]
+    datos       : DatosVehiculosEntrantes
+
+class MensajeEstadoZona(Mensaje):
+    tipo        : Literal[TipoMensaje.ESTADO_ZONA]
+    datos       : DatosEstadoZona
+
+class MensajeAck(Mensaje):
+    tipo        : Literal[TipoMensaje.ACK]
+    datos       : DatosAck
+
+MensajeTipado = Annotated[
+    Union[MensajeVehiculoEntrante, MensajeVehiculosEntrantes, MensajeEstadoZona, MensajeAck],
+    Field(discriminator="tipo"),
+]
+
+# Validador compilado una vez para toda la unión
+ADAPTADOR: TypeAdapter[MensajeTipado] = TypeAdapter(MensajeTipado)
+
+
+def validar_json(cuerpo: bytes | str) -> Mensaje:
+    """Bytes JSON → mensaje tipado, en una sola pasada."""
+    return ADAPTADOR.validate_json(cuerpo)
+
+
+def validar(obj: dict) -> Mensaje:
+    """Dict → mensaje tipado."""
+    return ADAPTADOR.validate_python(obj)
+
+
+_M = TypeVar("_M", bound=BaseModel)
+_nuevo = object.__new__
+_fijar = object.__setattr__
+
+
+def construir(cls: Type[_M], **campos: Any) -> _M:
+    """
+    Instancia de `cls` sin validar: lo mismo que `cls.model_construct`,
+    sin su paso por los valores por defecto (hay que dar todos los
+    campos).  Solo para datos que ya vienen comprobados, como los del
+    codec binario.
+    """
+    obj = _nuevo(cls)
+    _fijar(obj, "__dict__", campos)
+    _fijar(obj, "__pydantic_fields_set__", set(campos))
+    _fijar(obj, "__pydantic_extra__", None)
+    _fijar(obj, "__pydantic_private__", None)
+    return obj
@@ -1,11 +1,18 @@
 # simulacion_trafico/distribution/migracion_utils.py
 """
 Utilidades de balanceo de carga y elección de nodo destino.
+
+• `ClienteCoordinador`: un único `httpx.AsyncClient` por nodo, con pool
+  de conexiones keep-alive, para registro, heart-beats y `/nodos`.
+• `VistaCluster`: copia local de la carga de cada nodo, alimentada por
+  los `ESTADO_ZONA` que difunde el bus (o, si no, refrescada desde el
+  Coordinador).  Elegir destino es una consulta en memoria; no abre
+  conexiones ni descarga el mapa completo cada vez.
 """
 
 from __future__ import annotations
-import httpx, logging
-from typing import List, Optional
+import asyncio, httpx, logging, time
+from typing import Any, Dict, List, Optional
 
 _LOG = logging.getLogger("Balanceo")
 
@@ -13,29 +20,171 @@ _LOG = logging.getLogger("Balanceo")
 COORD_URL = "http://localhost:8000"
 
 
-async def destino_menos_cargado(excluir: List[str] | None = None) -> Optional[str]:
+# ──────────────────────────────────────────────────────────
+#  Cliente HTTP del Coordinador
+# ──────────────────────────────────────────────────────────
+class ClienteCoordinador:
+    """
+    Cliente HTTP de larga vida hacia el Coordinador.  Reutiliza las
+    conexiones entre peticiones; hay que cerrarlo con `cerrar()` (o
+    usarlo como `async with`).
+    """
+
+    def __init__(self, url: str = COORD_URL, timeout: float = 5.0,
+                 max_conexiones: int = 4) -> None:
+        self.url = url
+        self._cli = httpx.AsyncClient(
+            base_url=url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_conexiones,
+                                max_keepalive_connections=max_conexiones),
+        )
+
+    async def registrar(self, payload: Dict[str, Any]) -> httpx.Response:
+        return await self._cli.post("/register", json=payload)
+
+    async def heartbeat(self, payload: Dict[str, Any]) -> httpx.Response:
+        return await self._cli.post("/heartbeat", json=payload)
+
+    async def nodos(self) -> Dict[str, Dict[str, Any]]:
+        """Mapa zona → información de nodo (`/nodos`)."""
+        r = await self._cli.get("/nodos")
+        r.raise_for_status()
+        return r.json()
+
+    async def cerrar(self) -> None:
+        await self._cli.aclose()
+
+    async def __aenter__(self) -> "ClienteCoordinador":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.cerrar()
+
+
+# ──────────────────────────────────────────────────────────
+#  Vista local del clúster
+# ──────────────────────────────────────────────────────────
+def _menos_cargado(nodos: Dict[str, Dict[str, Any]], excluir) -> Optional[str]:
+    candidatos = [info for name, info in nodos.items() if name not in excluir]
+    if not candidatos:
+        return None
+    # Elige el que menos vehículos tenga
+    return min(candidatos, key=lambda i: i["vehiculos"])["zona"]
+
+
+class VistaCluster:
+    """
+    Tabla local zona → carga, actualizada entrada a entrada.
+
+    Se alimenta de dos fuentes:
+      • `aplicar()`: cada `ESTADO_ZONA` difundido por el bus (modo
+        push; no hace falta preguntar a nadie)
+      • `refrescar()` / `iniciar()`: descarga de `/nodos` del
+        Coordinador, una vez o en segundo plano cada `ttl` segundos
+
+    `menos_cargado()` responde desde memoria y solo considera zonas de
+    las que se ha sabido algo en los últimos `max_edad` segundos (una
+    zona que deja de publicar sale sola de la tabla).  Las migraciones
+    propias se anotan (`anotar`) para no mandar todo al mismo nodo
+    entre dos actualizaciones.
+    """
+
+    def __init__(self, cliente: ClienteCoordinador | None = None, ttl: float = 2.0,
+                 max_edad: float | None = None) -> None:
+        self.cliente = cliente
+        self.ttl = ttl
+        self.max_edad = max_edad if max_edad is not None else 5 * ttl
+        self.nodos: Dict[str, Dict[str, Any]] = {}
+        self._visto: Dict[str, float] = {}    # zona -> time.monotonic() de su último dato
+        self.actualizaciones = 0
+        self.refrescos = 0
+        self.fallos = 0
+        self._tarea: asyncio.Task | None = None
+
+    # -------------------------------------------------------
+    def aplicar(self, zona: str, vehiculos: int, **info: Any) -> None:
+        """Actualiza la entrada de `zona` con un dato recién recibido."""
+        self.nodos[zona] = dict(info, zona=zona, vehiculos=vehiculos)
+        self._visto[zona] = time.monotonic()
+        self.actualizaciones += 1
+
+    async def refrescar(self) -> bool:
+        """Descarga `/nodos` una vez.  Devuelve False si ha fallado."""
+        try:
+            nodos = await self.cliente.nodos()
+        except Exception as exc:
+            self.fallos += 1
+            _LOG.warning("No pude consultar al Coordinador: %s", exc)
+            return False
+        for zona, info in nodos.items():
+            if info.get("estado") != "UNHEALTHY":
+                self.aplicar(**dict(info, zona=zona))
+        self.refrescos += 1
+        return True
+
+    async def _bucle(self) -> None:
+        while True:
+            await self.refrescar()
+            await asyncio.sleep(self.ttl)
+
+    def iniciar(self) -> "VistaCluster":
+        """Refresco periódico desde el Coordinador (requiere `cliente`)."""
+        if self.cliente is None:
+            raise RuntimeError("VistaCluster sin cliente: solo se alimenta con aplicar().")
+        if self._tarea is None:
+            self._tarea = asyncio.create_task(self._bucle())
+        return self
+
+    async def detener(self) -> None:
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    # -------------------------------------------------------
+    def edad(self, zona: str) -> float:
+        """Segundos desde el último dato de `zona` (inf si ninguno)."""
+        visto = self._visto.get(zona)
+        if visto is None:
+            return float("inf")
+        return time.monotonic() - visto
+
+    def vigentes(self) -> Dict[str, Dict[str, Any]]:
+        """Entradas con datos de hace como mucho `max_edad` segundos."""
+        limite = time.monotonic() - self.max_edad
+        visto = self._visto
+        return {z: info for z, info in self.nodos.items() if visto[z] >= limite}
+
+    def menos_cargado(self, excluir: List[str] | None = None) -> Optional[str]:
+        """Nodo vigente con menos vehículos según la vista (o None)."""
+        return _menos_cargado(self.vigentes(), set(excluir or []))
+
+    def anotar(self, zona: str, vehiculos: int) -> None:
+        """Suma `vehiculos` a la carga conocida de `zona` hasta su próximo dato."""
+        info = self.nodos.get(zona)
+        if info is not None:
+            info["vehiculos"] = info.get("vehiculos", 0) + vehiculos
+
+
+async def destino_menos_cargado(excluir: List[str] | None = None,
+                                vista: VistaCluster | None = None) -> Optional[str]:
     """
     Devuelve el nombre del nodo con menos vehículos, excluyendo los
-    indicados.  Si no se puede contactar al Coordinador, retorna None.
+    indicados.  Con `vista` responde desde memoria; sin ella consulta
+    al Coordinador una vez (uso puntual, p. ej. scripts de prueba).
+    Si no se puede contactar al Coordinador, retorna None.
     """
-    excluir = set(excluir or [])
+    if vista is not None:
+        return vista.menos_cargado(excluir)
 
     try:
-        async with httpx.AsyncClient(timeout=2) as cli:
-            r = await cli.get(f"{COORD_URL}/nodos")
-            r.raise_for_status()
-            data = r.json()
+        async with ClienteCoordinador(timeout=2) as cli:
+            data = await cli.nodos()
     except Exception as exc:
         _LOG.warning("No pude consultar al Coordinador: %s", exc)
         return None
-
-    # Filtrar nodos excluidos
-    candidatos = [
-        info for name, info in data.items() if name not in excluir
-    ]
-    if not candidatos:
-        return None
-
-    # Elige el que menos vehículos tenga
-    destino = min(candidatos, key=lambda i: i["vehiculos"])
-    return destino["zona"]
+    return _menos_cargado(data, set(excluir or []))
@@ -4,13 +4,15 @@ Especificación de los mensajes intercambiados entre nodos.
 
 • Todos los mensajes siguen el formato del helper `crear_mensaje`.
 • Los tipos están definidos en la Enum `TipoMensaje`.
+• Las migraciones viajan en lote (`VEHICULOS_ENTRANTES`, un ACK por
+  lote); `LotesMigracion` agrupa los vehículos salientes por destino.
 """
 
 from __future__ import annotations
 from enum import Enum
 from datetime import datetime, timezone
 import uuid
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Tuple
 
 
 # ──────────────────────────────────────────────────────────
@@ -18,11 +20,16 @@ from typing import Any, Dict
 # ──────────────────────────────────────────────────────────
 class TipoMensaje(str, Enum):
     VEHICULO_ENTRANTE   = "VEHICULO_ENTRANTE"
+    VEHICULOS_ENTRANTES = "VEHICULOS_ENTRANTES"
     ESTADO_ZONA         = "ESTADO_ZONA"
     ACTUALIZACION_SEMAFORO = "ACTUALIZACION_SEMAFORO"
     ACK                 = "ACK"
 
 
+# Máximo de vehículos por mensaje de migración en lote
+MAX_LOTE = 500
+
+
 # ──────────────────────────────────────────────────────────
 #  Helper generador
 # ──────────────────────────────────────────────────────────
@@ -62,6 +69,23 @@ def mensaje_vehiculo_entrante(
     )
 
 
+def mensaje_vehiculos_entrantes(
+    vehiculos: List[Dict[str, Any]],
+    origen: str,
+    destino: str,
+) -> Dict[str, Any]:
+    """
+    Migración en lote: varios vehículos hacia el mismo destino con un
+    único id, timestamp y ACK.
+    """
+    return crear_mensaje(
+        tipo=TipoMensaje.VEHICULOS_ENTRANTES,
+        datos={"vehiculos": vehiculos},
+        origen=origen,
+        destino=destino,
+    )
+
+
 def mensaje_estado_zona(
     datos: Dict[str, Any],
     origen: str,
@@ -83,10 +107,55 @@ def mensaje_ack(
     acked_id: str,
     origen: str,
     destino: str,
+    cantidad: int | None = None,
+    formatos: List[str] | None = None,
 ) -> Dict[str, Any]:
+    """
+    Confirma el mensaje `acked_id`; en un lote, `cantidad` indica cuántos
+    vehículos se han integrado.  `formatos` anuncia las codificaciones
+    que acepta quien confirma (ver `codec.Negociacion`).
+    """
+    datos: Dict[str, Any] = {"acked_id": acked_id}
+    if cantidad is not None:
+        datos["cantidad"] = cantidad
+    if formatos is not None:
+        datos["formatos"] = list(formatos)
     return crear_mensaje(
         tipo=TipoMensaje.ACK,
-        datos={"acked_id": acked_id},
+        datos=datos,
         origen=origen,
         destino=destino,
     )
+
+
+# ──────────────────────────────────────────────────────────
+#  Agrupación de migraciones por destino
+# ──────────────────────────────────────────────────────────
+class LotesMigracion:
+    """
+    Acumula los vehículos salientes de una ventana (p. ej. una pasada
+    de `revisar_migraciones`) y los entrega como un mensaje
+    `VEHICULOS_ENTRANTES` por destino, partidos en trozos de `max_lote`.
+    """
+
+    def __init__(self, max_lote: int = MAX_LOTE) -> None:
+        self.max_lote = max_lote
+        self._por_destino: Dict[str, List[Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(vs) for vs in self._por_destino.values())
+
+    def agregar(self, destino: str, vehiculo: Dict[str, Any]) -> None:
+        self._por_destino.setdefault(destino, []).append(vehiculo)
+
+    def mensajes(self, origen: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Vacía el acumulado: pares (destino, mensaje) listos para enviar
+        a la cola `{destino}_queue`.
+        """
+        por_destino, self._por_destino = self._por_destino, {}
+        for destino, vehiculos in por_destino.items():
+            for i in range(0, len(vehiculos), self.max_lote):
+                yield destino, mensaje_vehiculos_entrantes(
+                    vehiculos[i:i + self.max_lote], origen=origen, destino=destino
+                )
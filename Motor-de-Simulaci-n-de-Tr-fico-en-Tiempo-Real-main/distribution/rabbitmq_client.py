@@ -5,19 +5,26 @@ Envoltorio robusto sobre aio-pika para RabbitMQ:
 • Reconexión automática  • Prefetch configurable
 • Publicación con reintentos (tenacity)
 • Dispatcher por tipo de mensaje (handlers)
+• Difusión (exchange fanout): cada nodo recibe en una cola propia y
+  temporal todo lo publicado en el exchange
+• Cuerpo JSON o binario según `content_type` (ver `codec`)
 """
 
 from __future__ import annotations
-import asyncio, json, logging, os
+import asyncio, logging, os
 from typing import Callable, Awaitable, Dict
 
 import aio_pika
 from tenacity import retry, wait_exponential, stop_after_attempt
 
 from .message_models import Mensaje
+from .codec import codificar, decodificar_mensaje
 
 _LOG = logging.getLogger("RabbitMQ")
 
+# Exchange de difusión del estado de las zonas
+EXCHANGE_ESTADO = "trafico.estado"
+
 
 class RabbitMQClient:
     def __init__(
@@ -34,6 +41,7 @@ class RabbitMQClient:
 
         self.connection: aio_pika.RobustConnection | None = None
         self.channel: aio_pika.Channel | None = None
+        self._exchanges: Dict[str, aio_pika.abc.AbstractExchange] = {}
 
     # ─────────────────────────────────────────────────────
     # CONEXIÓN
@@ -52,17 +60,49 @@ class RabbitMQClient:
     # ENVÍO
     # ─────────────────────────────────────────────────────
     @retry(wait=wait_exponential(multiplier=0.5, max=8), stop=stop_after_attempt(5))
-    async def send_message(self, message_dict: dict, queue_name: str) -> None:
+    async def send_message(self, message_dict: dict, queue_name: str,
+                           formato: str = "json") -> None:
+        """
+        Publica en `queue_name`.  Con `formato="bin"` las migraciones y
+        el estado de zona viajan en binario (solo a quien lo acepta).
+        """
         if not self.channel:
             raise RuntimeError("Debes llamar a connect() antes de publicar.")
 
-        body = json.dumps(message_dict).encode()
+        body, content_type = codificar(message_dict, formato)
         await self.channel.default_exchange.publish(
-            aio_pika.Message(body=body),
+            aio_pika.Message(body=body, content_type=content_type),
             routing_key=queue_name,
         )
         _LOG.debug("Publicado en %s: %s", queue_name, message_dict.get("id"))
 
+    async def _fanout(self, exchange_name: str) -> aio_pika.abc.AbstractExchange:
+        ex = self._exchanges.get(exchange_name)
+        if ex is None:
+            ex = self._exchanges[exchange_name] = await self.channel.declare_exchange(
+                exchange_name, aio_pika.ExchangeType.FANOUT, durable=True,
+            )
+        return ex
+
+    @retry(wait=wait_exponential(multiplier=0.5, max=8), stop=stop_after_attempt(5))
+    async def broadcast(self, message_dict: dict, exchange_name: str = EXCHANGE_ESTADO,
+                        formato: str = "json", expiracion: float | None = None) -> None:
+        """
+        Publica en el exchange fanout `exchange_name`: le llega a todos
+        los nodos suscritos (incluido el emisor).  Con `expiracion` (s)
+        el broker descarta el mensaje si nadie lo ha leído a tiempo.
+        """
+        if not self.channel:
+            raise RuntimeError("Debes llamar a connect() antes de publicar.")
+
+        body, content_type = codificar(message_dict, formato)
+        ex = await self._fanout(exchange_name)
+        await ex.publish(
+            aio_pika.Message(body=body, content_type=content_type, expiration=expiracion),
+            routing_key="",
+        )
+        _LOG.debug("Difundido en %s: %s", exchange_name, message_dict.get("id"))
+
     # ─────────────────────────────────────────────────────
     # CONSUMO
     # ─────────────────────────────────────────────────────
@@ -80,12 +120,33 @@ class RabbitMQClient:
 
         queue = await self.channel.declare_queue(queue_name, durable=True)
         _LOG.info("Esperando mensajes en '%s'…", queue_name)
+        await self._consumir(queue, handlers)
+
+    async def start_broadcast_consumer(
+        self,
+        handlers: Dict[str, Callable[[Mensaje], Awaitable[None]]],
+        exchange_name: str = EXCHANGE_ESTADO,
+    ) -> None:
+        """
+        Se suscribe al exchange fanout con una cola exclusiva (nombre
+        del servidor, se borra al desconectar) y despacha como
+        `start_consumer`.
+        """
+        if not self.channel:
+            raise RuntimeError("Debes llamar a connect() antes de consumir.")
+
+        ex = await self._fanout(exchange_name)
+        queue = await self.channel.declare_queue(exclusive=True)
+        await queue.bind(ex)
+        _LOG.info("Suscrito a la difusión '%s'.", exchange_name)
+        await self._consumir(queue, handlers)
 
+    async def _consumir(self, queue, handlers) -> None:
         async with queue.iterator() as it:
             async for msg in it:
                 async with msg.process():
                     try:
-                        m = Mensaje.validate(json.loads(msg.body.decode()))
+                        m = decodificar_mensaje(msg.body, msg.content_type)
                         handler = handlers.get(m.tipo.value)
                         if handler:
                             await handler(m)
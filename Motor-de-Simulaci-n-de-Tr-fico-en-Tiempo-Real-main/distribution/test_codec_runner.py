@@ -0,0 +1,172 @@
+# test_codec_runner.py
+
+import time
+
+from pydantic import ValidationError
+
+from distribution.protocolo import (
+    mensaje_vehiculo_entrante,
+    mensaje_vehiculos_entrantes,
+    mensaje_estado_zona,
+    mensaje_ack,
+    LotesMigracion,
+)
+from distribution.codec import (
+    codificar, decodificar, decodificar_mensaje, ErrorCodec,
+    Negociacion, CT_BINARIO, CT_JSON,
+)
+from distribution.message_models import (
+    validar, validar_json, VehiculosColumnas,
+    MensajeVehiculoEntrante, MensajeVehiculosEntrantes, MensajeEstadoZona, MensajeAck,
+)
+
+
+def _vehiculo(i=0):
+    return {"id": f"VEH{i}", "posicion": [20.0 + i, 5.0], "velocidad": 1.5, "direccion": "ESTE"}
+
+
+def _lote(n=3):
+    return mensaje_vehiculos_entrantes([_vehiculo(i) for i in range(n)], origen="a", destino="b")
+
+
+def _muestras():
+    return [
+        (mensaje_vehiculo_entrante(_vehiculo(), origen="a", destino="b"), MensajeVehiculoEntrante),
+        (_lote(), MensajeVehiculosEntrantes),
+        (mensaje_estado_zona({"zona": "a", "vehiculos": 7, "trafico": "ALTO",
+                              "timestamp": time.time()}, origen="a", destino="b"),
+         MensajeEstadoZona),
+        (mensaje_ack("x", origen="b", destino="a", cantidad=3, formatos=["json", "bin"]),
+         MensajeAck),
+    ]
+
+
+# ─────────────────────────────────────────────────────
+def test_ida_y_vuelta():
+    for mensaje, clase in _muestras():
+        for formato in ("json", "bin"):
+            cuerpo, ct = codificar(mensaje, formato)
+            m = decodificar_mensaje(cuerpo, ct)
+            assert type(m) is clase, (formato, type(m))
+            assert (m.id, m.tipo.value, m.origen, m.destino) == (
+                mensaje["id"], mensaje["tipo"], mensaje["origen"], mensaje["destino"])
+            datos = m.datos.model_dump(mode="json")
+            for clave, valor in mensaje["datos"].items():
+                if clave != "timestamp":                # no forma parte del modelo
+                    assert datos[clave] == valor, (formato, clave)
+
+
+def test_binario_conserva_vehiculos():
+    mensaje = _lote(5)
+    cuerpo, ct = codificar(mensaje, "bin")
+    assert ct == CT_BINARIO
+    d = decodificar(cuerpo, ct)
+    assert d["id"] == mensaje["id"]
+    assert d["datos"]["vehiculos"] == mensaje["datos"]["vehiculos"]
+
+
+def test_binario_en_columnas():
+    mensaje = _lote(4)
+    por_json = decodificar_mensaje(*codificar(mensaje, "json"))
+    por_bin = decodificar_mensaje(*codificar(mensaje, "bin"))
+    lote = por_bin.datos.vehiculos
+    assert isinstance(lote, VehiculosColumnas) and len(lote) == 4
+    assert list(lote) == por_json.datos.vehiculos
+    assert por_bin.timestamp == por_json.timestamp
+    assert [f[0] for f in lote.filas()] == [v["id"] for v in mensaje["datos"]["vehiculos"]]
+    assert por_bin.model_dump() == por_json.model_dump()
+
+
+def test_binario_lote_vacio():
+    cuerpo, ct = codificar(mensaje_vehiculos_entrantes([], origen="a", destino="b"), "bin")
+    try:
+        decodificar_mensaje(cuerpo, ct)
+    except ErrorCodec:
+        return
+    raise AssertionError("lote binario vacío aceptado")
+
+
+def test_ack_siempre_en_json():
+    _, ct = codificar(mensaje_ack("x", origen="b", destino="a"), "bin")
+    assert ct == CT_JSON
+
+
+def test_binario_truncado():
+    cuerpo, ct = codificar(_lote(), "bin")
+    for corte in range(len(cuerpo)):
+        try:
+            decodificar(cuerpo[:corte], ct)
+        except ErrorCodec:
+            continue
+        raise AssertionError(f"cuerpo truncado a {corte} bytes aceptado")
+
+
+def test_binario_con_bytes_sobrantes():
+    cuerpo, ct = codificar(_lote(), "bin")
+    try:
+        decodificar(cuerpo + b"\x00\x01", ct)
+    except ErrorCodec:
+        return
+    raise AssertionError("bytes sobrantes aceptados")
+
+
+def test_trafico_desconocido():
+    m = mensaje_estado_zona({"zona": "a", "vehiculos": 1, "trafico": "CAOS"}, origen="a", destino="b")
+    try:
+        codificar(m, "bin")
+    except ErrorCodec:
+        return
+    raise AssertionError("tráfico desconocido aceptado")
+
+
+def test_union_discriminada():
+    m = _lote(2)
+    assert type(validar(m)) is MensajeVehiculosEntrantes
+    m["tipo"] = "VEHICULO_ENTRANTE"             # datos de lote con tipo de vehículo suelto
+    try:
+        validar(m)
+    except ValidationError:
+        pass
+    else:
+        raise AssertionError("datos incoherentes con el tipo aceptados")
+    try:
+        validar_json(b'{"tipo": "DESCONOCIDO"}')
+    except ValidationError:
+        pass
+    else:
+        raise AssertionError("tipo desconocido aceptado")
+
+
+def test_lotes_migracion():
+    lotes = LotesMigracion(max_lote=2)
+    for i in range(5):
+        lotes.agregar("b", _vehiculo(i))
+    lotes.agregar("c", _vehiculo(9))
+    assert len(lotes) == 6
+    mensajes = list(lotes.mensajes("a"))
+    assert [(d, len(m["datos"]["vehiculos"])) for d, m in mensajes] == [
+        ("b", 2), ("b", 2), ("b", 1), ("c", 1)
+    ]
+    assert len(lotes) == 0 and not list(lotes.mensajes("a"))
+
+
+def test_negociacion():
+    n = Negociacion()
+    assert n.formato("b") == "json"
+    n.anunciado("b", ["bin", "json"])
+    n.anunciado("c", None)                      # nodo antiguo: solo JSON
+    assert n.formato("b") == "bin" and n.formato("c") == "json"
+    n = Negociacion(("json", "bin"))
+    n.anunciado("b", ["bin", "json"])
+    assert n.formato("b") == "json"
+
+
+def main():
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("test_"):
+            prueba()
+            print(f"[OK] {nombre}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# test_vista_cluster_runner.py
+
+import asyncio
+
+from distribution import migracion_utils
+from distribution.migracion_utils import VistaCluster, destino_menos_cargado
+
+
+class _Reloj:
+    """Sustituye a `time` en `migracion_utils` (solo `monotonic`)."""
+
+    def __init__(self):
+        self.t = 100.0
+
+    def monotonic(self):
+        return self.t
+
+
+def _con_reloj(prueba):
+    def envoltura():
+        reloj, original = _Reloj(), migracion_utils.time
+        migracion_utils.time = reloj
+        try:
+            prueba(reloj)
+        finally:
+            migracion_utils.time = original
+    envoltura.__name__ = prueba.__name__
+    return envoltura
+
+
+class _Coordinador:
+    """`ClienteCoordinador` falso: devuelve `nodos` o lanza si es None."""
+
+    def __init__(self, nodos):
+        self.respuesta = nodos
+
+    async def nodos(self):
+        if self.respuesta is None:
+            raise ConnectionError("coordinador caído")
+        return self.respuesta
+
+
+# ─────────────────────────────────────────────────────
+@_con_reloj
+def test_menos_cargado_y_excluir(reloj):
+    vista = VistaCluster(max_edad=10)
+    vista.aplicar("a", 30, trafico="ALTO")
+    vista.aplicar("b", 5)
+    vista.aplicar("c", 12)
+    assert vista.menos_cargado() == "b"
+    assert vista.menos_cargado(excluir=["b"]) == "c"
+    assert vista.menos_cargado(excluir=["a", "b", "c"]) is None
+    assert vista.nodos["a"] == {"zona": "a", "vehiculos": 30, "trafico": "ALTO"}
+
+
+@_con_reloj
+def test_max_edad(reloj):
+    vista = VistaCluster(max_edad=10)
+    vista.aplicar("a", 1)
+    reloj.t += 6
+    vista.aplicar("b", 50)
+    assert vista.edad("a") == 6 and vista.edad("zz") == float("inf")
+    reloj.t += 4                                # "a" justo en el límite
+    assert vista.menos_cargado() == "a"
+    reloj.t += 0.5                              # "a" deja de publicar: caduca
+    assert set(vista.vigentes()) == {"b"} and vista.menos_cargado() == "b"
+    vista.aplicar("a", 1)                       # vuelve a publicar
+    assert vista.menos_cargado() == "a"
+    reloj.t += 20
+    assert vista.vigentes() == {} and vista.menos_cargado() is None
+
+
+@_con_reloj
+def test_anotar_hasta_el_proximo_dato(reloj):
+    vista = VistaCluster(max_edad=10)
+    vista.aplicar("a", 10)
+    vista.aplicar("b", 12)
+    vista.anotar("a", 5)                        # migración propia hacia "a"
+    assert vista.nodos["a"]["vehiculos"] == 15 and vista.menos_cargado() == "b"
+    vista.anotar("zz", 3)                       # zona desconocida: se ignora
+    assert "zz" not in vista.nodos
+    vista.aplicar("a", 11)                      # el dato nuevo sustituye a la anotación
+    assert vista.nodos["a"]["vehiculos"] == 11 and vista.menos_cargado() == "a"
+
+
+@_con_reloj
+def test_refrescar_desde_coordinador(reloj):
+    coord = _Coordinador({"a": {"zona": "a", "vehiculos": 3, "estado": "OK"},
+                          "b": {"zona": "b", "vehiculos": 1, "estado": "UNHEALTHY"}})
+    vista = VistaCluster(coord, max_edad=10)
+
+    async def escenario():
+        assert await vista.refrescar()
+        assert set(vista.nodos) == {"a"}         # los UNHEALTHY no entran
+        assert await destino_menos_cargado(vista=vista) == "a"
+        coord.respuesta = None
+        reloj.t += 5
+        assert not await vista.refrescar()      # el fallo no borra la vista
+        assert vista.menos_cargado() == "a"
+        reloj.t += 6
+        assert await destino_menos_cargado(vista=vista) is None
+
+    asyncio.run(escenario())
+    assert (vista.refrescos, vista.fallos) == (1, 1)
+
+
+def main():
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("test_"):
+            prueba()
+            print(f"[OK] {nombre}")
+
+
+if __name__ == "__main__":
+    main()
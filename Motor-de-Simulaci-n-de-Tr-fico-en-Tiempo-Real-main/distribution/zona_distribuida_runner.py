@@ -2,32 +2,40 @@
 """
 Nodo "zona_distribuida"
 
-• Simulación local (City / Vehicle / TrafficLight)
-• Registro + heart-beats con el Coordinador
-• RabbitMQ → maneja VEHICULO_ENTRANTE
-• Migración saliente con balanceo (destino menos cargado)
+• Simulación local (City / Vehicle / TrafficLight) en un hilo propio,
+  para que un tick largo no retrase ACKs ni heart-beats
+• Registro + heart-beats con el Coordinador (un cliente HTTP por nodo)
+• RabbitMQ → maneja VEHICULO_ENTRANTE y VEHICULOS_ENTRANTES (lotes)
+• Estado de zona difundido por el bus (exchange fanout) y tabla local
+  del clúster alimentada por lo que difunden las demás zonas
+• Migración saliente con balanceo (destino menos cargado según esa
+  tabla, sin consultar al Coordinador)
 • Métricas Prometheus en :9200
+• Checkpoint binario periódico y al apagar; reanudación al arrancar
 """
 
 from __future__ import annotations
-import asyncio, logging, httpx, time
+import asyncio, logging, math, os, time
 from typing import List
 
 from environment.City import City
 from environment.Vehicle import Vehicle
 from environment.TrafficLight import TrafficLight
 from simulation.simulator import Simulator
-from concurrency.tasks import run_simulation_tasks
+from simulation.checkpoint import save_checkpoint, restore_checkpoint
+from concurrency.tasks import TickScheduler
+from concurrency.worker import SimulationWorker
 
-from distribution.rabbitmq_client import RabbitMQClient
+from distribution.rabbitmq_client import RabbitMQClient, EXCHANGE_ESTADO
 from distribution.protocolo        import (
-    mensaje_vehiculo_entrante,
     mensaje_estado_zona,
     mensaje_ack,
+    LotesMigracion,
     TipoMensaje,
 )
-from distribution.migracion_utils  import destino_menos_cargado
-from distribution.message_models   import Mensaje
+from distribution.migracion_utils  import ClienteCoordinador, VistaCluster
+from distribution.codec            import Negociacion, FORMATOS_SOPORTADOS
+from distribution.message_models   import Mensaje, VehiculosColumnas
 
 import performance.metrics as metrics
 
@@ -36,10 +44,21 @@ import performance.metrics as metrics
 NOMBRE_ZONA      = "zona_distribuida"
 QUEUE_PROPIA     = f"{NOMBRE_ZONA}_queue"
 LIMITE_X_POSITIVO = 100.0          # criterio de salida de zona
+# Semiplano x ≥ LIMITE_X_POSITIVO: consulta a la rejilla de vehículos
+ZONA_SALIDA       = (LIMITE_X_POSITIVO, -math.inf, math.inf, math.inf)
 COORD_URL         = "http://localhost:8000"
 HB_SEC            = 5
-ESTADO_SEC        = 5
+TICK_SEC          = 0.5            # intervalo objetivo entre ticks
+TICK_EPOCH        = 0.0            # rejilla de ticks común a todas las zonas
+TICK_WARP         = 1.0            # factor de aceleración (10 = 10× tiempo real)
+INSTRUMENTAR_TICK = True           # histogramas por fase en Prometheus
+CHECKPOINT_PATH   = f"{NOMBRE_ZONA}.ckpt"
+CHECKPOINT_SEC    = 30
+ESTADO_SEC        = 2              # periodo de difusión del estado de zona
+ESTADO_CADUCA     = 5 * ESTADO_SEC # zona sin noticias → fuera del balanceo
 MIGRA_SEC         = 1
+# Codificación preferida al enviar (binario; ver `distribution.codec`)
+FORMATOS_PREFERIDOS = FORMATOS_SOPORTADOS
 # ─────────────────────────────────────────────────────────
 
 logging.basicConfig(level=logging.INFO, format="%(name)s | %(message)s")
@@ -49,22 +68,25 @@ _LOG = logging.getLogger(NOMBRE_ZONA)
 # ╔════════════════════════════════════════════════════════╗
 #  Coordinador: registro + heart-beats
 # ╚════════════════════════════════════════════════════════╝
-async def registrar(ciudad: City) -> None:
+async def registrar(ciudad: City, coord: ClienteCoordinador) -> None:
     payload = dict(
         zona=ciudad.name,
         queue=QUEUE_PROPIA,
-        vehiculos=len(ciudad.vehicles),
+        vehiculos=ciudad.vehicle_count,
         trafico="MODERADO",
     )
-    async with httpx.AsyncClient(timeout=5) as cli:
-        await cli.post(f"{COORD_URL}/register", json=payload)
+    await coord.registrar(payload)
     _LOG.info("Nodo %s registrado en el Coordinador.", ciudad.name)
 
 
-async def heartbeat(ciudad: City) -> None:
+def _nivel_trafico(veh: int) -> str:
+    return "BAJO" if veh < 20 else ("ALTO" if veh > 50 else "MODERADO")
+
+
+async def heartbeat(ciudad: City, coord: ClienteCoordinador) -> None:
     while True:
-        veh = len(ciudad.vehicles)
-        traf = "BAJO" if veh < 20 else ("ALTO" if veh > 50 else "MODERADO")
+        veh = ciudad.vehicle_count
+        traf = _nivel_trafico(veh)
 
         payload = dict(
             zona=ciudad.name,
@@ -73,8 +95,7 @@ async def heartbeat(ciudad: City) -> None:
             trafico=traf,
         )
         try:
-            async with httpx.AsyncClient(timeout=5) as cli:
-                await cli.post(f"{COORD_URL}/heartbeat", json=payload)
+            await coord.heartbeat(payload)
         except Exception as exc:
             _LOG.warning("HB error: %s", exc)
 
@@ -86,7 +107,12 @@ async def heartbeat(ciudad: City) -> None:
 # ╔════════════════════════════════════════════════════════╗
 #  RabbitMQ handlers
 # ╚════════════════════════════════════════════════════════╝
-async def on_vehicle(m: Mensaje, ciudad: City, rabbit: RabbitMQClient):
+# Formato (JSON / binario) que acepta cada zona, según sus ACK
+NEGOCIACION = Negociacion(FORMATOS_PREFERIDOS)
+
+
+async def on_vehicle(m: Mensaje, ciudad: City, worker: SimulationWorker,
+                     rabbit: RabbitMQClient):
     d = m.datos
     v = Vehicle(
         id_=d.id,
@@ -94,60 +120,158 @@ async def on_vehicle(m: Mensaje, ciudad: City, rabbit: RabbitMQClient):
         speed=d.velocidad,
         direction=d.direccion,
     )
-    ciudad.add_vehicle(v)
+    # El hilo de simulación lo da de alta antes del siguiente tick; una
+    # reentrega de una migración ya aplicada se ignora allí (mismo id).
+    worker.add_vehicles([v])
     _LOG.info("Vehículo %s integrado.", v.id_)
 
-    ack = mensaje_ack(acked_id=m.id, origen=ciudad.name, destino=m.origen)
+    ack = mensaje_ack(acked_id=m.id, origen=ciudad.name, destino=m.origen,
+                      formatos=list(FORMATOS_SOPORTADOS))
+    await rabbit.send_message(ack, queue_name=f"{m.origen}_queue")
+
+
+async def on_vehicles(m: Mensaje, ciudad: City, worker: SimulationWorker,
+                      rabbit: RabbitMQClient):
+    """Lote de migración: un alta en bloque y un único ACK."""
+    lote = m.datos.vehiculos
+    if isinstance(lote, VehiculosColumnas):     # binario: sin un modelo por vehículo
+        nuevos = [Vehicle(id_, posicion, velocidad, direccion)
+                  for id_, posicion, velocidad, direccion in lote.filas()]
+    else:
+        nuevos = [
+            Vehicle(id_=d.id, position=tuple(d.posicion), speed=d.velocidad, direction=d.direccion)
+            for d in lote
+        ]
+    # Todos los lotes recibidos entre dos ticks entran juntos en el
+    # siguiente (el worker vacía su cola de entrada antes de cada tick)
+    worker.add_vehicles(nuevos)
+    _LOG.info("%d vehículos integrados desde %s.", len(nuevos), m.origen)
+
+    ack = mensaje_ack(acked_id=m.id, origen=ciudad.name, destino=m.origen,
+                      cantidad=len(nuevos), formatos=list(FORMATOS_SOPORTADOS))
     await rabbit.send_message(ack, queue_name=f"{m.origen}_queue")
 
 
+async def on_ack(m: Mensaje):
+    """Los ACK anuncian qué codificaciones acepta la zona que confirma."""
+    NEGOCIACION.anunciado(m.origen, m.datos.formatos)
+
+
+async def on_estado(m: Mensaje, vista: VistaCluster):
+    """Estado difundido por una zona (también el propio): una entrada de la tabla."""
+    d = m.datos
+    vista.aplicar(d.zona, d.vehiculos, trafico=d.trafico)
+
+
 # ╔════════════════════════════════════════════════════════╗
 #  Migraciones salientes  (← aquí estaba el AttributeError)
 # ╚════════════════════════════════════════════════════════╝
-async def revisar_migraciones(ciudad: City, rabbit: RabbitMQClient):
+def _sale_de_zona(v: Vehicle) -> bool:
+    return v.x > LIMITE_X_POSITIVO
+
+
+def _contar_salientes(sim: Simulator) -> int:
+    return sum(1 for v in sim.vehicle_index.query_bbox(*ZONA_SALIDA) if _sale_de_zona(v))
+
+
+async def revisar_migraciones(ciudad: City, worker: SimulationWorker,
+                              rabbit: RabbitMQClient, vista: VistaCluster):
+    lotes = LotesMigracion()
     while True:
-        # ciudad.vehicles es LISTA, no dict → iteramos directamente
-        salir: List[Vehicle] = [
-            v for v in ciudad.vehicles if v.position[0] > LIMITE_X_POSITIVO
-        ]
-        if salir:
-            destino = await destino_menos_cargado(excluir=[ciudad.name])
+        pendientes = await worker.acall(_contar_salientes)
+        if pendientes:
+            # Consulta en memoria a la tabla que mantiene la difusión
+            destino = vista.menos_cargado(excluir=[ciudad.name])
             if destino:
+                # Baja en bloque en el hilo de simulación; llegan copias
+                salir: List[Vehicle] = await asyncio.wrap_future(
+                    worker.extract_vehicles(_sale_de_zona, bbox=ZONA_SALIDA)
+                )
                 for v in salir:
-                    ciudad.remove_vehicle(v.id_)
-                    msg = mensaje_vehiculo_entrante(
-                        vehiculo=dict(
-                            id=v.id_,
-                            posicion=list(v.position),
-                            velocidad=v.speed,
-                            direccion=v.direction,
-                        ),
-                        origen=ciudad.name,
-                        destino=destino,
-                    )
-                    await rabbit.send_message(msg, queue_name=f"{destino}_queue")
-                    _LOG.info("Vehículo %s migrado → %s", v.id_, destino)
+                    lotes.agregar(destino, dict(
+                        id=v.id_,
+                        posicion=[v.x, v.y],
+                        velocidad=v.speed,
+                        direccion=v.direction.name,
+                    ))
+                por_id = {v.id_: v for v in salir}
+                # Un mensaje (y un ACK) por destino y ventana
+                for dest, msg in lotes.mensajes(ciudad.name):
+                    try:
+                        await rabbit.send_message(msg, queue_name=f"{dest}_queue",
+                                                  formato=NEGOCIACION.formato(dest))
+                    except Exception as exc:
+                        # Agotados los reintentos: el lote vuelve a la
+                        # simulación y se intentará en la próxima pasada
+                        devueltos = [por_id[d["id"]] for d in msg["datos"]["vehiculos"]]
+                        worker.add_vehicles(devueltos)
+                        _LOG.warning("No pude migrar %d vehículos → %s (%s); reintegrados.",
+                                     len(devueltos), dest, exc)
+                        continue
+                    vista.anotar(dest, len(msg["datos"]["vehiculos"]))
+                    _LOG.info("%d vehículos migrados → %s",
+                              len(msg["datos"]["vehiculos"]), dest)
             else:
-                _LOG.warning("Sin destino HEALTHY; %d veh retenidos.", len(salir))
+                _LOG.warning("Sin destino HEALTHY; %d veh retenidos.", pendientes)
         await asyncio.sleep(MIGRA_SEC)
 
 
 # ╔════════════════════════════════════════════════════════╗
-#  Publicar estado periódico
+#  Difundir estado periódico
 # ╚════════════════════════════════════════════════════════╝
 async def publicar_estado(ciudad: City, rabbit: RabbitMQClient):
     while True:
+        veh = ciudad.vehicle_count
         estado = dict(
             zona=ciudad.name,
-            vehiculos=len(ciudad.vehicles),
-            trafico="MODERADO",
+            vehiculos=veh,
+            trafico=_nivel_trafico(veh),
             timestamp=time.time(),
         )
-        msg = mensaje_estado_zona(datos=estado, origen=ciudad.name, destino="zona_central")        
-        await rabbit.send_message(msg, queue_name="zona_central_queue")
+        msg = mensaje_estado_zona(datos=estado, origen=ciudad.name, destino=EXCHANGE_ESTADO)
+        # Todo suscriptor de la difusión es de esta versión y acepta
+        # cualquier formato.  Un estado que nadie ha leído antes del
+        # siguiente ya no sirve.
+        try:
+            await rabbit.broadcast(msg, formato=FORMATOS_PREFERIDOS[0], expiracion=ESTADO_SEC)
+        except Exception as exc:
+            _LOG.warning("No pude difundir el estado: %s", exc)
         await asyncio.sleep(ESTADO_SEC)
 
 
+# ╔════════════════════════════════════════════════════════╗
+#  Checkpoints
+# ╚════════════════════════════════════════════════════════╝
+def reanudar(sim: Simulator) -> None:
+    if not os.path.exists(CHECKPOINT_PATH):
+        return
+    t0 = time.perf_counter()
+    try:
+        nveh, ntl = restore_checkpoint(sim, CHECKPOINT_PATH)
+    except Exception as exc:
+        _LOG.warning("Checkpoint inválido, arranque en frío: %s", exc)
+        return
+    _LOG.info(
+        "Reanudado desde %s: %d vehículos, %d semáforos, frame %d (%.1f ms).",
+        CHECKPOINT_PATH, nveh, ntl, sim.frame_count,
+        1e3 * (time.perf_counter() - t0),
+    )
+
+
+def guardar(sim: Simulator) -> None:
+    try:
+        nbytes = save_checkpoint(sim, CHECKPOINT_PATH)
+        _LOG.debug("Checkpoint guardado (%d bytes).", nbytes)
+    except Exception as exc:
+        _LOG.warning("No pude guardar el checkpoint: %s", exc)
+
+
+async def checkpoints_periodicos(worker: SimulationWorker):
+    while True:
+        await asyncio.sleep(CHECKPOINT_SEC)
+        await worker.acall(guardar)
+
+
 # ╔════════════════════════════════════════════════════════╗
 #  Main
 # ╚════════════════════════════════════════════════════════╝
@@ -159,7 +283,14 @@ async def main():
 
     # 2. Simulador
     sim = Simulator(ciudad)
-    sim_tasks = run_simulation_tasks(sim, update_interval=0.5)
+    reanudar(sim)
+    if INSTRUMENTAR_TICK:
+        sim.instrument(metrics.TickObserver(ciudad.name, intervalo=TICK_SEC / TICK_WARP))
+    reloj = TickScheduler(TICK_SEC, warp=TICK_WARP, epoch=TICK_EPOCH)
+    worker = SimulationWorker(
+        sim, scheduler=reloj,
+        on_tick=metrics.SchedulerObserver(ciudad.name, reloj),
+    ).start()
 
     # 3. Métricas Prometheus
     metrics.start_metrics_server(port=9200)
@@ -168,20 +299,38 @@ async def main():
     rabbit = RabbitMQClient(prefetch=5)
     await rabbit.connect()
     handlers = {
-        TipoMensaje.VEHICULO_ENTRANTE.value: lambda m: on_vehicle(m, ciudad, rabbit)
+        TipoMensaje.VEHICULO_ENTRANTE.value: lambda m: on_vehicle(m, ciudad, worker, rabbit),
+        TipoMensaje.VEHICULOS_ENTRANTES.value: lambda m: on_vehicles(m, ciudad, worker, rabbit),
+        TipoMensaje.ACK.value: on_ack,
     }
     consumer = asyncio.create_task(rabbit.start_consumer(QUEUE_PROPIA, handlers))
 
-    # 5. Registro y tareas auxiliares
-    await registrar(ciudad)
+    # 5. Coordinador: un cliente HTTP para todo el nodo
+    coord = ClienteCoordinador(COORD_URL)
+    await registrar(ciudad, coord)
 
-    await asyncio.gather(
-        *sim_tasks,
-        consumer,
-        heartbeat(ciudad),
-        publicar_estado(ciudad, rabbit),
-        revisar_migraciones(ciudad, rabbit),
-    )
+    # 6. Tabla del clúster: la difusión la mantiene al día; al Coordinador
+    #    solo se le pregunta una vez, para no arrancar con la tabla vacía
+    vista = VistaCluster(coord, ttl=ESTADO_SEC, max_edad=ESTADO_CADUCA)
+    difusion = asyncio.create_task(rabbit.start_broadcast_consumer(
+        {TipoMensaje.ESTADO_ZONA.value: lambda m: on_estado(m, vista)}
+    ))
+    await vista.refrescar()
+
+    try:
+        await asyncio.gather(
+            consumer,
+            difusion,
+            heartbeat(ciudad, coord),
+            publicar_estado(ciudad, rabbit),
+            revisar_migraciones(ciudad, worker, rabbit, vista),
+            checkpoints_periodicos(worker),
+        )
+    finally:
+        # Con el hilo ya parado, el checkpoint final es consistente
+        worker.stop()
+        guardar(sim)
+        await coord.cerrar()
 
 
 if __name__ == "__main__":
@@ -2,6 +2,13 @@
 
 import asyncio
 
+from environment.light_scheduler import LightScheduler
+from environment.snapshot import SnapshotTracker
+
+# Cambios de vehículos que se recuerdan para `vehicle_changes`
+MAX_CAMBIOS = 64
+
+
 class City:
     """
     Clase que representa la ciudad que contiene semáforos, vehículos,
@@ -10,17 +17,152 @@ class City:
     def __init__(self, name: str):
         self.name = name
         self.traffic_lights = []
-        self.vehicles = []
         self.intersections = []
+        # Registro de vehículos por id (conserva el orden de alta) y su
+        # vista en lista, que se regenera solo tras altas/bajas.
+        self._vehicles = {}
+        self._vehicles_list = []
+        # Se incrementa con cada alta o baja de vehículos; permite a los
+        # motores vectorizados detectar cambios sin recorrer la lista.
+        self.vehicles_version = 0
+        # Últimos cambios (versión, quitados, añadidos), para que quien
+        # se quedó en una versión reciente aplique solo la diferencia
+        self._cambios = []
+        # Ídem para semáforos e intersecciones (trazado estático)
+        self.layout_version = 0
+        self._snapshots = SnapshotTracker()
 
     def add_traffic_light(self, traffic_light):
         self.traffic_lights.append(traffic_light)
+        self.layout_version += 1
+
+    def add_traffic_lights(self, traffic_lights):
+        """Alta en bloque (un único cambio de `layout_version`)."""
+        antes = len(self.traffic_lights)
+        self.traffic_lights.extend(traffic_lights)
+        if len(self.traffic_lights) != antes:
+            self.layout_version += 1
+
+    # -------------------------------------------------------
+    #  Registro de vehículos
+    # -------------------------------------------------------
+    @property
+    def vehicles(self):
+        """
+        Vehículos en orden de alta.  La lista no se modifica en el sitio:
+        tras un alta o baja se sustituye por otra nueva, así que quien la
+        esté recorriendo (simulador, GUI, snapshots) no ve cambios a mitad.
+        """
+        lista = self._vehicles_list
+        if lista is None:
+            lista = self._vehicles_list = list(self._vehicles.values())
+        return lista
+
+    @property
+    def vehicle_count(self):
+        """Número de vehículos (seguro desde cualquier hilo)."""
+        return len(self._vehicles)
+
+    def _changed(self, quitados=(), anadidos=()):
+        self._vehicles_list = None
+        self.vehicles_version += 1
+        cambios = self._cambios
+        cambios.append((self.vehicles_version, quitados, anadidos))
+        if len(cambios) > MAX_CAMBIOS:
+            del cambios[0]
+
+    def vehicle_changes(self, since):
+        """
+        (quitados, añadidos) desde la versión `since`, en orden, o None
+        si el registro de cambios no llega tan atrás (hay que recorrer
+        `vehicles` entera).  Un mismo vehículo puede salir en ambas
+        listas; lo que cuenta es si sigue dado de alta.
+        """
+        if since == self.vehicles_version:
+            return [], []
+        cambios = self._cambios
+        if since is None or not cambios or cambios[0][0] > since + 1:
+            return None
+        quitados, anadidos = [], []
+        for version, q, a in cambios:
+            if version > since:
+                quitados.extend(q)
+                anadidos.extend(a)
+        return quitados, anadidos
+
+    def get_vehicle(self, id_):
+        """Vehículo con ese id, o None."""
+        return self._vehicles.get(id_)
 
     def add_vehicle(self, vehicle):
-        self.vehicles.append(vehicle)
+        """
+        Da de alta el vehículo.  Si ya hay uno con el mismo id (p. ej. una
+        migración reentregada) no hace nada y devuelve False.
+        """
+        if vehicle.id_ in self._vehicles:
+            return False
+        self._vehicles[vehicle.id_] = vehicle
+        self._changed(anadidos=(vehicle,))
+        return True
+
+    def add_vehicles(self, vehicles):
+        """Alta en bloque; devuelve cuántos vehículos eran nuevos."""
+        registro = self._vehicles
+        nuevos = []
+        for v in vehicles:
+            if v.id_ not in registro:
+                registro[v.id_] = v
+                nuevos.append(v)
+        if nuevos:
+            self._changed(anadidos=nuevos)
+        return len(nuevos)
+
+    def remove_vehicle(self, id_):
+        """Da de baja el vehículo y lo devuelve (None si no existía)."""
+        v = self._vehicles.pop(id_, None)
+        if v is not None:
+            self._changed(quitados=(v,))
+        return v
+
+    def remove_vehicles(self, ids):
+        """Baja en bloque; devuelve la lista de vehículos eliminados."""
+        registro = self._vehicles
+        quitados = [v for v in (registro.pop(i, None) for i in ids) if v is not None]
+        if quitados:
+            self._changed(quitados=quitados)
+        return quitados
+
+    def replace_vehicles(self, vehicles):
+        """
+        Sustituye de golpe todos los vehículos (p. ej. al restaurar un
+        checkpoint).
+        """
+        self._vehicles = {v.id_: v for v in vehicles}
+        self._changed()
+        self._cambios.clear()           # no hay diferencia que aplicar
+
+    def swap_vehicles(self, vehicles):
+        """
+        Sustituye cada vehículo dado de alta por otro objeto con el mismo
+        id, en la misma posición (p. ej. el motor NumPy cambia `Vehicle`
+        por su `VehicleView`).
+        """
+        registro = self._vehicles
+        antiguos = [registro[v.id_] for v in vehicles]
+        for v in vehicles:
+            registro[v.id_] = v
+        self._changed(antiguos, vehicles)
 
     def add_intersection(self, intersection):
         self.intersections.append(intersection)
+        self.layout_version += 1
+
+    def add_intersections(self, intersections):
+        """Alta en bloque (un único cambio de `layout_version`)."""
+        antes = len(self.intersections)
+        self.intersections.extend(intersections)
+        if len(self.intersections) != antes:
+            self.layout_version += 1
 
     async def run_simulation(self, tick_interval=1.0, duration=10):
         """
@@ -29,10 +171,13 @@ class City:
         """
         print(f"[{self.name}] Iniciando simulación con {len(self.traffic_lights)} semáforos...")
         ticks = int(duration / tick_interval)
-        for _ in range(ticks):
-            for tl in self.traffic_lights:
-                tl.update_state()
+        scheduler = LightScheduler(period=1)
+        for tl in self.traffic_lights:
+            scheduler.add(tl)
+        for tick in range(1, ticks + 1):
+            scheduler.advance(tick)
             await asyncio.sleep(tick_interval)
+        scheduler.sync()
 
     def get_state_summary(self):
         """
@@ -55,7 +200,7 @@ class City:
                     "id": tl.id_,
                     "x": tl.x,
                     "y": tl.y,
-                    "estado": tl.current_state
+                    "estado": tl.current_state.name
                 })
             except:
                 pass  # Si el semáforo no tiene posición, se ignora
@@ -64,10 +209,11 @@ class City:
         for v in self.vehicles:
             vehicles_info.append({
                 "id": v.id_,
-                "x": v.position[0],
-                "y": v.position[1],
+                "x": v.x,
+                "y": v.y,
                 "speed": v.speed,
-                "direction": v.direction
+                "direction": v.direction.name,
+                "moving": v.moving
             })
 
         intersections_info = []
@@ -87,5 +233,16 @@ class City:
             "intersections": intersections_info
         }
 
+    def get_snapshot_delta(self, since=None, columnas=None):
+        """
+        Snapshot versionado e incremental: solo lo que ha cambiado desde
+        la versión `since` (vehículos movidos, altas y bajas, cambios de
+        semáforo).  El trazado estático se incluye en "layout" la primera
+        vez (since=None) o cuando se añaden semáforos/intersecciones.
+        `columnas`: (x, y, speed, dir, moving) de `vehicles` en arrays,
+        si ya se tienen (motor NumPy); si no, se leen vehículo a vehículo.
+        """
+        return self._snapshots.delta(self, since, columnas)
+
     def __str__(self):
         return f"City: {self.name}, TrafficLights: {len(self.traffic_lights)}, Vehicles: {len(self.vehicles)}, Intersections: {len(self.intersections)}"
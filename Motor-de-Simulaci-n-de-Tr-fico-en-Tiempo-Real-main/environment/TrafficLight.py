@@ -1,9 +1,19 @@
 # simulacion_trafico/entorno/traffic_light.py
 
+from environment.enums import LightState
+
+RED, YELLOW, GREEN = LightState
+
+
 class TrafficLight:
     """
     Clase que modela un semáforo con tiempos específicos para cada estado.
+    `current_state` es un `LightState` (al asignar se acepta también el
+    nombre, "RED"…, o el código); el nombre solo se usa al serializar.
     """
+    __slots__ = ("id_", "x", "y", "green_time", "yellow_time", "red_time",
+                 "_current_state", "timer")
+
     def __init__(self, id_, x=0, y=0, green_time=10, yellow_time=3, red_time=10):
         self.id_ = id_
         self.x = x
@@ -11,23 +21,65 @@ class TrafficLight:
         self.green_time = green_time
         self.yellow_time = yellow_time
         self.red_time = red_time
-        self.current_state = "RED"  # Estado inicial
+        self.current_state = RED  # Estado inicial
         self.timer = 0  # Contador interno para el cambio de estado
 
+    @property
+    def current_state(self):
+        return self._current_state
+
+    @current_state.setter
+    def current_state(self, value):
+        self._current_state = (value if value.__class__ is LightState
+                               else LightState.parse(value))
+
     def update_state(self):
         """
         Cambia el estado del semáforo en función del tiempo transcurrido.
         """
         self.timer += 1
-        if self.current_state == "GREEN":
+        if self.current_state == GREEN:
             if self.timer >= self.green_time:
-                self._change_state("YELLOW")
-        elif self.current_state == "YELLOW":
+                self._change_state(YELLOW)
+        elif self.current_state == YELLOW:
             if self.timer >= self.yellow_time:
-                self._change_state("RED")
-        elif self.current_state == "RED":
+                self._change_state(RED)
+        elif self.current_state == RED:
             if self.timer >= self.red_time:
-                self._change_state("GREEN")
+                self._change_state(GREEN)
+
+    def _duration(self):
+        if self.current_state == GREEN:
+            return self.green_time
+        elif self.current_state == YELLOW:
+            return self.yellow_time
+        elif self.current_state == RED:
+            return self.red_time
+        return None
+
+    def steps_to_change(self):
+        """
+        Número de llamadas a `update_state` que faltan para el próximo
+        cambio de color (None si el estado no tiene ciclo).
+        """
+        dur = self._duration()
+        if dur is None:
+            return None
+        return max(1, dur - self.timer)
+
+    def advance(self, steps):
+        """
+        Equivale a llamar `steps` veces a `update_state`, pero en tiempo
+        proporcional al número de cambios de color y no de pasos.
+        """
+        while steps > 0:
+            restantes = self.steps_to_change()
+            if restantes is None or steps < restantes:
+                self.timer += steps
+                return
+            steps -= restantes
+            self.timer += restantes - 1
+            self.update_state()
 
     def _change_state(self, new_state):
         self.current_state = new_state
@@ -35,11 +87,11 @@ class TrafficLight:
 
     @property
     def color(self):
-        if self.current_state == "GREEN":
+        if self.current_state == GREEN:
             return (0, 255, 0)
-        elif self.current_state == "YELLOW":
+        elif self.current_state == YELLOW:
             return (255, 255, 0)
         return (255, 0, 0)
 
     def __str__(self):
-        return f"TrafficLight {self.id_} - State: {self.current_state}"
+        return f"TrafficLight {self.id_} - State: {self.current_state.name}"
@@ -1,28 +1,62 @@
 # simulacion_trafico/entorno/vehicle.py
 
+from environment.enums import Direction
+
+NORTE, SUR, ESTE, OESTE = Direction
+
+
 class Vehicle:
     """
     Modela el comportamiento de un vehículo:
     posición, velocidad, dirección y estado de movimiento.
+
+    Representación compacta: `__slots__`, coordenadas `x`/`y` que se
+    actualizan in situ y dirección como `Direction` (al construir o
+    asignar se aceptan también los nombres "NORTE", "ESTE"… y códigos).
+
+    `route` es la ruta en curso (`simulation.routing.Route`) o None para
+    circular girando al azar.
     """
+    __slots__ = ("id_", "x", "y", "speed", "_direction", "moving", "route")
+
     def __init__(self, id_, position=(0, 0), speed=0.0, direction="NORTE"):
         self.id_ = id_
-        self.position = position
+        self.x, self.y = position
         self.speed = speed
         self.direction = direction
         self.moving = True
+        self.route = None
+
+    @property
+    def direction(self):
+        return self._direction
+
+    @direction.setter
+    def direction(self, value):
+        # Un nombre ("SUR") sin convertir no coincidiría con ningún
+        # sentido en `move()`: se normaliza siempre al asignar
+        self._direction = value if value.__class__ is Direction else Direction.parse(value)
+
+    @property
+    def position(self):
+        return (self.x, self.y)
+
+    @position.setter
+    def position(self, value):
+        self.x, self.y = value
 
-    def move(self):
-        x, y = self.position
-        if self.direction == "NORTE":
-            y += self.speed
-        elif self.direction == "SUR":
-            y -= self.speed
-        elif self.direction == "ESTE":
-            x += self.speed
-        elif self.direction == "OESTE":
-            x -= self.speed
-        self.position = (x, y)
+    def move(self, distance=None):
+        """Avanza `distance` (por defecto, `speed`) en su dirección."""
+        s = self.speed if distance is None else distance
+        d = self._direction
+        if d == NORTE:
+            self.y += s
+        elif d == SUR:
+            self.y -= s
+        elif d == ESTE:
+            self.x += s
+        else:
+            self.x -= s
 
     def __str__(self):
-        return f"Vehicle {self.id_} at {self.position}, dir={self.direction}, moving={self.moving}"
+        return f"Vehicle {self.id_} at {self.position}, dir={self.direction.name}, moving={self.moving}"
@@ -0,0 +1,47 @@
+# simulacion_trafico/environment/enums.py
+
+from enum import IntEnum
+
+
+class Direction(IntEnum):
+    """
+    Dirección de marcha.  Los códigos son estables: los usan el motor
+    vectorizado y el formato de checkpoint.  La forma textual ("NORTE"…)
+    solo se usa al serializar (`.name`).
+    """
+    NORTE = 0
+    SUR   = 1
+    ESTE  = 2
+    OESTE = 3
+
+    @property
+    def horizontal(self):
+        return self >= Direction.ESTE
+
+    @classmethod
+    def parse(cls, value):
+        """Acepta un miembro, su código o su nombre ("ESTE")."""
+        if isinstance(value, cls):
+            return value
+        try:
+            return cls[value] if isinstance(value, str) else cls(value)
+        except (KeyError, ValueError):
+            raise ValueError(f"Dirección desconocida: {value!r}") from None
+
+
+class LightState(IntEnum):
+    """
+    Estado de un semáforo (mismo criterio de códigos que `Direction`).
+    """
+    RED    = 0
+    YELLOW = 1
+    GREEN  = 2
+
+    @classmethod
+    def parse(cls, value):
+        if isinstance(value, cls):
+            return value
+        try:
+            return cls[value.upper()] if isinstance(value, str) else cls(value)
+        except (KeyError, ValueError):
+            raise ValueError(f"Estado de semáforo desconocido: {value!r}") from None
@@ -1,10 +1,14 @@
 
 # simulacion_trafico/entorno/intersection.py
 
+from environment.enums import LightState
+
 class Intersection:
     """
     Representa una intersección de la ciudad, controlada por uno o varios semáforos.
     """
+    __slots__ = ("id_", "location", "traffic_lights")
+
     def __init__(self, id_, location):
         self.id_ = id_
         self.location = location  # Ej: (x, y)
@@ -17,8 +21,8 @@ class Intersection:
         """
         Permite el paso si al menos un semáforo está en verde.
         """
-        return any(tl.current_state == "GREEN" for tl in self.traffic_lights)
+        return any(tl.current_state == LightState.GREEN for tl in self.traffic_lights)
 
     def __str__(self):
-        estados = ", ".join(f"{tl.id_}:{tl.current_state}" for tl in self.traffic_lights)
+        estados = ", ".join(f"{tl.id_}:{tl.current_state.name}" for tl in self.traffic_lights)
         return f"Intersection {self.id_} at {self.location} with TLs [{estados}]"
@@ -0,0 +1,112 @@
+# simulacion_trafico/environment/light_scheduler.py
+
+import heapq
+
+
+class LightScheduler:
+    """
+    Planificador de semáforos dirigido por eventos (min-heap).
+
+    Cada semáforo recibe un "paso" (`update_state`) cada `period` ticks,
+    desfasado `offset` ticks, exactamente como el bucle clásico
+
+        if (tick - offset) % period == 0: tl.update_state()
+
+    pero en lugar de visitar todos los semáforos en cada tick solo se
+    programa el tick en que cada uno cambia de color.  Los pasos
+    intermedios (que solo incrementan `timer`) se aplican de golpe al
+    llegar el cambio, así que entre cambios `timer` puede estar
+    atrasado; `sync()` lo pone al día cuando hace falta leerlo.
+
+    El estado inicial de cada semáforo se toma al llamar a `add()`;
+    no debe modificarse a mano mientras esté en el planificador.
+    """
+
+    def __init__(self, period=1, tick=0):
+        self.period = period
+        self.tick = tick
+        self._heap = []
+        self._pasos = {}        # tl -> pasos ya aplicados
+        self._offsets = {}      # tl -> primer tick con paso
+        self._seq = 0
+
+    # -------------------------------------------------------
+    def _primer_tick(self, offset):
+        r = offset % self.period
+        return r if r >= 1 else self.period
+
+    def _pasos_hasta(self, tl, tick):
+        """Pasos que le corresponden al semáforo en los ticks 1..tick."""
+        primero = self._offsets[tl]
+        return 0 if tick < primero else (tick - primero) // self.period + 1
+
+    def _programar(self, tl):
+        restantes = tl.steps_to_change()
+        if restantes is None:
+            return
+        paso = self._pasos[tl] + restantes
+        tick = self._offsets[tl] + (paso - 1) * self.period
+        self._seq += 1
+        heapq.heappush(self._heap, (tick, self._seq, tl))
+
+    # -------------------------------------------------------
+    def add(self, tl, offset=0):
+        """
+        Registra un semáforo.  Su estado actual se considera el
+        resultado de todos los pasos anteriores a `self.tick`.
+        """
+        self._offsets[tl] = self._primer_tick(offset)
+        self._pasos[tl] = self._pasos_hasta(tl, self.tick)
+        self._programar(tl)
+
+    def add_many(self, pares):
+        """
+        `add` para cada (semáforo, offset), en bloque: el montículo se
+        reconstruye una sola vez al final (ciudades con millones de
+        semáforos).
+        """
+        heap, offsets, hechos = self._heap, self._offsets, self._pasos
+        periodo, tick, seq = self.period, self.tick, self._seq
+        for tl, offset in pares:
+            r = offset % periodo
+            primero = r if r >= 1 else periodo
+            offsets[tl] = primero
+            pasos = 0 if tick < primero else (tick - primero) // periodo + 1
+            hechos[tl] = pasos
+            restantes = tl.steps_to_change()
+            if restantes is not None:
+                seq += 1
+                heap.append((primero + (pasos + restantes - 1) * periodo, seq, tl))
+        self._seq = seq
+        heapq.heapify(heap)
+
+    def advance(self, tick):
+        """
+        Avanza el reloj hasta `tick` y aplica los cambios de color
+        vencidos.  Devuelve la lista de semáforos que han cambiado.
+        """
+        self.tick = tick
+        cambiados = []
+        heap = self._heap
+        while heap and heap[0][0] <= tick:
+            t, _, tl = heapq.heappop(heap)
+            paso = (t - self._offsets[tl]) // self.period + 1
+            tl.advance(paso - self._pasos[tl])
+            self._pasos[tl] = paso
+            cambiados.append(tl)
+            self._programar(tl)
+        return cambiados
+
+    def sync(self):
+        """
+        Aplica a `timer` los pasos pendientes hasta el tick actual.
+        Coste O(semáforos); pensado para snapshots y checkpoints.
+        """
+        for tl, hechos in self._pasos.items():
+            pasos = self._pasos_hasta(tl, self.tick)
+            if pasos > hechos:
+                tl.advance(pasos - hechos)
+                self._pasos[tl] = pasos
+
+    def __len__(self):
+        return len(self._offsets)
@@ -0,0 +1,180 @@
+# simulacion_trafico/environment/snapshot.py
+
+import threading
+
+import numpy as np
+
+from environment.enums import Direction
+
+# Bajas de vehículos que se recuerdan; un consumidor más atrasado que
+# esto recibe un snapshot completo.
+MAX_BAJAS = 10_000
+
+_DIRECCIONES = tuple(d.name for d in Direction)
+_TIPOS = (np.float64, np.float64, np.float64, np.int8, np.bool_)
+
+
+def _columnas(vehs):
+    """(x, y, speed, dir, moving) de `vehs`, leyendo vehículo a vehículo."""
+    n = len(vehs)
+    return (
+        np.fromiter((v.x for v in vehs), np.float64, n),
+        np.fromiter((v.y for v in vehs), np.float64, n),
+        np.fromiter((v.speed for v in vehs), np.float64, n),
+        np.fromiter((v.direction for v in vehs), np.int8, n),
+        np.fromiter((v.moving for v in vehs), np.bool_, n),
+    )
+
+
+class SnapshotTracker:
+    """
+    Lleva la cuenta de qué ha cambiado en una ciudad entre versiones de
+    snapshot.  Cada entidad guarda la versión en que cambió por última
+    vez, de modo que `delta(since)` solo serializa lo posterior a `since`
+    (vehículos movidos o nuevos, semáforos que han cambiado de color,
+    vehículos eliminados) y el trazado estático solo viaja la primera vez
+    o cuando cambia.
+
+    El último estado visto de los vehículos se guarda en columnas
+    alineadas con `city.vehicles` y se compara en bloque; la
+    correspondencia id → fila solo se rehace cuando hay altas o bajas.
+
+    La versión solo avanza si hay cambios; varios consumidores pueden
+    pedir deltas desde versiones distintas.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._ids = []          # ids en el orden de city.vehicles
+        self._fila = {}         # id -> fila
+        self._cols = tuple(np.zeros(0, t) for t in _TIPOS)     # último estado visto
+        self._ver = np.zeros(0, np.int64)                       # versión de cada fila
+        self._tl = {}           # id -> [estado, versión]
+        self._bajas = []        # [(versión, id)]
+        self._suelo = 0         # deltas desde antes de aquí → completo
+        self._layout_visto = None
+        self._layout_version = 0
+        self._altas_visto = None    # city.vehicles_version ya revisada
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------
+    def _realinear(self, vehs, nueva):
+        """
+        Reordena las columnas al orden actual de `vehs` tras altas o
+        bajas.  Devuelve True si ha entrado o salido algún vehículo.
+        """
+        ids = [v.id_ for v in vehs]
+        n = len(ids)
+        fila = self._fila
+        previas = np.fromiter((fila.get(i, -1) for i in ids), np.intp, n)
+        siguen = previas >= 0
+        origen = previas[siguen]
+
+        cols = tuple(np.zeros(n, t) for t in _TIPOS)
+        for nueva_col, vieja in zip(cols, self._cols):
+            nueva_col[siguen] = vieja[origen]
+        ver = np.full(n, nueva, np.int64)       # las altas cuentan como cambio
+        ver[siguen] = self._ver[origen]
+
+        actuales = set(ids)
+        bajas = [i for i in self._ids if i not in actuales]
+        for id_ in bajas:
+            self._bajas.append((nueva, id_))
+        if len(self._bajas) > MAX_BAJAS:
+            corte = len(self._bajas) - MAX_BAJAS
+            self._suelo = self._bajas[corte - 1][0]
+            del self._bajas[:corte]
+
+        self._ids, self._cols, self._ver = ids, cols, ver
+        self._fila = {id_: k for k, id_ in enumerate(ids)}
+        return bool(bajas) or not siguen.all()
+
+    def _actualizar(self, city, columnas=None):
+        nueva = self.version + 1
+        cambios = False
+
+        if city.layout_version != self._layout_visto:
+            self._layout_visto = city.layout_version
+            self._layout_version = nueva
+            cambios = True
+
+        for tl in city.traffic_lights:
+            e = self._tl.get(tl.id_)
+            if e is None:
+                self._tl[tl.id_] = [tl.current_state.name, nueva]
+                cambios = True
+            elif e[0] != tl.current_state.name:
+                e[0], e[1] = tl.current_state.name, nueva
+                cambios = True
+
+        vehs = city.vehicles
+        # Bajas: solo hace falta buscarlas si ha habido altas/bajas
+        if city.vehicles_version != self._altas_visto or len(self._ids) != len(vehs):
+            self._altas_visto = city.vehicles_version
+            cambios |= self._realinear(vehs, nueva)
+
+        if columnas is None:
+            columnas = _columnas(vehs)
+        distinto = np.zeros(len(vehs), np.bool_)
+        for actual, vista in zip(columnas, self._cols):
+            distinto |= actual != vista
+        if distinto.any():
+            self._ver[distinto] = nueva
+            cambios = True
+        for actual, vista in zip(columnas, self._cols):
+            np.copyto(vista, actual, casting="unsafe")
+
+        if cambios:
+            self.version = nueva
+
+    # -------------------------------------------------------
+    def delta(self, city, since=None, columnas=None):
+        """
+        Devuelve los cambios posteriores a la versión `since`.  Con
+        `since=None` (o una versión ya olvidada) el resultado es completo
+        y `full` vale True.  `columnas` son las (x, y, speed, dir,
+        moving) de `city.vehicles` si quien llama ya las tiene en arrays.
+        """
+        with self._lock:
+            self._actualizar(city, columnas)
+            full = since is None or since < self._suelo or since > self.version
+            desde = -1 if full else since
+
+            res = {
+                "version": self.version,
+                "full": full,
+                "traffic_lights": [
+                    {"id": id_, "estado": e[0]}
+                    for id_, e in self._tl.items() if e[1] > desde
+                ],
+                "vehicles": self._vehiculos(desde),
+                # Un id dado de baja y vuelto a dar de alta después (p. ej.
+                # un vehículo que sale de la zona y regresa) ya viaja en
+                # `vehicles`: su entrada es posterior a la baja.
+                "removed_vehicles": (
+                    [] if full else [id_ for ver, id_ in self._bajas
+                                     if ver > desde and id_ not in self._fila]
+                ),
+            }
+            if self._layout_version > desde:
+                res["layout"] = {
+                    "traffic_lights": [
+                        {"id": tl.id_, "x": tl.x, "y": tl.y} for tl in city.traffic_lights
+                    ],
+                    "intersections": [
+                        {"id": ix.id_, "x": ix.location[0], "y": ix.location[1]}
+                        for ix in city.intersections
+                    ],
+                }
+            return res
+
+    def _vehiculos(self, desde):
+        """Vehículos cambiados después de la versión `desde`."""
+        filas = np.flatnonzero(self._ver > desde)
+        ids = self._ids
+        xs, ys, speeds, dirs, movs = (c[filas].tolist() for c in self._cols)
+        return [
+            {"id": ids[k], "x": x, "y": y, "speed": s, "direction": _DIRECCIONES[d],
+             "moving": m}
+            for k, x, y, s, d, m in zip(filas.tolist(), xs, ys, speeds, dirs, movs)
+        ]
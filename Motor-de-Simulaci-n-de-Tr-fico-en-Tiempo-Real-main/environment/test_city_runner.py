@@ -2,8 +2,8 @@
 # test_city_runner.py
 
 import asyncio
-from TrafficLight import TrafficLight
-from City import City
+from environment.TrafficLight import TrafficLight
+from environment.City import City
 
 async def main():
     # Crear instancia de la ciudad
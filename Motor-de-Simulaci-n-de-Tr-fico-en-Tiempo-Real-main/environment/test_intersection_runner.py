@@ -1,9 +1,9 @@
 # test_intersection_runner.py
 
 import asyncio
-from TrafficLight import TrafficLight
-from intersection import Intersection
-from City import City
+from environment.TrafficLight import TrafficLight
+from environment.intersection import Intersection
+from environment.City import City
 
 async def main():
     # Crear ciudad
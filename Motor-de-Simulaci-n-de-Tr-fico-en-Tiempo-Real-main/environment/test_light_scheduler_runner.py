@@ -0,0 +1,100 @@
+# test_light_scheduler_runner.py
+
+import random
+
+from environment.TrafficLight import TrafficLight
+from environment.enums import LightState
+from environment.light_scheduler import LightScheduler
+
+
+def _semaforos(rng, n):
+    """Pares de semáforos idénticos: uno para cada lado de la comparación."""
+    pares = []
+    for i in range(n):
+        tiempos = [rng.randint(1, 6) for _ in range(3)]
+        estado, timer = rng.choice(tuple(LightState)), rng.randrange(4)
+        par = []
+        for _ in range(2):
+            tl = TrafficLight(f"TL{i}", 0, 0, *tiempos)
+            tl.current_state, tl.timer = estado, timer
+            par.append(tl)
+        pares.append((tuple(par), rng.randrange(20)))
+    return pares
+
+
+def _estado(tl):
+    return tl.current_state, tl.timer
+
+
+def _comparar(seed, periodo, inicio, ticks, salto=1, bloque=False):
+    """
+    El planificador, avanzando de `salto` en `salto` ticks, frente al
+    bucle clásico que llama a `update_state` tick a tick.  Con `bloque`
+    los semáforos se dan de alta con `add_many`.
+    """
+    rng = random.Random(seed)
+    pares = _semaforos(rng, 40)
+    sched = LightScheduler(periodo, tick=inicio)
+    if bloque:
+        sched.add_many((tl, offset) for (_, tl), offset in pares)
+    else:
+        for (_, tl), offset in pares:
+            sched.add(tl, offset)
+
+    for tick in range(inicio + 1, inicio + ticks + 1):
+        cambiados = set()
+        for (ref, _), offset in pares:
+            if (tick - offset) % periodo == 0:
+                antes = ref.current_state
+                ref.update_state()
+                if ref.current_state != antes:
+                    cambiados.add(ref.id_)
+        if (tick - inicio) % salto:
+            continue
+        vistos = {tl.id_ for tl in sched.advance(tick)}
+        if salto == 1:
+            assert vistos == cambiados, (seed, tick)
+        for (ref, tl), _ in pares:
+            assert ref.current_state == tl.current_state, (seed, tick, ref.id_)
+        if tick % 17 == 0:
+            sched.sync()
+            for (ref, tl), _ in pares:
+                assert _estado(ref) == _estado(tl), (seed, tick, ref.id_)
+    sched.advance(inicio + ticks)
+    sched.sync()
+    for (ref, tl), _ in pares:
+        assert _estado(ref) == _estado(tl), (seed, ref.id_)
+
+
+# ─────────────────────────────────────────────────────
+def test_igual_que_tick_a_tick():
+    for seed in range(10):
+        for periodo in (1, 3, 7):
+            _comparar(seed, periodo, inicio=0, ticks=400)
+
+
+def test_reloj_que_no_empieza_en_cero():
+    for seed in range(5):
+        _comparar(seed, periodo=4, inicio=123, ticks=300)
+
+
+def test_avance_a_saltos():
+    for seed in range(5):
+        _comparar(seed, periodo=2, inicio=0, ticks=600, salto=9)
+
+
+def test_alta_en_bloque():
+    for seed in range(5):
+        _comparar(seed, periodo=3, inicio=0, ticks=300, bloque=True)
+        _comparar(seed, periodo=4, inicio=123, ticks=300, bloque=True)
+
+
+def main():
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("test_"):
+            prueba()
+            print(f"[OK] {nombre}")
+
+
+if __name__ == "__main__":
+    main()
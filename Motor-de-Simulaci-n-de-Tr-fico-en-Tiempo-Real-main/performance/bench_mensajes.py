@@ -0,0 +1,116 @@
+# simulacion_trafico/performance/bench_mensajes.py
+"""
+Micro-benchmark del consumidor de mensajes: mensajes/s decodificados y
+validados por tipo y formato.
+
+Para cada tipo de `distribution.protocolo` y cada formato que admite
+(JSON siempre, binario en migraciones y estado) mide:
+
+  • directo: `codec.decodificar_mensaje` (bytes → mensaje tipado en una
+    pasada; es lo que hace `RabbitMQClient`)
+  • dict:    `json.loads` + validación desde dict, el camino anterior,
+    como referencia (solo JSON)
+  • vehiculos: decodificar y crear los `Vehicle` del lote, lo que hace
+    el consumidor de migraciones (solo lotes); `us_vehiculo` da el coste
+    por vehículo
+
+    python -m performance.bench_mensajes --n 20000 --lote 100
+"""
+
+import argparse
+import json
+import time
+
+from distribution.protocolo import (
+    mensaje_vehiculo_entrante,
+    mensaje_vehiculos_entrantes,
+    mensaje_estado_zona,
+    mensaje_ack,
+)
+from distribution.codec import codificar, decodificar_mensaje, FORMATOS_SOPORTADOS
+from distribution.message_models import validar, VehiculosColumnas
+from environment.Vehicle import Vehicle
+
+VEHICULO = {"id": "V-BENCH", "posicion": [20.0, 5.0], "velocidad": 1.2, "direccion": "ESTE"}
+
+
+def muestras(lote):
+    """Mensaje de ejemplo por tipo (nombre → dict)."""
+    return {
+        "VEHICULO_ENTRANTE": mensaje_vehiculo_entrante(VEHICULO, origen="a", destino="b"),
+        f"VEHICULOS_ENTRANTES[{lote}]": mensaje_vehiculos_entrantes(
+            [dict(VEHICULO, id=f"V-BENCH-{i}") for i in range(lote)], origen="a", destino="b"),
+        "ESTADO_ZONA": mensaje_estado_zona(
+            {"zona": "a", "vehiculos": 42, "trafico": "MODERADO", "timestamp": time.time()},
+            origen="a", destino="zona_central"),
+        "ACK": mensaje_ack("x", origen="b", destino="a", cantidad=lote,
+                           formatos=list(FORMATOS_SOPORTADOS)),
+    }
+
+
+def _vehiculos(mensaje):
+    """Vehículos del lote, como en `zona_distribuida_runner.on_vehicles`."""
+    lote = mensaje.datos.vehiculos
+    if isinstance(lote, VehiculosColumnas):
+        return [Vehicle(i, p, v, d) for i, p, v, d in lote.filas()]
+    return [Vehicle(d.id, tuple(d.posicion), d.velocidad, d.direccion) for d in lote]
+
+
+def _ritmo(fn, cuerpo, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(cuerpo)
+    return n / (time.perf_counter() - t0)
+
+
+def medir(n, lote):
+    """Lista de resultados {tipo, formato, camino, bytes, msg_s, us_vehiculo}."""
+    resultados = []
+    for tipo, mensaje in muestras(lote).items():
+        for formato in FORMATOS_SOPORTADOS:
+            cuerpo, content_type = codificar(mensaje, formato)
+            if formato == "bin" and content_type != "application/x-trafico-bin":
+                continue                    # sin representación binaria
+            caminos = {"directo": lambda c, ct=content_type: decodificar_mensaje(c, ct)}
+            if formato == "json":
+                caminos["dict"] = lambda c: validar(json.loads(c))
+            vehiculos = (len(mensaje["datos"]["vehiculos"])
+                         if mensaje["tipo"] == "VEHICULOS_ENTRANTES" else 0)
+            if vehiculos:
+                caminos["vehiculos"] = lambda c, ct=content_type: _vehiculos(
+                    decodificar_mensaje(c, ct))
+            for camino, fn in caminos.items():
+                fn(cuerpo)                  # calentamiento
+                msg_s = _ritmo(fn, cuerpo, n)
+                resultados.append({
+                    "tipo": tipo,
+                    "formato": formato,
+                    "camino": camino,
+                    "bytes": len(cuerpo),
+                    "msg_s": msg_s,
+                    "us_vehiculo": 1e6 / (msg_s * vehiculos) if vehiculos else None,
+                })
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mensajes/s del consumidor por tipo")
+    parser.add_argument("--n", type=int, default=20_000, help="Mensajes por medición")
+    parser.add_argument("--lote", type=int, default=100, help="Vehículos por lote")
+    parser.add_argument("--output", help="Guarda los resultados en este JSON")
+    args = parser.parse_args(argv)
+
+    resultados = medir(args.n, args.lote)
+    for r in resultados:
+        por_vehiculo = f"  {r['us_vehiculo']:6.2f} µs/veh" if r["us_vehiculo"] else ""
+        print(f"{r['tipo']:<26} {r['formato']:<4} {r['camino']:<9} "
+              f"{r['bytes']:7d} B  {r['msg_s']:12,.0f} msg/s{por_vehiculo}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"n": args.n, "lote": args.lote, "resultados": resultados}, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+# simulacion_trafico/performance/benchmark.py
+"""
+Banco de pruebas del camino crítico de la simulación.
+
+Construye cuadrículas sintéticas con los mismos elementos que
+`GUISimulation.__init__` (TrafficLight + Intersection en cada cruce,
+Vehicle sobre las carreteras) y barre nº de vehículos × nº de semáforos
+midiendo, por configuración:
+
+  • tiempo por tick total y por fase de `Simulator.update`
+  • memoria reservada por tick (pico de tracemalloc) y bloques netos
+  • coste de `City.get_snapshot`
+  • coste por vehículo del camino de mensajes de `distribution`
+    (crear mensaje → JSON → validación Pydantic)
+
+Cada tiempo se mide en `--repeticiones` bloques; se guardan la mediana
+(lo que se informa) y el mínimo (lo menos afectado por el ruido de la
+máquina).  Ver `comparar` y `confirmar` para la comparación.
+
+Los resultados se guardan en JSON para compararlos con una línea base:
+
+    python -m performance.benchmark --output performance/baseline.json
+    python -m performance.benchmark --compare performance/baseline.json
+
+Una métrica es regresión si empeora más que la tolerancia relativa *y*
+más que un suelo absoluto de ruido (`PISOS`), para que las fases de
+microsegundos no den falsas alarmas.
+"""
+
+import argparse
+import gc
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from environment.City import City
+from environment.enums import Direction, LightState
+from environment.Vehicle import Vehicle
+from environment.TrafficLight import TrafficLight
+from environment.intersection import Intersection
+from simulation.simulator import Simulator, PHASES
+
+VEHICULOS = (10, 100, 1_000, 10_000, 100_000)
+SEMAFOROS = (4, 100, 1_000, 10_000)
+DIRECCIONES = tuple(Direction)
+
+# Suelo de ruido por tipo de métrica: por debajo de esta diferencia
+# absoluta no se considera regresión aunque supere la tolerancia
+PISOS = {
+    "tiempo": 50e-6,            # s por tick, fase o snapshot
+    "mensaje": 0.5e-6,          # s por vehículo / mensaje
+    "bytes": 16 * 1024,         # pico de memoria por tick
+    "bloques": 64,              # bloques netos por tick
+}
+
+
+# ─────────────────────────────────────────────────────────────
+# 1)  ESCENARIOS SINTÉTICOS
+# ─────────────────────────────────────────────────────────────
+def build_grid(n_lights, n_vehicles, spacing=200, seed=0):
+    """
+    Ciudad en cuadrícula con ~`n_lights` cruces (semáforo + intersección
+    en cada uno) y `n_vehicles` vehículos repartidos por las carreteras.
+    """
+    rng = random.Random(seed)
+    cols = max(2, round(math.sqrt(n_lights)))
+    rows = max(2, math.ceil(n_lights / cols))
+    xs = [spacing * (c + 1) for c in range(cols)]
+    ys = [spacing * (r + 1) for r in range(rows)]
+
+    city = City(name=f"bench-{n_lights}x{n_vehicles}")
+    idx = 1
+    for y in ys:
+        for x in xs:
+            if idx > n_lights:
+                break
+            tl = TrafficLight(id_=f"T{idx}", x=x, y=y,
+                              green_time=3, yellow_time=1, red_time=3)
+            tl.current_state = LightState.GREEN if idx % 2 == 0 else LightState.RED
+            city.add_traffic_light(tl)
+            city.add_intersection(Intersection(id_=f"I{idx}", location=(x, y)))
+            idx += 1
+
+    vehs = []
+    for i in range(n_vehicles):
+        d = rng.choice(DIRECCIONES)
+        if d.horizontal:
+            pos = (rng.uniform(xs[0], xs[-1]), rng.choice(ys))
+        else:
+            pos = (rng.choice(xs), rng.uniform(ys[0], ys[-1]))
+        vehs.append(Vehicle(f"V{i}", pos, rng.uniform(0.5, 3.0), d))
+    city.add_vehicles(vehs)
+    return city
+
+
+# ─────────────────────────────────────────────────────────────
+# 2)  MEDICIONES
+# ─────────────────────────────────────────────────────────────
+def medir_ticks(sim, ticks, repeticiones=5):
+    """
+    Segundos por tick de `update()` y desglose por fase, en
+    `repeticiones` bloques de `ticks` ticks.  Devuelve (mediana, mínimo)
+    del tick y de cada fase.
+    """
+    por_tick, fases = [], {f: [] for f in PHASES}
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        for _ in range(ticks):
+            sim.update()
+        por_tick.append((time.perf_counter() - t0) / ticks)
+
+        tiempos = {}
+        for _ in range(ticks):
+            sim.update_phased(tiempos)
+        for f in PHASES:
+            fases[f].append(tiempos.get(f, 0.0) / ticks)
+    return (
+        (statistics.median(por_tick), min(por_tick)),
+        ({f: statistics.median(t) for f, t in fases.items()},
+         {f: min(t) for f, t in fases.items()}),
+    )
+
+
+def medir_memoria(sim, ticks):
+    """Pico de memoria reservada y bloques netos por tick (tracemalloc)."""
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        bloques0 = sys.getallocatedblocks()
+        picos = []
+        for _ in range(ticks):
+            tracemalloc.reset_peak()
+            antes, _ = tracemalloc.get_traced_memory()
+            sim.update()
+            _, pico = tracemalloc.get_traced_memory()
+            picos.append(pico - antes)
+        bloques = (sys.getallocatedblocks() - bloques0) / ticks
+    finally:
+        tracemalloc.stop()
+    return max(picos), bloques
+
+
+def medir_snapshot(city, repeticiones, bloque_s=0.02):
+    """
+    (mediana, mínimo) de `get_snapshot` en segundos.  Como
+    `timeit.autorange`, cada muestra es la media de tantas llamadas como
+    hagan falta para llenar `bloque_s`: una sola llamada de menos de un
+    milisegundo queda a merced de cualquier interrupción.
+    """
+    llamadas = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(llamadas):
+            city.get_snapshot()
+        t = time.perf_counter() - t0
+        if t >= bloque_s:
+            break
+        llamadas *= 2
+    tiempos = [t / llamadas]
+    for _ in range(repeticiones - 1):
+        t0 = time.perf_counter()
+        for _ in range(llamadas):
+            city.get_snapshot()
+        tiempos.append((time.perf_counter() - t0) / llamadas)
+    return statistics.median(tiempos), min(tiempos)
+
+
+def medir_mensajes(n, lote=100):
+    """
+    Coste por vehículo del camino de migración: fábrica de mensaje,
+    codificación JSON y decodificación + validación del modelo tipado.  Las
+    métricas `lote_*` miden lo mismo con mensajes `VEHICULOS_ENTRANTES`
+    de `lote` vehículos (también por vehículo), y las `bin_*` con esos
+    lotes en el formato binario de `distribution.codec`.
+    """
+    from distribution.protocolo import mensaje_vehiculo_entrante, mensaje_vehiculos_entrantes
+    from distribution.codec import codificar, decodificar_mensaje
+
+    vehiculo = {"id": "V-BENCH", "posicion": [20.0, 5.0], "velocidad": 1.2, "direccion": "ESTE"}
+    t0 = time.perf_counter()
+    cuerpos = [
+        json.dumps(mensaje_vehiculo_entrante(vehiculo, origen="a", destino="b")).encode()
+        for _ in range(n)
+    ]
+    t1 = time.perf_counter()
+    for body in cuerpos:
+        decodificar_mensaje(body)
+    t2 = time.perf_counter()
+
+    nlotes = max(1, n // lote)
+    lotes = [
+        json.dumps(mensaje_vehiculos_entrantes([vehiculo] * lote, origen="a", destino="b")).encode()
+        for _ in range(nlotes)
+    ]
+    t3 = time.perf_counter()
+    for body in lotes:
+        decodificar_mensaje(body)
+    t4 = time.perf_counter()
+
+    mensajes = [mensaje_vehiculos_entrantes([vehiculo] * lote, origen="a", destino="b")
+                for _ in range(nlotes)]
+    t5 = time.perf_counter()
+    binarios = [codificar(m, "bin") for m in mensajes]
+    t6 = time.perf_counter()
+    for body, content_type in binarios:
+        decodificar_mensaje(body, content_type)
+    t7 = time.perf_counter()
+    por_vehiculo = nlotes * lote
+    return {
+        "encode_s": (t1 - t0) / n,
+        "decode_s": (t2 - t1) / n,
+        "bytes": len(cuerpos[0]),
+        "lote": lote,
+        "lote_encode_s": (t3 - t2) / por_vehiculo,
+        "lote_decode_s": (t4 - t3) / por_vehiculo,
+        "lote_bytes": len(lotes[0]) / lote,
+        "bin_encode_s": (t6 - t5) / por_vehiculo,
+        "bin_decode_s": (t7 - t6) / por_vehiculo,
+        "bin_bytes": len(binarios[0][0]) / lote,
+    }
+
+
+def bench_config(n_lights, n_vehicles, engine, ticks, seed=0, repeticiones=5):
+    city = build_grid(n_lights, n_vehicles, seed=seed)
+    sim = Simulator(city, engine=engine, seed=seed)
+    sim.update()                                  # calentamiento
+    # Como `timeit`: sin recolector durante las mediciones de tiempo, que
+    # si no se dispara en momentos distintos de una ejecución a otra
+    gc.collect()
+    gc.disable()
+    try:
+        (tick_s, tick_min_s), (fases, fases_min) = medir_ticks(sim, ticks, repeticiones)
+        snap_s, snap_min_s = medir_snapshot(city, repeticiones)
+    finally:
+        gc.enable()
+    pico, bloques = medir_memoria(sim, min(ticks, 3))
+    return {
+        "engine": engine,
+        "vehiculos": n_vehicles,
+        "semaforos": n_lights,
+        "repeticiones": repeticiones,
+        "tick_s": tick_s,
+        "tick_min_s": tick_min_s,
+        "fases_s": fases,
+        "fases_min_s": fases_min,
+        "alloc_pico_bytes": pico,
+        "alloc_bloques_netos": bloques,
+        "snapshot_s": snap_s,
+        "snapshot_min_s": snap_min_s,
+    }
+
+
+# ─────────────────────────────────────────────────────────────
+# 3)  LÍNEA BASE Y COMPARACIÓN
+# ─────────────────────────────────────────────────────────────
+def _clave(r):
+    return (r["engine"], r["vehiculos"], r["semaforos"])
+
+
+def _metricas(r, tipico=False):
+    """
+    (nombre, valor, tipo de suelo) comparables de un resultado: el
+    mínimo de las repeticiones o, con `tipico`, la mediana.  Una línea
+    base antigua solo tiene la media de un bloque.
+    """
+    sufijo = "_s" if tipico else "_min_s"
+    yield "tick", r.get("tick" + sufijo, r["tick_s"]), "tiempo"
+    yield "snapshot", r.get("snapshot" + sufijo, r["snapshot_s"]), "tiempo"
+    for fase, t in r.get("fases" + sufijo, r.get("fases_s", {})).items():
+        yield f"fase.{fase}", t, "tiempo"
+    if "alloc_pico_bytes" in r:
+        yield "alloc_pico_bytes", r["alloc_pico_bytes"], "bytes"
+    if "alloc_bloques_netos" in r:
+        yield "alloc_bloques_netos", r["alloc_bloques_netos"], "bloques"
+
+
+def _empeora(antes, ahora, tolerancia, piso):
+    return ahora > antes * (1 + tolerancia) and ahora - antes > piso
+
+
+def comparar(actual, baseline, tolerancia, pisos=PISOS):
+    """
+    Devuelve la lista de regresiones: métricas (tiempos de tick, fase y
+    snapshot, memoria por tick y mensajes) que superan la línea base en
+    más de `tolerancia` (fracción, 0.3 = +30 %) y además en más del
+    suelo de ruido de su tipo (`pisos`).
+
+    Se compara lo mejor de ahora (mínimo) con lo típico de la línea base
+    (mediana): solo es regresión si ni la mejor medición actual alcanza
+    lo que la línea base conseguía normalmente, de modo que ni una
+    línea base con suerte ni una medición con mala suerte la disparan.
+    """
+    previos = {_clave(r): r for r in baseline.get("resultados", [])}
+    regresiones = []
+    for r in actual["resultados"]:
+        b = previos.get(_clave(r))
+        if b is None:
+            continue
+        antes = {nombre: valor for nombre, valor, _ in _metricas(b, tipico=True)}
+        for nombre, ahora, tipo in _metricas(r):
+            if nombre in antes and _empeora(antes[nombre], ahora, tolerancia, pisos[tipo]):
+                regresiones.append((_clave(r), nombre, antes[nombre], ahora))
+    a, b = actual.get("mensajes", {}), baseline.get("mensajes", {})
+    b = b.get("mediana", b)
+    for metrica in ("encode_s", "decode_s", "lote_encode_s", "lote_decode_s",
+                    "bin_encode_s", "bin_decode_s"):
+        if metrica in a and metrica in b and \
+                _empeora(b[metrica], a[metrica], tolerancia, pisos["mensaje"]):
+            regresiones.append(("mensajes", metrica, b[metrica], a[metrica]))
+    return regresiones
+
+
+def _fusionar(a, b):
+    """Lo mejor (mínimo) de dos mediciones de la misma configuración."""
+    r = dict(a)
+    for k in ("tick_min_s", "snapshot_min_s", "alloc_pico_bytes", "alloc_bloques_netos"):
+        r[k] = min(a[k], b[k])
+    r["fases_min_s"] = {f: min(t, b["fases_min_s"][f]) for f, t in a["fases_min_s"].items()}
+    return r
+
+
+def _medir_mensajes(n, repeticiones, previas=None):
+    """
+    Mínimo de cada tiempo de `medir_mensajes` entre repeticiones; sus
+    medianas van en "mediana".
+    """
+    medidas = [medir_mensajes(n) for _ in range(repeticiones)]
+    tiempos = [k for k in medidas[0] if k.endswith("_s")]
+    mediana = {k: statistics.median(m[k] for m in medidas) for k in tiempos}
+    if previas:
+        medidas.append(previas)
+        mediana = previas.get("mediana", mediana)
+    r = {k: (min(m[k] for m in medidas) if k in tiempos else v) for k, v in medidas[0].items()}
+    r["mediana"] = mediana
+    return r
+
+
+def confirmar(informe, baseline, args):
+    """
+    Regresiones que se mantienen al volver a medir.  En una máquina
+    compartida la velocidad cambia durante segundos seguidos, así que una
+    configuración puede caer entera en un mal momento: cada sospechosa se
+    repite hasta `args.confirmaciones` veces, quedándose con lo mejor de
+    cada medición.  Una regresión de verdad aparece en todas.
+    """
+    regresiones = comparar(informe, baseline, args.tolerance)
+    for _ in range(args.confirmaciones):
+        sospechosas = {clave for clave, *_ in regresiones}
+        if not sospechosas:
+            break
+        print(f"Volviendo a medir {len(sospechosas)} configuraciones por si es ruido…", flush=True)
+        resultados = informe["resultados"]
+        for i, r in enumerate(resultados):
+            if _clave(r) in sospechosas:
+                otra = bench_config(r["semaforos"], r["vehiculos"], r["engine"], args.ticks,
+                                    repeticiones=args.repeticiones)
+                resultados[i] = _fusionar(r, otra)
+        if "mensajes" in sospechosas:
+            informe["mensajes"] = _medir_mensajes(args.mensajes, args.repeticiones,
+                                                  informe["mensajes"])
+        regresiones = comparar(informe, baseline, args.tolerance)
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del camino crítico")
+    parser.add_argument("--vehiculos", type=int, nargs="+", default=list(VEHICULOS))
+    parser.add_argument("--semaforos", type=int, nargs="+", default=list(SEMAFOROS))
+    parser.add_argument("--engines", nargs="+", default=["python", "numpy"],
+                        choices=("python", "numpy"))
+    parser.add_argument("--ticks", type=int, default=10, help="Ticks por repetición")
+    parser.add_argument("--repeticiones", type=int, default=5,
+                        help="Bloques de ticks por configuración (se compara el mínimo)")
+    parser.add_argument("--mensajes", type=int, default=2_000,
+                        help="Mensajes para medir el camino de distribución (0 = omitir)")
+    parser.add_argument("--output", help="Guarda los resultados en este JSON")
+    parser.add_argument("--compare", help="Línea base JSON con la que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--confirmaciones", type=int, default=3,
+                        help="Veces que se vuelve a medir una regresión antes de darla por buena")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for engine in args.engines:
+        for nl in args.semaforos:
+            for nv in args.vehiculos:
+                r = bench_config(nl, nv, engine, args.ticks, repeticiones=args.repeticiones)
+                resultados.append(r)
+                fases = " ".join(f"{f}={1e3 * t:.2f}" for f, t in r["fases_s"].items())
+                print(f"{engine:6} veh={nv:>7} tl={nl:>6}  tick={1e3 * r['tick_s']:9.3f} ms  "
+                      f"snap={1e3 * r['snapshot_s']:8.3f} ms  pico={r['alloc_pico_bytes'] / 1024:9.1f} KiB  "
+                      f"[{fases}]", flush=True)
+
+    informe = {
+        "python": platform.python_version(),
+        "maquina": platform.machine(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "resultados": resultados,
+    }
+    if args.mensajes:
+        informe["mensajes"] = m = _medir_mensajes(args.mensajes, args.repeticiones)
+        print(f"mensajes: encode={1e6 * m['encode_s']:.1f} µs  decode={1e6 * m['decode_s']:.1f} µs  "
+              f"{m['bytes']} bytes/vehículo")
+        print(f"  en lotes de {m['lote']}: encode={1e6 * m['lote_encode_s']:.1f} µs  "
+              f"decode={1e6 * m['lote_decode_s']:.1f} µs  {m['lote_bytes']:.0f} bytes/vehículo")
+        print(f"  binario en lotes:  encode={1e6 * m['bin_encode_s']:.1f} µs  "
+              f"decode={1e6 * m['bin_decode_s']:.1f} µs  {m['bin_bytes']:.0f} bytes/vehículo")
+
+    regresiones = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regresiones = confirmar(informe, baseline, args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+    if args.compare:
+        for clave, metrica, antes, ahora in regresiones:
+            print(f"REGRESIÓN {clave} {metrica}: {antes:.6g} → {ahora:.6g}")
+        if regresiones:
+            sys.exit(1)
+        print("Sin regresiones respecto a la línea base.")
+
+
+if __name__ == "__main__":
+    main()
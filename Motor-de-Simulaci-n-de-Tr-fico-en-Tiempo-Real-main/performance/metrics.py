@@ -1,5 +1,8 @@
 import logging
-from prometheus_client import Gauge, Counter, start_http_server
+from time import perf_counter
+from prometheus_client import Gauge, Counter, Histogram, start_http_server
+
+from simulation.simulator import PHASES
 
 # ─────────────────────────────────────────────────────────────
 # 1)  LOGGER BÁSICO (tal cual lo tenías)
@@ -7,12 +10,15 @@ from prometheus_client import Gauge, Counter, start_http_server
 logging.basicConfig(level=logging.INFO)
 _logger = logging.getLogger("SimMetrics")
 
-def log_simulation_state(simulator):
+def log_simulation_state(simulator, since=None):
     """
-    Registra un snapshot del simulador en el logger INFO.
+    Registra en el logger INFO los cambios de la simulación desde la
+    versión `since` (completo si es None).  Devuelve la versión
+    registrada, para pasarla como `since` en la siguiente llamada.
     """
-    snapshot = simulator.get_snapshot()
-    _logger.info("Estado de la simulación: %s", snapshot)
+    delta = simulator.get_snapshot_delta(since)
+    _logger.info("Estado de la simulación: %s", delta)
+    return delta["version"]
 
 
 # ─────────────────────────────────────────────────────────────
@@ -29,6 +35,108 @@ HB_ENVIADOS = Counter(
     "Heart-beats enviados por este nodo"
 )
 
+# ─────────────────────────────────────────────────────────────
+# 3)  INSTRUMENTACIÓN DEL TICK
+# ─────────────────────────────────────────────────────────────
+_BUCKETS_TICK = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+TICK_FASE = Histogram(
+    "tick_fase_segundos",
+    "Duración de cada fase de Simulator.update",
+    ["zona", "fase"],
+    buckets=_BUCKETS_TICK,
+)
+
+TICK_DURACION = Histogram(
+    "tick_duracion_segundos",
+    "Duración total de Simulator.update",
+    ["zona"],
+    buckets=_BUCKETS_TICK,
+)
+
+TICK_RETRASO = Gauge(
+    "tick_retraso_segundos",
+    "Exceso del periodo real entre ticks sobre el intervalo objetivo",
+    ["zona"]
+)
+
+TICKS_POR_SEGUNDO = Gauge(
+    "ticks_por_segundo",
+    "Ticks por segundo conseguidos por la zona",
+    ["zona"]
+)
+
+TICK_SOBRECARGAS = Counter(
+    "tick_sobrecargas_total",
+    "Despertares del planificador con más de un tick vencido",
+    ["zona"]
+)
+
+TICKS_DESCARTADOS = Counter(
+    "ticks_descartados_total",
+    "Ticks descartados por superar el límite de recuperación",
+    ["zona"]
+)
+
+
+class TickObserver:
+    """
+    Observador para `Simulator.instrument`: vuelca a Prometheus la
+    duración de cada fase y del tick, el retraso frente a `intervalo`
+    y los ticks/s conseguidos (promediados cada `ventana` segundos).
+    """
+
+    def __init__(self, zona: str, intervalo: float, ventana: float = 1.0):
+        self.intervalo = intervalo
+        self.ventana = ventana
+        self._fases = {f: TICK_FASE.labels(zona=zona, fase=f) for f in PHASES}
+        self._duracion = TICK_DURACION.labels(zona=zona)
+        self._retraso = TICK_RETRASO.labels(zona=zona)
+        self._tps = TICKS_POR_SEGUNDO.labels(zona=zona)
+        self._ultimo = None
+        self._inicio_ventana = perf_counter()
+        self._ticks_ventana = 0
+
+    def __call__(self, inicio: float, duracion: float, tiempos: dict):
+        for fase, dt in tiempos.items():
+            self._fases[fase].observe(dt)
+        self._duracion.observe(duracion)
+
+        if self._ultimo is not None:
+            self._retraso.set(max(0.0, inicio - self._ultimo - self.intervalo))
+        self._ultimo = inicio
+
+        self._ticks_ventana += 1
+        transcurrido = inicio - self._inicio_ventana
+        if transcurrido >= self.ventana:
+            self._tps.set(self._ticks_ventana / transcurrido)
+            self._inicio_ventana = inicio
+            self._ticks_ventana = 0
+
+
+class SchedulerObserver:
+    """
+    `on_tick` para `simulation_loop`: vuelca a Prometheus las sobrecargas
+    y los ticks descartados por el `TickScheduler`.
+    """
+
+    def __init__(self, zona: str, reloj):
+        self.reloj = reloj
+        self._sobrecargas = TICK_SOBRECARGAS.labels(zona=zona)
+        self._descartados = TICKS_DESCARTADOS.labels(zona=zona)
+        self._vistos = (reloj.overruns, reloj.skipped)
+
+    def __call__(self, simulator=None):
+        actuales = (self.reloj.overruns, self.reloj.skipped)
+        if actuales != self._vistos:
+            self._sobrecargas.inc(actuales[0] - self._vistos[0])
+            self._descartados.inc(actuales[1] - self._vistos[1])
+            self._vistos = actuales
+
+
 def start_metrics_server(port: int = 9200):
     """
     Arranca el servidor HTTP de Prometheus en el puerto indicado.
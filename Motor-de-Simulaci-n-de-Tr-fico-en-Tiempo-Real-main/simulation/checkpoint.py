@@ -0,0 +1,293 @@
+# simulacion_trafico/simulation/checkpoint.py
+"""
+Checkpoint binario del estado de una zona y restauración rápida.
+
+El fichero guarda vehículos (id, posición, velocidad, dirección,
+movimiento y ruta en curso), semáforos (id, estado, timer),
+`Simulator.frame_count` y el estado de `Simulator.rng` en columnas
+contiguas y alineadas, de modo que al restaurar se puede proyectar
+con `mmap` y cargar cada columna de una sola copia (o directamente en
+los arrays del motor NumPy) sin parsear nada.
+
+Disposición (little-endian):
+
+    cabecera  <8sHHQIIIIIII>  magic, versión, versión del generador,
+                              frame, nveh, ntl, bytes ids veh, bytes
+                              ids tl, nº nodos de ruta, nº
+                              intersecciones, 0
+    float64   x[nveh], y[nveh], speed[nveh]
+    int64     timer[ntl]
+    float64   gauss                     (NaN: sin valor pendiente)
+    uint32    azar[625]                 (estado Mersenne Twister)
+    uint32    off_ids_veh[nveh+1], off_ids_tl[ntl+1]
+    int32     ruta_idx[nveh]            (-1: sin ruta)
+    uint32    off_ruta[nveh+1], nodos_ruta[nº nodos]
+    uint8     dir[nveh], moving[nveh], estado[ntl]
+    utf-8     ids de vehículos, ids de semáforos
+
+Las rutas (`simulation.routing.Route`) se guardan como índices de
+intersección del grafo de carreteras, que sigue el orden de
+`city.intersections`; solo se pueden restaurar sobre el mismo trazado.
+"""
+
+import gc
+import math
+import mmap
+import os
+import random
+import struct
+from array import array
+
+from environment.enums import Direction, LightState
+from environment.Vehicle import Vehicle
+
+MAGIC = b"TRAFCKPT"
+VERSION = 3
+_CABECERA = struct.Struct("<8sHHQIIIIIII")
+
+# Dirección y estado se guardan con su código de `Direction` / `LightState`
+DIRECCIONES = tuple(Direction)
+ESTADOS = tuple(LightState)
+
+
+def _offsets(blobs):
+    off = array("I", [0])
+    total = 0
+    for b in blobs:
+        total += len(b)
+        off.append(total)
+    return off
+
+
+def _ids(blob, off):
+    """Decodifica la tabla de ids (rápido si todo es ASCII)."""
+    off = off.tolist()
+    if blob.isascii():
+        texto = blob.decode("ascii")
+        return [texto[a:b] for a, b in zip(off, off[1:])]
+    return [blob[a:b].decode("utf-8") for a, b in zip(off, off[1:])]
+
+
+# ────────────────────────────────────────────────────────────
+#  Guardado
+# ────────────────────────────────────────────────────────────
+def save_checkpoint(sim, path):
+    """
+    Escribe el checkpoint de forma atómica (fichero temporal + rename).
+    Devuelve el número de bytes escritos.
+    """
+    sim.sync_lights()
+    city = sim.city
+    eng = sim._vector
+
+    if eng is not None:
+        eng.sincronizar()
+        ids = [v.id_ for v in city.vehicles]
+        cols_f = [eng.x.tobytes(), eng.y.tobytes(), eng.speed.tobytes()]
+        cols_b = [eng.dir.astype("u1").tobytes(), eng.moving.astype("u1").tobytes()]
+    else:
+        ids, xs, ys, speeds, dirs, movs = [], array("d"), array("d"), array("d"), array("B"), array("B")
+        for v in city.vehicles:
+            ids.append(v.id_)
+            xs.append(v.x)
+            ys.append(v.y)
+            speeds.append(v.speed)
+            dirs.append(v.direction)
+            movs.append(bool(v.moving))
+        cols_f = [xs.tobytes(), ys.tobytes(), speeds.tobytes()]
+        cols_b = [dirs.tobytes(), movs.tobytes()]
+
+    # Rutas: índice del próximo nodo y nodos, concatenados
+    ruta_idx, off_ruta, nodos = array("i"), array("I", [0]), array("I")
+    for v in city.vehicles:
+        ruta = v.route
+        if ruta is None:
+            ruta_idx.append(-1)
+        else:
+            ruta_idx.append(ruta.index)
+            nodos.extend(ruta.nodes)
+        off_ruta.append(len(nodos))
+
+    # Generador: sin él, la zona reanudada se separa de la ejecución
+    # sin interrumpir en la primera decisión aleatoria
+    version_azar, azar, gauss = sim.rng.getstate()
+
+    lights = city.traffic_lights
+    timers = array("q", (tl.timer for tl in lights))
+    estados = array("B", (tl.current_state for tl in lights))
+
+    veh_ids = [str(i).encode("utf-8") for i in ids]
+    tl_ids = [str(tl.id_).encode("utf-8") for tl in lights]
+    veh_blob, tl_blob = b"".join(veh_ids), b"".join(tl_ids)
+
+    partes = [
+        _CABECERA.pack(MAGIC, VERSION, version_azar, sim.frame_count, len(ids), len(lights),
+                       len(veh_blob), len(tl_blob), len(nodos), len(city.intersections), 0),
+        *cols_f,
+        timers.tobytes(),
+        array("d", (math.nan if gauss is None else gauss,)).tobytes(),
+        array("I", azar).tobytes(),
+        _offsets(veh_ids).tobytes(),
+        _offsets(tl_ids).tobytes(),
+        ruta_idx.tobytes(),
+        off_ruta.tobytes(),
+        nodos.tobytes(),
+        *cols_b,
+        estados.tobytes(),
+        veh_blob,
+        tl_blob,
+    ]
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        for p in partes:
+            f.write(p)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return sum(len(p) for p in partes)
+
+
+# ────────────────────────────────────────────────────────────
+#  Restauración
+# ────────────────────────────────────────────────────────────
+def _secciones(buf):
+    magic, version, version_azar, frame, n, m, lv, lt, nr, nix, _ = _CABECERA.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Fichero de checkpoint no reconocido")
+
+    secciones = (
+        ("x", "d", n), ("y", "d", n), ("speed", "d", n), ("timer", "q", m),
+        ("gauss", "d", 1), ("azar", "I", 625),
+        ("off_veh", "I", n + 1), ("off_tl", "I", m + 1),
+        ("ruta_idx", "i", n), ("off_ruta", "I", n + 1), ("nodos_ruta", "I", nr),
+        ("dir", "B", n), ("moving", "B", n), ("estado", "B", m),
+        ("ids_veh", None, lv), ("ids_tl", None, lt),
+    )
+    tamanos = [cuenta * (struct.calcsize(fmt) if fmt else 1) for _, fmt, cuenta in secciones]
+    if _CABECERA.size + sum(tamanos) > len(buf):
+        raise ValueError("Checkpoint truncado")
+
+    mv = memoryview(buf)
+    vistas = [mv]
+    pos = _CABECERA.size
+    sec = {}
+    for (nombre, fmt, _), size in zip(secciones, tamanos):
+        trozo = mv[pos:pos + size]
+        vistas.append(trozo)
+        if fmt:
+            sec[nombre] = trozo.cast(fmt)
+            vistas.append(sec[nombre])
+        else:
+            sec[nombre] = bytes(trozo)
+        pos += size
+    sec["n_intersecciones"] = nix
+    sec["version_azar"] = version_azar
+    return frame, sec, vistas
+
+
+def restore_checkpoint(sim, path):
+    """
+    Carga el checkpoint en el simulador: sustituye los vehículos de la
+    ciudad (con sus rutas), fija estado y timer de los semáforos con el
+    mismo id, devuelve `sim.rng` al estado guardado y reprograma los
+    semáforos a partir del `frame_count` guardado.
+    Devuelve (nº vehículos, nº semáforos restaurados).
+    """
+    # Se crean decenas de miles de objetos de golpe: sin GC es varias
+    # veces más rápido y ninguno de ellos forma ciclos.
+    gc_activo = gc.isenabled()
+    gc.disable()
+    try:
+        return _restore(sim, path)
+    finally:
+        if gc_activo:
+            gc.enable()
+
+
+def _restore(sim, path):
+    city = sim.city
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        frame, sec, vistas = _secciones(mm)
+        try:
+            ids = _ids(sec["ids_veh"], sec["off_veh"])
+            tl_ids = _ids(sec["ids_tl"], sec["off_tl"])
+
+            # Todo lo que puede fallar se comprueba antes de tocar la
+            # ciudad: un checkpoint rechazado la deja como estaba.
+            if max(sec["dir"], default=0) >= len(DIRECCIONES) or \
+                    max(sec["estado"], default=0) >= len(ESTADOS):
+                raise ValueError("Checkpoint con direcciones o estados desconocidos")
+            rutas = _leer_rutas(sim, sec)
+            gauss = sec["gauss"][0]
+            estado_azar = (sec["version_azar"], tuple(sec["azar"]),
+                           None if math.isnan(gauss) else gauss)
+            random.Random().setstate(estado_azar)       # lanza si no es válido
+
+            eng = sim._vector
+            if eng is not None:
+                import numpy as np
+                eng.cargar(
+                    ids,
+                    np.frombuffer(sec["x"], dtype=np.float64),
+                    np.frombuffer(sec["y"], dtype=np.float64),
+                    np.frombuffer(sec["speed"], dtype=np.float64),
+                    np.frombuffer(sec["dir"], dtype=np.uint8),
+                    np.frombuffer(sec["moving"], dtype=np.uint8),
+                )
+            else:
+                xs, ys, speeds = sec["x"].tolist(), sec["y"].tolist(), sec["speed"].tolist()
+                dirs, movs = sec["dir"].tolist(), sec["moving"].tolist()
+                vehs = []
+                for i, id_ in enumerate(ids):
+                    v = Vehicle(id_, (xs[i], ys[i]), speeds[i], DIRECCIONES[dirs[i]])
+                    v.moving = bool(movs[i])
+                    vehs.append(v)
+                city.replace_vehicles(vehs)
+
+            if rutas is not None:
+                sim.router                  # los vehículos con ruta necesitan el Router
+                for v, ruta in zip(city.vehicles, rutas):
+                    v.route = ruta
+
+            por_id = {str(tl.id_): tl for tl in city.traffic_lights}
+            timers, estados = sec["timer"].tolist(), sec["estado"].tolist()
+            restaurados = 0
+            for i, tl_id in enumerate(tl_ids):
+                tl = por_id.get(tl_id)
+                if tl is not None:
+                    tl.current_state = ESTADOS[estados[i]]
+                    tl.timer = timers[i]
+                    restaurados += 1
+
+            sim.rng.setstate(estado_azar)
+        finally:
+            # Libera las vistas antes de cerrar el mmap
+            sec.clear()
+            for v in reversed(vistas):
+                v.release()
+
+    sim.frame_count = frame
+    sim._programar_semaforos()
+    return len(ids), restaurados
+
+
+def _leer_rutas(sim, sec):
+    """
+    Rutas guardadas, alineadas con los vehículos (None donde no hay),
+    o None si ningún vehículo tiene ruta.  Lanza ValueError si no
+    encajan en el trazado actual.
+    """
+    idx = sec["ruta_idx"].tolist()
+    if not any(i >= 0 for i in idx):
+        return None
+    nix = len(sim.city.intersections)
+    if sec["n_intersecciones"] != nix:
+        raise ValueError("El checkpoint tiene rutas sobre otro trazado de intersecciones")
+    off, nodos = sec["off_ruta"].tolist(), sec["nodos_ruta"].tolist()
+    if nodos and max(nodos) >= nix:
+        raise ValueError("El checkpoint tiene rutas con nodos fuera del trazado")
+    from simulation.routing import Route
+
+    return [Route(tuple(nodos[a:b]), i) if i >= 0 else None
+            for i, a, b in zip(idx, off, off[1:])]
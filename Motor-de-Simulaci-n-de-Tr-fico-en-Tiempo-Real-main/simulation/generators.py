@@ -0,0 +1,275 @@
+# simulacion_trafico/simulation/generators.py
+"""
+Generadores de ciudades para escenarios grandes.
+
+En lugar de enumerar cada semáforo en el JSON, un escenario puede
+describir la ciudad con una sección "generate" (ver
+`simulation.scenario`):
+
+    "generate": {
+      "prefix": "",                                  # prefijo de ids
+      "grid": {"rows": 1000, "cols": 1000, "spacing": 200, "origin": [0, 0]},
+      "timing": {"plan": "green_wave", "green_time": 3, "yellow_time": 1,
+                 "red_time": 3, "speed": 2.0},
+      "vehicles": {"count": 100000, "speed": [1.0, 3.0]},
+      "trips": {"count": 10000, "centroids": 50, "speed": 2.0}
+    }
+
+  • grid: cuadrícula rows×cols.  `spacing` fijo o [min, max] (separación
+    aleatoria por fila/columna → trazado irregular); `drop` elimina esa
+    fracción de intersecciones; `lights` es la fracción de
+    intersecciones con semáforo.  Con `bounds` [xmin, ymin, xmax, ymax]
+    las filas y columnas se reparten dentro del rectángulo.
+  • timing: plan de tiempos de los semáforos (`PLANES`).
+  • vehicles: población repartida sobre las carreteras en proporción a
+    su longitud.
+  • trips: viajes origen → destino con ruta (`Simulator.add_trip`) entre
+    `centroids` intersecciones al azar; pocos centroides = muchas rutas
+    repetidas, que el `Router` sirve desde su caché.
+
+Los objetos se crean directamente, sin pasar por diccionarios
+intermedios, y lo que se puede (extensiones de las carreteras,
+coordenadas) se calcula en bloque con NumPy.  Aun así una ciudad de un
+millón de intersecciones es un millón de objetos: unos 10 s y más de
+1 GB de memoria.
+"""
+
+from itertools import chain
+
+import numpy as np
+
+from environment.enums import Direction, LightState
+from environment.Vehicle import Vehicle
+from environment.TrafficLight import TrafficLight
+from environment.intersection import Intersection
+
+NORTE, SUR, ESTE, OESTE = Direction
+
+# Planes de tiempos:
+#   staircase  todos en el mismo estado; desfase en escalera del simulador
+#   alternate  verde/rojo alternos por índice (como la GUI de demo)
+#   green_wave onda verde para quien circula a `speed` a lo largo de `axis`
+#   random     fase y desfase aleatorios
+PLANES = ("staircase", "alternate", "green_wave", "random")
+
+
+# ────────────────────────────────────────────────────────────
+#  Trazado
+# ────────────────────────────────────────────────────────────
+def _ejes(n, spacing, inicio, rng):
+    if isinstance(spacing, (list, tuple)):
+        lo, hi = spacing
+        pos, out = inicio, []
+        for _ in range(n):
+            out.append(pos)
+            pos += rng.uniform(lo, hi)
+        return out
+    return [inicio + i * spacing for i in range(n)]
+
+
+def grid_axes(spec, rng):
+    """Coordenadas (xs, ys) de columnas y filas de la cuadrícula."""
+    rows, cols = int(spec["rows"]), int(spec["cols"])
+    if "bounds" in spec:
+        x0, y0, x1, y1 = spec["bounds"]
+        xs = [x0 + (x1 - x0) * (i + 0.5) / cols for i in range(cols)]
+        ys = [y0 + (y1 - y0) * (j + 0.5) / rows for j in range(rows)]
+        if spec.get("integer", True):
+            xs, ys = [int(x) for x in xs], [int(y) for y in ys]
+        return xs, ys
+    spacing = spec.get("spacing", 200)
+    ox, oy = spec.get("origin", (0, 0))
+    return _ejes(cols, spacing, ox, rng), _ejes(rows, spacing, oy, rng)
+
+
+def grid_layout(spec, rng, prefix="", green_time=10, yellow_time=3, red_time=10):
+    """
+    Intersecciones y semáforos de la cuadrícula, en orden fila a fila.
+    Los ids son `{prefix}I{n}` / `{prefix}T{n}` con n = 1, 2, … sobre
+    todas las posiciones (las eliminadas con `drop` dejan hueco).
+    """
+    xs, ys = grid_axes(spec, rng)
+    drop = spec.get("drop", 0.0)
+    con_luz = spec.get("lights", 1.0)
+    azar = rng.random
+
+    intersections, lights = [], []
+    idx = 0
+    for y in ys:
+        for x in xs:
+            idx += 1
+            if drop and azar() < drop:
+                continue
+            intersections.append(Intersection(f"{prefix}I{idx}", (x, y)))
+            if con_luz >= 1.0 or azar() < con_luz:
+                lights.append(TrafficLight(f"{prefix}T{idx}", x, y,
+                                           green_time, yellow_time, red_time))
+    return intersections, lights
+
+
+# ────────────────────────────────────────────────────────────
+#  Planes de tiempos
+# ────────────────────────────────────────────────────────────
+def _fase(tl, p):
+    """
+    Coloca el semáforo en la posición `p` de su ciclo, contado en pasos
+    desde el inicio del rojo (ROJO → VERDE → AMARILLO).
+    """
+    r, g = tl.red_time, tl.green_time
+    if p < r:
+        tl.current_state, tl.timer = LightState.RED, p
+    elif p < r + g:
+        tl.current_state, tl.timer = LightState.GREEN, p - r
+    else:
+        tl.current_state, tl.timer = LightState.YELLOW, p - r - g
+
+
+def timing_plan(lights, spec, rng, update_interval=120):
+    """
+    Aplica el plan `spec["plan"]` a los semáforos (estado inicial y
+    `timer`) y devuelve los desfases por id que debe usar el simulador
+    (vacío si basta la escalera por defecto).
+    """
+    plan = spec.get("plan", "staircase")
+    if plan not in PLANES:
+        raise ValueError(f"Plan de tiempos desconocido: {plan!r}")
+    offsets = {}
+
+    if plan == "staircase":
+        estado = LightState.parse(spec.get("state", "RED"))
+        for tl in lights:
+            tl.current_state = estado
+    elif plan == "alternate":
+        for tl in lights:
+            n = int(tl.id_.rsplit("T", 1)[-1])
+            tl.current_state = LightState.GREEN if n % 2 == 0 else LightState.RED
+    elif plan == "green_wave":
+        # Cada semáforo arranca su verde cuando llega el vehículo que
+        # salió del primero al empezar el suyo: retraso = distancia/speed
+        # frames.  El planificador da el primer paso en el frame
+        # `offset` (1..update_interval); los pasos que faltan hasta el
+        # retraso se descuentan de la fase inicial.
+        speed = float(spec.get("speed", 2.0))
+        vertical = spec.get("axis", "x") == "y"
+        base = min((tl.y if vertical else tl.x) for tl in lights) if lights else 0
+        for tl in lights:
+            retraso = int(((tl.y if vertical else tl.x) - base) / speed)
+            primero = (retraso - 1) % update_interval + 1
+            offsets[tl.id_] = primero
+            pasos = (retraso - primero) // update_interval + 1
+            ciclo = tl.red_time + tl.green_time + tl.yellow_time
+            _fase(tl, (tl.red_time - pasos) % ciclo)
+    else:                                   # random
+        for tl in lights:
+            ciclo = tl.red_time + tl.green_time + tl.yellow_time
+            _fase(tl, rng.randrange(ciclo))
+            offsets[tl.id_] = rng.randrange(update_interval)
+    return offsets
+
+
+# ────────────────────────────────────────────────────────────
+#  Población
+# ────────────────────────────────────────────────────────────
+def road_extents(intersections):
+    """
+    Carreteras {eje: (inicio, fin)} horizontales y verticales, en orden
+    de primera aparición.  Se agrupa en bloque con NumPy, pero claves y
+    extremos son los valores originales de `location`.
+    """
+    coords = [ix.location for ix in intersections]
+    n = len(coords)
+    if not n:
+        return {}, {}
+    xy = np.fromiter(chain.from_iterable(coords), np.float64, 2 * n)
+    xs, ys = xy[0::2], xy[1::2]
+    return _tramos(coords, ys, xs, 1), _tramos(coords, xs, ys, 0)
+
+
+def _tramos(coords, eje, pos, k):
+    """
+    {coords[i][k]: (mínimo, máximo) de la otra coordenada} agrupando por
+    `eje`.  Con empates se queda, como un recorrido en orden, con el
+    primero que aparece.
+    """
+    n = len(coords)
+    indices = np.arange(n)
+    por_min = np.lexsort((indices, pos, eje))
+    por_max = np.lexsort((indices, -pos, eje))
+    e = eje[por_min]
+    inicio = np.flatnonzero(np.concatenate(([True], e[1:] != e[:-1])))
+    primera = np.minimum.reduceat(por_min, inicio)
+    grupos = np.argsort(primera, kind="stable")
+    otra = 1 - k
+    return {
+        coords[p][k]: (coords[a][otra], coords[b][otra])
+        for p, a, b in zip(primera[grupos].tolist(), por_min[inicio][grupos].tolist(),
+                           por_max[inicio][grupos].tolist())
+    }
+
+
+def populate(spec, intersections, rng, prefix=""):
+    """
+    `spec["count"]` vehículos sobre las carreteras, elegidas en
+    proporción a su longitud, con dirección a lo largo de la carretera.
+    `speed` fijo o [min, max].
+    """
+    count = int(spec.get("count", 0))
+    h_ext, v_ext = road_extents(intersections)
+    carreteras = ([(True, y, a, b) for y, (a, b) in h_ext.items() if b > a]
+                  + [(False, x, a, b) for x, (a, b) in v_ext.items() if b > a])
+    if count <= 0 or not carreteras:
+        return []
+
+    acum, total = [], 0.0
+    for _, _, a, b in carreteras:
+        total += b - a
+        acum.append(total)
+
+    speed = spec.get("speed", 1.0)
+    if isinstance(speed, (list, tuple)):
+        lo, hi = speed
+        velocidad = lambda: rng.uniform(lo, hi)
+    else:
+        velocidad = lambda: float(speed)
+
+    inicio = int(spec.get("start", 1))
+    pfx = prefix + spec.get("prefix", "V")
+    uniform, azar = rng.uniform, rng.random
+    vehiculos = []
+    for i, (horizontal, eje, a, b) in enumerate(
+            rng.choices(carreteras, cum_weights=acum, k=count), start=inicio):
+        pos = uniform(a, b)
+        if horizontal:
+            v = Vehicle(f"{pfx}{i}", (pos, eje), velocidad(), ESTE if azar() < 0.5 else OESTE)
+        else:
+            v = Vehicle(f"{pfx}{i}", (eje, pos), velocidad(), NORTE if azar() < 0.5 else SUR)
+        vehiculos.append(v)
+    return vehiculos
+
+
+def trips(spec, intersections, rng, prefix=""):
+    """
+    Viajes (id, origen, destino, velocidad) entre `spec["centroids"]`
+    intersecciones elegidas al azar (por defecto, cualquiera).
+    """
+    count = int(spec.get("count", 0))
+    if count <= 0 or len(intersections) < 2:
+        return []
+    ids = [ix.id_ for ix in intersections]
+    k = spec.get("centroids")
+    if k:
+        ids = rng.sample(ids, min(int(k), len(ids)))
+
+    speed = spec.get("speed", 1.0)
+    if isinstance(speed, (list, tuple)):
+        lo, hi = speed
+        velocidad = lambda: rng.uniform(lo, hi)
+    else:
+        velocidad = lambda: float(speed)
+
+    pfx = prefix + spec.get("prefix", "R")
+    viajes = []
+    for i in range(1, count + 1):
+        origen, destino = rng.sample(ids, 2)
+        viajes.append((f"{pfx}{i}", origen, destino, velocidad()))
+    return viajes
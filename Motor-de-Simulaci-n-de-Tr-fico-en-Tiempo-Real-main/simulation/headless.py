@@ -0,0 +1,85 @@
+# simulacion_trafico/simulation/headless.py
+"""
+Ejecución por lotes sin GUI ni esperas: N ticks seguidos, a la máxima
+velocidad posible, a partir de un escenario y una semilla fijos.
+
+    python -m simulation.headless escenario_demo.json --ticks 100000 --seed 42
+
+Al terminar informa de ticks/s y de un digest del estado final, de modo
+que dos ejecuciones (o dos motores) con la misma entrada se pueden
+comparar con un simple diff.
+"""
+
+import argparse
+import hashlib
+import json
+import time
+
+from simulation.scenario import load_scenario, build_simulator
+
+
+def state_digest(sim):
+    """
+    SHA-256 del estado completo de la simulación: frame, vehículos
+    (id, posición, dirección, movimiento) y semáforos (id, estado, timer).
+    """
+    sim.sync_lights()
+    h = hashlib.sha256()
+    h.update(f"frame={sim.frame_count}\n".encode())
+    for v in sim.city.vehicles:
+        h.update(f"V|{v.id_}|{float(v.x)!r}|{float(v.y)!r}|{v.direction.name}|{v.moving}\n".encode())
+    for tl in sim.city.traffic_lights:
+        h.update(f"T|{tl.id_}|{tl.current_state.name}|{tl.timer}\n".encode())
+    return h.hexdigest()
+
+
+def run_headless(sim, ticks):
+    """
+    Ejecuta `ticks` actualizaciones seguidas y devuelve un informe con
+    la duración, el ritmo conseguido y el digest final.
+    """
+    update = sim.update
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        update()
+    segundos = time.perf_counter() - t0
+    return {
+        "ticks": ticks,
+        "segundos": segundos,
+        "ticks_por_segundo": ticks / segundos if segundos > 0 else float("inf"),
+        "vehiculos": len(sim.city.vehicles),
+        "semaforos": len(sim.city.traffic_lights),
+        "frame": sim.frame_count,
+        "digest": state_digest(sim),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulación por lotes sin GUI")
+    parser.add_argument("escenario", help="Fichero JSON del escenario")
+    parser.add_argument("--ticks", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Semilla (por defecto, la del escenario)")
+    parser.add_argument("--engine", choices=("python", "numpy"), default="python")
+    parser.add_argument("--car-following", action="store_true",
+                        help="Activa el seguimiento de vehículos (ver `simulation.lanes`)")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    cfg = load_scenario(args.escenario)
+    if args.car_following:
+        cfg.setdefault("car_following", True)
+    sim = build_simulator(cfg, engine=args.engine, seed=args.seed)
+    informe = run_headless(sim, args.ticks)
+
+    if args.json:
+        print(json.dumps(informe))
+    else:
+        print(f"{informe['ticks']} ticks en {informe['segundos']:.3f} s "
+              f"({informe['ticks_por_segundo']:.0f} ticks/s) — "
+              f"{informe['vehiculos']} vehículos, {informe['semaforos']} semáforos")
+        print(f"digest: {informe['digest']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# simulacion_trafico/simulation/lanes.py
+"""
+Ocupación ordenada por carril para el seguimiento de vehículos.
+
+Un carril es una carretera recorrida en un sentido: (dirección, eje),
+con el eje de la carretera más cercana (el mismo al que `align_to_road`
+centra el vehículo).  Cada carril guarda sus vehículos ordenados por
+avance en el sentido de la marcha (de atrás hacia delante) y un dict
+vehículo → vehículo que le precede, de modo que el líder se consulta en
+O(1).
+
+Con seguimiento activo nadie adelanta dentro de su carril (cada uno
+avanza como mucho hasta `min_gap` por detrás de donde estaba su líder
+al empezar el tick), así que el orden solo cambia cuando un vehículo
+entra o sale del carril: altas y bajas, giros en las intersecciones y
+rebotes en los extremos.  Solo esos casos tocan la estructura: bisección
+en el carril de destino y enlace con sus vecinos.  Un giro o rebote solo
+se admite si en el carril de destino queda `min_gap` por delante y por
+detrás (`admits`); si no, el simulador lo deshace y el vehículo espera.
+"""
+
+from bisect import bisect_right
+
+from environment.enums import Direction
+from simulation.simulator import _mas_cercana
+
+NORTE, SUR, ESTE, OESTE = Direction
+
+# Separación mínima por defecto con el vehículo de delante (la GUI
+# dibuja vehículos de 20 px)
+MIN_GAP = 25.0
+
+# Avance a lo largo de cada sentido de la marcha
+_AVANCE = {
+    NORTE: lambda v: v.y,
+    SUR: lambda v: -v.y,
+    ESTE: lambda v: v.x,
+    OESTE: lambda v: -v.x,
+}
+
+
+class LaneIndex:
+    """
+    Vehículos de cada carril en orden de avance, con enlace al líder.
+
+    `sync()` incorpora altas y bajas de la ciudad, `update()` recoloca
+    un vehículo que ha cambiado de dirección y `leader()` / `gap()`
+    responden en O(1).  Si `cambios` es un conjunto, se le añaden los
+    vehículos cuyo líder cambia (el motor NumPy lo usa para mantener su
+    array de líderes sin recorrer todos los vehículos).
+    """
+
+    def __init__(self, h_roads=(), v_roads=()):
+        self.h_roads, self.v_roads = list(h_roads), list(v_roads)
+        self._carril = {}       # vehículo -> (dirección, eje)
+        self._colas = {}        # carril -> [vehículos, de atrás hacia delante]
+        self._delante = {}      # vehículo -> vehículo que le precede o None
+        self.version = None     # `city.vehicles_version` incorporada
+        self.cambios = None
+
+    def __len__(self):
+        return len(self._carril)
+
+    def __contains__(self, vehicle):
+        return vehicle in self._carril
+
+    # -------------------------------------------------------
+    def lane_of(self, vehicle):
+        """Carril (dirección, eje) que corresponde al vehículo ahora."""
+        d = vehicle.direction
+        if d >= ESTE:
+            roads, eje = self.h_roads, vehicle.y
+        else:
+            roads, eje = self.v_roads, vehicle.x
+        return (d, _mas_cercana(roads, eje) if roads else eje)
+
+    def lane(self, clave):
+        """Vehículos del carril, de atrás hacia delante (no modificar)."""
+        return self._colas.get(clave, [])
+
+    def leader(self, vehicle):
+        """Vehículo inmediatamente delante en su carril (o None)."""
+        return self._delante.get(vehicle)
+
+    def gap(self, vehicle):
+        """Distancia al líder a lo largo del carril (inf si no hay)."""
+        lider = self._delante.get(vehicle)
+        if lider is None:
+            return float("inf")
+        avance = _AVANCE[self._carril[vehicle][0]]
+        return avance(lider) - avance(vehicle)
+
+    def admits(self, vehicle, min_gap=MIN_GAP):
+        """
+        ¿Cabe `vehicle` en el carril que le corresponde ahora?  Exige
+        `min_gap` hasta el vehículo de delante y hasta el de detrás.
+        """
+        clave = self.lane_of(vehicle)
+        cola = self._colas.get(clave)
+        if not cola:
+            return True
+        avance = _AVANCE[clave[0]]
+        a = avance(vehicle)
+        i = bisect_right(cola, a, key=avance)
+        if i < len(cola) and avance(cola[i]) - a < min_gap:
+            return False
+        return not i or a - avance(cola[i - 1]) >= min_gap
+
+    def steps(self, vehicles, min_gap=MIN_GAP):
+        """
+        Avance permitido de cada vehículo este tick: su velocidad, sin
+        acercarse a menos de `min_gap` de la posición actual del líder.
+        """
+        gap = self.gap
+        return [min(v.speed, max(gap(v) - min_gap, 0.0)) for v in vehicles]
+
+    # -------------------------------------------------------
+    def set_roads(self, h_roads, v_roads):
+        """Cambia el trazado: los carriles se rehacen en el próximo `sync`."""
+        self.h_roads, self.v_roads = list(h_roads), list(v_roads)
+        self.clear()
+
+    def clear(self):
+        self._carril.clear()
+        self._colas.clear()
+        self._delante.clear()
+        self.version = None
+
+    def sync(self, vehicles, version):
+        """
+        Incorpora las altas y bajas desde la última llamada (solo si
+        `version` ha cambiado).  Devuelve True si ha habido que hacerlo.
+        """
+        if version == self.version:
+            return False
+        self.version = version
+        carril = self._carril
+        if carril:
+            presentes = set(vehicles)
+            for v in [v for v in carril if v not in presentes]:
+                self.remove(v)
+        for v in vehicles:
+            if v not in carril:
+                self.insert(v)
+        return True
+
+    def update(self, vehicle):
+        """Recoloca `vehicle` si su carril ha cambiado (giro o rebote)."""
+        anterior = self._carril.get(vehicle)
+        if anterior is None:
+            self.insert(vehicle)
+        elif anterior != self.lane_of(vehicle):
+            self.remove(vehicle)
+            self.insert(vehicle)
+
+    # -------------------------------------------------------
+    def insert(self, vehicle):
+        clave = self.lane_of(vehicle)
+        cola = self._colas.get(clave)
+        if cola is None:
+            cola = self._colas[clave] = []
+        i = bisect_right(cola, _AVANCE[clave[0]](vehicle), key=_AVANCE[clave[0]])
+        cola.insert(i, vehicle)
+        self._carril[vehicle] = clave
+        self._enlazar(vehicle, cola[i + 1] if i + 1 < len(cola) else None)
+        if i:
+            self._enlazar(cola[i - 1], vehicle)
+
+    def remove(self, vehicle):
+        clave = self._carril.pop(vehicle)
+        cola = self._colas[clave]
+        i = cola.index(vehicle)
+        del cola[i]
+        del self._delante[vehicle]
+        if i:
+            self._enlazar(cola[i - 1], cola[i] if i < len(cola) else None)
+        if not cola:
+            del self._colas[clave]
+
+    def _enlazar(self, vehicle, lider):
+        self._delante[vehicle] = lider
+        if self.cambios is not None:
+            self.cambios.add(vehicle)
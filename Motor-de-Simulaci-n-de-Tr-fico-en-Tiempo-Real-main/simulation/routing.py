@@ -0,0 +1,292 @@
+# simulacion_trafico/simulation/routing.py
+"""
+Grafo de carreteras y rutas origen → destino.
+
+`RoadGraph` une cada intersección con la siguiente de su misma
+carretera horizontal (ESTE/OESTE) y vertical (NORTE/SUR), igual que el
+simulador deduce las carreteras de `city.intersections`.  Como cada nodo
+tiene como mucho cuatro vecinos, uno por dirección, el grafo se guarda en
+cuatro arrays de índices: compacto incluso con un millón de nodos, y el
+vecino al que lleva cada tramo es directamente la `Direction` a tomar.
+
+`Router` calcula rutas con A* (heurística Manhattan, admisible porque
+todos los tramos son rectos y alineados con los ejes) y las guarda en una
+caché LRU acotada por (origen, destino).  Cortar una carretera invalida
+solo las rutas cacheadas que pasan por ese tramo; los vehículos que ya la
+llevan recalculan al llegar al cruce anterior al corte.
+
+Los nodos son los índices de `city.intersections`; como las
+intersecciones solo se añaden al final, siguen siendo válidos cuando el
+trazado crece.
+"""
+
+import heapq
+from array import array
+from collections import OrderedDict
+
+from environment.enums import Direction
+
+NORTE, SUR, ESTE, OESTE = Direction
+
+# Vecino "ninguno" en los arrays de adyacencia
+SIN_VECINO = -1
+
+
+class Route:
+    """
+    Ruta en curso de un vehículo: `nodes` (índices de intersección) e
+    `index` del próximo nodo a alcanzar.
+    """
+    __slots__ = ("nodes", "index")
+
+    def __init__(self, nodes, index=1):
+        self.nodes = nodes
+        self.index = index
+
+    @property
+    def destination(self):
+        return self.nodes[-1]
+
+    @property
+    def done(self):
+        return self.index >= len(self.nodes)
+
+
+# ────────────────────────────────────────────────────────────
+#  Grafo
+# ────────────────────────────────────────────────────────────
+class RoadGraph:
+    """
+    Grafo de carreteras: nodo = intersección, arista = tramo entre dos
+    intersecciones consecutivas de una misma carretera.  Coste = longitud.
+    """
+
+    def __init__(self, intersections):
+        self.ids = [ix.id_ for ix in intersections]
+        self.index = {id_: i for i, id_ in enumerate(self.ids)}
+        self.xs = [ix.location[0] for ix in intersections]
+        self.ys = [ix.location[1] for ix in intersections]
+        n = len(self.ids)
+        vacio = array("q", [SIN_VECINO]) * n
+        # Vecino en cada dirección, indexado por código de `Direction`
+        self.vecinos = (array("q", vacio), array("q", vacio),
+                        array("q", vacio), array("q", vacio))
+        self._enlazar(n)
+        self.closed = set()         # tramos cortados: (min, max)
+
+    def _enlazar(self, n):
+        xs, ys = self.xs, self.ys
+        norte, sur, este, oeste = self.vecinos
+        # Carreteras horizontales: misma y, orden por x
+        orden = sorted(range(n), key=lambda i: (ys[i], xs[i]))
+        for a, b in zip(orden, orden[1:]):
+            if ys[a] == ys[b]:
+                este[a], oeste[b] = b, a
+        # Carreteras verticales: misma x, orden por y
+        orden.sort(key=lambda i: (xs[i], ys[i]))
+        for a, b in zip(orden, orden[1:]):
+            if xs[a] == xs[b]:
+                norte[a], sur[b] = b, a
+
+    def __len__(self):
+        return len(self.ids)
+
+    # -------------------------------------------------------
+    @staticmethod
+    def edge(a, b):
+        return (a, b) if a < b else (b, a)
+
+    def is_closed(self, a, b):
+        return bool(self.closed) and self.edge(a, b) in self.closed
+
+    def direction(self, a, b):
+        """Dirección que lleva de `a` a su vecino `b` (None si no lo son)."""
+        for d in Direction:
+            if self.vecinos[d][a] == b:
+                return d
+        return None
+
+    def cost(self, a, b):
+        return abs(self.xs[a] - self.xs[b]) + abs(self.ys[a] - self.ys[b])
+
+    # -------------------------------------------------------
+    def astar(self, origen, destino):
+        """
+        Camino más corto (tupla de nodos, ambos extremos incluidos) o
+        None si `destino` no es alcanzable.
+        """
+        if origen == destino:
+            return (origen,)
+        xs, ys = self.xs, self.ys
+        tx, ty = xs[destino], ys[destino]
+        vecinos = self.vecinos
+        cerrados = self.closed
+        g = {origen: 0.0}
+        padre = {origen: None}
+        # (f, h, nodo): a igual f se expande antes el más cercano al
+        # destino, lo que evita abrir el abanico de empates de una rejilla
+        h0 = abs(xs[origen] - tx) + abs(ys[origen] - ty)
+        abiertos = [(h0, h0, origen)]
+        push, pop = heapq.heappush, heapq.heappop
+
+        while abiertos:
+            _, _, a = pop(abiertos)
+            if a == destino:
+                camino = []
+                while a is not None:
+                    camino.append(a)
+                    a = padre[a]
+                return tuple(reversed(camino))
+            ga = g[a]
+            xa, ya = xs[a], ys[a]
+            for vec in vecinos:
+                b = vec[a]
+                if b == SIN_VECINO:
+                    continue
+                if cerrados and ((a, b) if a < b else (b, a)) in cerrados:
+                    continue
+                xb, yb = xs[b], ys[b]
+                gb = ga + abs(xa - xb) + abs(ya - yb)
+                if gb < g.get(b, float("inf")):
+                    g[b] = gb
+                    padre[b] = a
+                    h = abs(xb - tx) + abs(yb - ty)
+                    push(abiertos, (gb + h, h, b))
+        return None
+
+
+def _usa(camino, tramo):
+    """¿Recorre `camino` el tramo (a, b)?  Un camino mínimo no repite nodos."""
+    a, b = tramo
+    try:
+        i = camino.index(a)
+    except ValueError:
+        return False
+    return (i + 1 < len(camino) and camino[i + 1] == b) or (i > 0 and camino[i - 1] == b)
+
+
+# ────────────────────────────────────────────────────────────
+#  Rutas con caché
+# ────────────────────────────────────────────────────────────
+class Router:
+    """
+    Calcula y cachea rutas sobre un `RoadGraph`.
+
+    La caché es un LRU de como mucho `maxsize` rutas por (origen,
+    destino).  Cada entrada recuerda cuántos cortes había al calcularla;
+    al volver a pedirla solo se comprueban los cortes posteriores, y si
+    alguno cae en la ruta se recalcula.  Así cortar una carretera es O(1)
+    y no hace falta un índice tramo → rutas (millones de entradas con
+    rutas largas).  Un par sin camino sigue sin él tras un corte.
+    Reabrir un tramo vacía la caché: cualquier ruta podría haber dejado
+    de ser la más corta.
+    """
+
+    def __init__(self, graph, maxsize=4096):
+        self.graph = graph
+        self.maxsize = maxsize
+        self._cache = OrderedDict()     # (o, d) -> (nodos o None, nº cortes)
+        self._cortes = []               # tramos cortados, en orden
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.completed = 0              # viajes terminados (o abandonados)
+
+    # -------------------------------------------------------
+    def route(self, origen, destino):
+        """Nodos de la ruta más corta (tupla) o None si no hay camino."""
+        clave = (origen, destino)
+        cache = self._cache
+        entrada = cache.get(clave)
+        if entrada is not None:
+            camino, visto = entrada
+            cortes = len(self._cortes)
+            if visto == cortes or camino is None:
+                cache.move_to_end(clave)
+                self.hits += 1
+                return camino
+            if not any(_usa(camino, t) for t in self._cortes[visto:]):
+                cache[clave] = (camino, cortes)
+                cache.move_to_end(clave)
+                self.hits += 1
+                return camino
+            del cache[clave]
+            self.invalidated += 1
+        self.misses += 1
+        camino = self.graph.astar(origen, destino)
+        cache[clave] = (camino, len(self._cortes))
+        if len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return camino
+
+    def route_ids(self, origen_id, destino_id):
+        """Como `route`, con ids de intersección."""
+        idx = self.graph.index
+        return self.route(idx[origen_id], idx[destino_id])
+
+    # -------------------------------------------------------
+    def close_road(self, a, b):
+        """
+        Corta el tramo a–b (nodos vecinos, ambos sentidos).  Las rutas
+        cacheadas que lo usan se recalculan al pedirlas.
+        """
+        tramo = RoadGraph.edge(a, b)
+        if tramo not in self.graph.closed:
+            self.graph.closed.add(tramo)
+            self._cortes.append(tramo)
+
+    def open_road(self, a, b):
+        """Reabre el tramo a–b y vacía la caché."""
+        self.graph.closed.discard(RoadGraph.edge(a, b))
+        self.clear()
+
+    def clear(self):
+        self._cache.clear()
+        self._cortes.clear()
+
+    def rebuild(self, intersections):
+        """
+        Rehace el grafo tras cambiar el trazado, conservando los cortes.
+        Las rutas en curso siguen valiendo (los índices no cambian); la
+        caché se vacía.
+        """
+        cerrados = self.graph.closed
+        self.graph = RoadGraph(intersections)
+        self.graph.closed = cerrados
+        self.clear()
+
+    def stats(self):
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+            "completed": self.completed,
+            "closed": len(self.graph.closed),
+        }
+
+    # -------------------------------------------------------
+    def follow(self, vehicle, nodo):
+        """
+        Llamar cuando `vehicle` (con `route`) está sobre la intersección
+        `nodo`.  Si es el siguiente de su ruta, lo orienta hacia el
+        próximo tramo (recalculando si está cortado); al llegar al
+        destino le quita la ruta.
+        """
+        ruta = vehicle.route
+        nodos, i = ruta.nodes, ruta.index
+        if i >= len(nodos) or nodos[i] != nodo:
+            return
+        i += 1
+        if i < len(nodos) and self.graph.is_closed(nodo, nodos[i]):
+            nuevo = self.route(nodo, nodos[-1])
+            if nuevo is None:
+                i = len(nodos)              # destino inalcanzable: abandona
+            else:
+                ruta.nodes, nodos, i = nuevo, nuevo, 1
+        if i >= len(nodos):
+            vehicle.route = None
+            self.completed += 1
+            return
+        ruta.index = i
+        vehicle.direction = self.graph.direction(nodo, nodos[i])
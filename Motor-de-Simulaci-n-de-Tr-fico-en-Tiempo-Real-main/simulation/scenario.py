@@ -0,0 +1,182 @@
+# simulacion_trafico/simulation/scenario.py
+"""
+Carga de escenarios declarativos (JSON) para construir City + Simulator.
+
+Formato mínimo:
+
+    {
+      "name": "demo",
+      "seed": 42,                      # opcional
+      "update_interval": 120,          # opcional (frames por paso de semáforo)
+      "offset_step": 10,               # opcional (desfase entre semáforos)
+      "traffic_lights": [
+        {"id": "T1", "x": 100, "y": 100,
+         "green_time": 3, "yellow_time": 1, "red_time": 3, "state": "RED"}
+      ],
+      "intersections": [{"id": "I1", "x": 100, "y": 100}],
+      "vehicles": [
+        {"id": "V1", "x": 150, "y": 150, "speed": 2.0, "direction": "ESTE"}
+      ]
+    }
+
+Los semáforos admiten además "timer" y "offset" (desfase en frames, en
+lugar de la escalera de `offset_step`).  "trips" lista viajes con ruta:
+{"id": "R1", "from": "I1", "to": "I12", "speed": 2.0}.
+"car_following": true (o {"min_gap": 25}) activa el seguimiento de
+vehículos y las colas en los semáforos.
+
+Para ciudades grandes, la sección "generate" describe la cuadrícula, el
+plan de tiempos y la población en lugar de enumerarlos (ver
+`simulation.generators`); lo enumerado en las listas se añade después.
+"""
+
+import gc
+import json
+import random
+from pathlib import Path
+
+from environment.City import City
+from environment.enums import LightState
+from environment.Vehicle import Vehicle
+from environment.TrafficLight import TrafficLight
+from environment.intersection import Intersection
+from simulation.simulator import Simulator
+from simulation import generators
+
+
+def load_scenario(path):
+    """
+    Lee un escenario JSON y devuelve el diccionario de configuración.
+    """
+    with open(Path(path), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _construir(cfg):
+    """
+    Ciudad, desfases por semáforo (id → frames) y viajes con ruta
+    (id, origen, destino, velocidad) del escenario.
+    """
+    city = City(name=cfg.get("name", "escenario"))
+    offsets, viajes = {}, []
+
+    gen = cfg.get("generate")
+    if gen:
+        offsets, viajes = _generar(city, gen, cfg)
+
+    lights = []
+    for t in cfg.get("traffic_lights", []):
+        tl = TrafficLight(
+            id_=t["id"], x=t["x"], y=t["y"],
+            green_time=t.get("green_time", 10),
+            yellow_time=t.get("yellow_time", 3),
+            red_time=t.get("red_time", 10),
+        )
+        tl.current_state = LightState.parse(t.get("state", "RED"))
+        tl.timer = t.get("timer", 0)
+        if "offset" in t:
+            offsets[tl.id_] = t["offset"]
+        lights.append(tl)
+    city.add_traffic_lights(lights)
+
+    city.add_intersections(
+        Intersection(id_=ix["id"], location=(ix["x"], ix["y"]))
+        for ix in cfg.get("intersections", [])
+    )
+
+    city.add_vehicles(
+        Vehicle(
+            id_=v["id"],
+            position=(v["x"], v["y"]),
+            speed=v.get("speed", 1.0),
+            direction=v.get("direction", "NORTE"),
+        )
+        for v in cfg.get("vehicles", [])
+    )
+
+    viajes += [(t["id"], t["from"], t["to"], t.get("speed", 1.0))
+               for t in cfg.get("trips", [])]
+    return city, offsets, viajes
+
+
+def _generar(city, gen, cfg):
+    """Aplica la sección "generate"; devuelve desfases del plan y viajes."""
+    semilla = gen.get("seed", cfg.get("seed"))
+    rng = random.Random(semilla)
+    prefix = gen.get("prefix", "")
+    timing = gen.get("timing", {})
+    offsets = {}
+
+    if "grid" in gen:
+        intersections, lights = generators.grid_layout(
+            gen["grid"], rng, prefix=prefix,
+            green_time=timing.get("green_time", 10),
+            yellow_time=timing.get("yellow_time", 3),
+            red_time=timing.get("red_time", 10),
+        )
+        offsets = generators.timing_plan(
+            lights, timing, rng, update_interval=cfg.get("update_interval", 120)
+        )
+        city.add_intersections(intersections)
+        city.add_traffic_lights(lights)
+
+    if "vehicles" in gen:
+        city.add_vehicles(generators.populate(gen["vehicles"], city.intersections,
+                                              rng, prefix=prefix))
+    viajes = []
+    if "trips" in gen:
+        viajes = generators.trips(gen["trips"], city.intersections, rng, prefix=prefix)
+    return offsets, viajes
+
+
+def _sin_gc(fn, *args):
+    """
+    Ejecuta `fn` con el GC desactivado: una ciudad grande crea millones
+    de objetos de golpe (ninguno forma ciclos) y las pasadas del GC sobre
+    ellos multiplican el tiempo de carga.  Al terminar se congelan
+    (`gc.freeze`): viven lo que la simulación y así las pasadas
+    posteriores no vuelven a recorrerlos en cada tick.
+    """
+    gc_activo = gc.isenabled()
+    gc.disable()
+    try:
+        return fn(*args)
+    finally:
+        if gc_activo:
+            gc.freeze()
+            gc.enable()
+
+
+def build_city(cfg):
+    """
+    Construye una `City` con los semáforos, intersecciones y vehículos
+    descritos (o generados) en el escenario.  Los viajes con ruta
+    necesitan el simulador: ver `build_simulator`.
+    """
+    return _sin_gc(_construir, cfg)[0]
+
+
+def _simulador(cfg, engine, seed):
+    city, offsets, viajes = _construir(cfg)
+    seguimiento = cfg.get("car_following", False)
+    sim = Simulator(
+        city,
+        engine=engine,
+        seed=cfg.get("seed") if seed is None else seed,
+        update_interval=cfg.get("update_interval", 120),
+        offset_step=cfg.get("offset_step", 10),
+        offsets=offsets,
+        car_following=bool(seguimiento),
+        min_gap=seguimiento.get("min_gap") if isinstance(seguimiento, dict) else None,
+    )
+    for id_, origen, destino, speed in viajes:
+        sim.add_trip(id_, origen, destino, speed)
+    return sim
+
+
+def build_simulator(cfg, engine="python", seed=None):
+    """
+    Construye ciudad y simulador.  `seed` tiene prioridad sobre la
+    semilla del escenario.
+    """
+    return _sin_gc(_simulador, cfg, engine, seed)
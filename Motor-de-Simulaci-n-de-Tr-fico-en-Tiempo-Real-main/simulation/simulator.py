@@ -1,25 +1,59 @@
 # simulacion_trafico/simulation/simulator.py
 import random
+from bisect import bisect_left
+from time import perf_counter
+
+import numpy as np
+
+from environment.enums import Direction, LightState
+from environment.Vehicle import Vehicle
+from environment.light_scheduler import LightScheduler
+from simulation.spatial import StaticGridIndex, VehicleGrid
+from simulation.generators import road_extents
+
+# Tolerancia (px) para considerar que un vehículo está sobre un semáforo
+# o una intersección
+TOL = 5
+
+# Lado de celda de la rejilla de vehículos: varias veces la velocidad
+# típica, para que en cada tick cambien de celda pocos vehículos
+VEHICLE_CELL = 50
+
+# Fases de un tick, en orden de ejecución
+PHASES = ("lights", "proceed", "move", "align", "clamp", "reorient", "index")
+
+NORTE, SUR, ESTE, OESTE = Direction
+RED = LightState.RED
+_GIROS_V = (ESTE, OESTE)       # opciones al girar desde NORTE/SUR
+_GIROS_H = (NORTE, SUR)        # opciones al girar desde ESTE/OESTE
 
 
 # ────────────────────────────────────────────────────────────
 #  Helpers de lógica de tráfico
 # ────────────────────────────────────────────────────────────
-def can_vehicle_proceed(vehicle, traffic_lights, tol=5):
-    x, y = vehicle.position
+def can_vehicle_proceed(vehicle, traffic_lights, tol=TOL, index=None):
+    """
+    Indica si el vehículo puede avanzar sin pisar un semáforo en ROJO.
+    Con `index` (StaticGridIndex de semáforos) solo se revisan los
+    semáforos cercanos a la siguiente posición.
+    """
+    x, y = vehicle.x, vehicle.y
     s = vehicle.speed
+    d = vehicle.direction
 
-    if vehicle.direction == "ESTE":
+    if d == ESTE:
         nx, ny = x + s, y
-    elif vehicle.direction == "OESTE":
+    elif d == OESTE:
         nx, ny = x - s, y
-    elif vehicle.direction == "NORTE":
+    elif d == NORTE:
         nx, ny = x, y + s
     else:                           # SUR
         nx, ny = x, y - s
 
+    if index is not None:
+        traffic_lights = index.candidatos(nx, ny)
     for tl in traffic_lights:
-        if tl.current_state != "RED":
+        if tl.current_state != RED:
             continue
         if abs(nx - tl.x) <= tol and abs(ny - tl.y) <= tol:
             return False
@@ -28,17 +62,28 @@ def can_vehicle_proceed(vehicle, traffic_lights, tol=5):
 
 def align_to_road(vehicle, h_roads, v_roads):
     """
-    Centra el vehículo sobre el eje de la carretera más cercana.
-    Si todavía no hay carreteras definidas, no hace nada.
+    Centra el vehículo sobre el eje de la carretera más cercana
+    (`h_roads` / `v_roads` ordenadas).  Si todavía no hay carreteras definidas, no hace nada.
     """
-    x, y = vehicle.position
+    if vehicle.direction >= ESTE:
+        if h_roads:
+            vehicle.y = _mas_cercana(h_roads, vehicle.y)
+    elif v_roads:
+        vehicle.x = _mas_cercana(v_roads, vehicle.x)
 
-    if vehicle.direction in ("ESTE", "OESTE") and h_roads:
-        y = min(h_roads, key=lambda ry: abs(ry - y))
-    elif vehicle.direction in ("NORTE", "SUR") and v_roads:
-        x = min(v_roads, key=lambda rx: abs(rx - x))
 
-    vehicle.position = (x, y)
+def _mas_cercana(roads, val):
+    """
+    Carretera de `roads` (ordenada) más próxima a `val`, por bisección.
+    En caso de empate gana la menor, igual que `min()`.
+    """
+    k = bisect_left(roads, val)
+    if k == 0:
+        return roads[0]
+    if k == len(roads):
+        return roads[-1]
+    lo, hi = roads[k - 1], roads[k]
+    return lo if abs(lo - val) <= abs(hi - val) else hi
 
 
 def clamp_and_bounce_on_road(vehicle, h_ext, v_ext):
@@ -47,100 +92,398 @@ def clamp_and_bounce_on_road(vehicle, h_ext, v_ext):
     dirección al tocar un borde.  Si aún no hay límites definidos,
     no hace nada.
     """
-    x, y = vehicle.position
-    d = vehicle.direction
-
-    if d in ("ESTE", "OESTE") and y in h_ext:
-        mn, mx = h_ext[y]
-        if x < mn:
-            x, vehicle.direction = mn, "ESTE"
-        elif x > mx:
-            x, vehicle.direction = mx, "OESTE"
-    elif d in ("NORTE", "SUR") and x in v_ext:
-        mn, mx = v_ext[x]
-        if y < mn:
-            y, vehicle.direction = mn, "NORTE"
-        elif y > mx:
-            y, vehicle.direction = mx, "SUR"
-
-    vehicle.position = (x, y)
+    if vehicle.direction >= ESTE:
+        ext = h_ext.get(vehicle.y)
+        if ext is not None:
+            x = vehicle.x
+            if x < ext[0]:
+                vehicle.x, vehicle.direction = ext[0], ESTE
+            elif x > ext[1]:
+                vehicle.x, vehicle.direction = ext[1], OESTE
+    else:
+        ext = v_ext.get(vehicle.x)
+        if ext is not None:
+            y = vehicle.y
+            if y < ext[0]:
+                vehicle.y, vehicle.direction = ext[0], NORTE
+            elif y > ext[1]:
+                vehicle.y, vehicle.direction = ext[1], SUR
 
 
-def reorient_vehicle(vehicle, intersections, tol=5, prob=0.3):
+def reorient_vehicle(vehicle, intersections, tol=TOL, prob=0.3, index=None, rng=random,
+                     router=None):
+    """
+    Sobre una intersección, el vehículo con ruta (y `router`) toma el
+    tramo que le toca; el resto gira al azar con probabilidad `prob`.
+    """
     if not vehicle.moving:
         return
 
-    x, y = vehicle.position
+    x, y = vehicle.x, vehicle.y
+    if index is not None:
+        intersections = index.candidatos(x, y)
     for inter in intersections:
         ix, iy = inter.location
         if abs(x - ix) <= tol and abs(y - iy) <= tol:
-            if vehicle.direction in ("ESTE", "OESTE"):
-                opts = ["NORTE", "SUR"]
-            else:
-                opts = ["ESTE", "OESTE"]
-            if random.random() < prob:
-                vehicle.direction = random.choice(opts)
+            if router is not None and vehicle.route is not None:
+                router.follow(vehicle, router.graph.index[inter.id_])
+                break
+            opts = _GIROS_H if vehicle.direction >= ESTE else _GIROS_V
+            if rng.random() < prob:
+                vehicle.direction = rng.choice(opts)
             break
 
 
+def _estado_inicial(vehicle):
+    """Lo que `_retener` necesita para deshacer el tick de un vehículo."""
+    ruta = vehicle.route
+    if ruta is None:
+        return (vehicle.direction, vehicle.x, vehicle.y, None, None, 0)
+    return (vehicle.direction, vehicle.x, vehicle.y, ruta, ruta.nodes, ruta.index)
+
+
+def _retener(vehicle, inicio):
+    """Devuelve el vehículo a su estado inicial del tick, detenido."""
+    d, x, y, ruta, nodos, i = inicio
+    vehicle.direction, vehicle.x, vehicle.y = d, x, y
+    vehicle.moving = False
+    vehicle.route = ruta
+    if ruta is not None:
+        ruta.nodes, ruta.index = nodos, i
+
+
 # ────────────────────────────────────────────────────────────
 #  Clase principal de simulación
 # ────────────────────────────────────────────────────────────
 class Simulator:
     """
     Orquesta la simulación con semáforos desfasados en escalera.
+
+    `engine` selecciona cómo se actualizan los vehículos:
+      • "python": recorrido objeto a objeto (por defecto).
+      • "numpy" : motor struct-of-arrays de `simulation.vectorized`,
+                  recomendable a partir de unos pocos miles de vehículos.
+
+    `seed` fija el generador de los giros aleatorios: dos simuladores con
+    la misma ciudad y la misma semilla evolucionan exactamente igual.
+
+    `offsets` (id de semáforo → desfase en frames) sustituye la escalera
+    de `offset_step` para los semáforos que aparezcan (planes de tiempos
+    de `simulation.generators`).
+
+    Los vehículos con ruta (`add_trip`) siguen el camino más corto hasta
+    su destino; el grafo y el `Router` se construyen al pedir la primera.
+
+    Con `car_following` cada vehículo respeta una distancia `min_gap`
+    con el de delante en su carril (`simulation.lanes.LaneIndex`), así
+    que nadie atraviesa a nadie y se forman colas tras los semáforos en
+    rojo.  Desactivado por defecto: sin él la evolución es la de siempre.
+
+    `vehicle_index` (rejilla `VehicleGrid`) responde qué vehículos hay
+    cerca de un punto o dentro de un rectángulo; se crea al pedirlo y
+    desde entonces cada tick lo mantiene al día.
     """
 
-    def __init__(self, city):
+    def __init__(self, city, engine="python", seed=None,
+                 update_interval=120, offset_step=10, offsets=None,
+                 car_following=False, min_gap=None):
         self.city = city
-        coords = [ix.location for ix in city.intersections]
-
-        # Carreteras horizontales y verticales
-        self.h_roads = sorted({y for _, y in coords})
-        self.v_roads = sorted({x for x, _ in coords})
-
-        # Límites de cada carretera
-        self.h_ext = {
-            y: (min(x for x, yy in coords if yy == y),
-                max(x for x, yy in coords if yy == y))
-            for y in self.h_roads
-        }
-        self.v_ext = {
-            x: (min(y for xx, y in coords if xx == x),
-                max(y for xx, y in coords if xx == x))
-            for x in self.v_roads
-        }
+        self.rng = random.Random(seed)
+        self._router = None
+        self._vehicle_index = None
+        self.lanes = None
+        self._build_layout()
+        if car_following:
+            from simulation.lanes import LaneIndex, MIN_GAP
+            self.lanes = LaneIndex(self.h_roads, self.v_roads)
+        self.min_gap = MIN_GAP if car_following and min_gap is None else min_gap
 
         # Semáforos: cambia cada 120 frames (~2 s)
-        self.update_interval = 120
+        self.update_interval = update_interval
 
         # Orden de activación: fila (y) asc, luego columna (x) asc
-        sorted_tls = sorted(city.traffic_lights, key=lambda tl: (tl.y, tl.x))
-        self.tl_offsets = {tl: idx * 10 for idx, tl in enumerate(sorted_tls)}
+        # (ordenado en bloque con las coordenadas del índice de semáforos)
+        lights = city.traffic_lights
+        orden = np.lexsort((self.tl_index.xs, self.tl_index.ys)).tolist()
+        sorted_tls = [lights[i] for i in orden]
+        self.tl_offsets = {tl: idx * offset_step for idx, tl in enumerate(sorted_tls)}
+        if offsets:
+            for tl in city.traffic_lights:
+                off = offsets.get(tl.id_)
+                if off is not None:
+                    self.tl_offsets[tl] = off
 
         self.frame_count = 0
+        self._programar_semaforos()
+
+        # Motor de vehículos
+        if engine == "numpy":
+            from simulation.vectorized import VectorEngine
+            self._vector = VectorEngine(city)
+        elif engine == "python":
+            self._vector = None
+        else:
+            raise ValueError(f"Motor desconocido: {engine!r}")
+        self.engine = engine
+
+    # -------------------------------------------------------
+    def _build_layout(self):
+        """
+        Deriva carreteras, límites e índices espaciales de los elementos
+        estáticos de la ciudad.  Se recalcula solo cuando se añaden
+        semáforos o intersecciones (`city.layout_version`).
+        """
+        # Carreteras horizontales y verticales con sus límites
+        h_ext, v_ext = road_extents(self.city.intersections)
+        self.h_roads = sorted(h_ext)
+        self.v_roads = sorted(v_ext)
+        self.h_ext = {y: h_ext[y] for y in self.h_roads}
+        self.v_ext = {x: v_ext[x] for x in self.v_roads}
+
+        # Índices de proximidad: cada objeto se apunta en las celdas que
+        # toca su caja ±TOL (con celda = 4·TOL, casi siempre una sola)
+        self.tl_index = StaticGridIndex(
+            self.city.traffic_lights, key=lambda tl: (tl.x, tl.y), cell=4 * TOL, radio=TOL
+        )
+        self.ix_index = StaticGridIndex(
+            self.city.intersections, key=lambda ix: ix.location, cell=4 * TOL, radio=TOL
+        )
+        self.layout_version = self.city.layout_version
+
+        if self._router is not None:
+            self._router.rebuild(self.city.intersections)
+        if self.lanes is not None:
+            self.lanes.set_roads(self.h_roads, self.v_roads)
+
+    @property
+    def router(self):
+        """`Router` sobre el grafo de carreteras (se crea al primer uso)."""
+        if self._router is None:
+            from simulation.routing import Router, RoadGraph
+            self._router = Router(RoadGraph(self.city.intersections))
+        return self._router
+
+    @property
+    def vehicle_index(self):
+        """
+        `VehicleGrid` con los vehículos de la ciudad (se crea al primer
+        uso).  Las altas y bajas posteriores al último tick se incorporan
+        al consultarlo.
+        """
+        if self._vehicle_index is None:
+            self._vehicle_index = VehicleGrid(cell=VEHICLE_CELL)
+        city = self.city
+        self._vehicle_index.sync(city.vehicles, city.vehicles_version)
+        return self._vehicle_index
+
+    def _refresh_vehicle_index(self):
+        grid, city = self._vehicle_index, self.city
+        if self._vector is not None:
+            self._vector.refrescar_rejilla(grid)
+        else:
+            grid.sync(city.vehicles, city.vehicles_version)
+            grid.refresh(city.vehicles)
+
+    def add_trip(self, id_, origen, destino, speed=1.0):
+        """
+        Da de alta un vehículo en la intersección `origen` con ruta hasta
+        `destino` (ids).  Devuelve el vehículo, o None si no hay camino.
+        """
+        from simulation.routing import Route
+        router = self.router
+        nodos = router.route_ids(origen, destino)
+        if not nodos or len(nodos) < 2:
+            return None
+        graph = router.graph
+        v = Vehicle(id_, (graph.xs[nodos[0]], graph.ys[nodos[0]]), speed,
+                    graph.direction(nodos[0], nodos[1]))
+        v.route = Route(nodos)
+        return v if self.city.add_vehicle(v) else None
+
+    def _programar_semaforos(self):
+        """
+        (Re)construye el planificador de semáforos a partir de
+        `tl_offsets` y del `frame_count` actual.
+        """
+        self.light_scheduler = LightScheduler(self.update_interval, tick=self.frame_count)
+        self.light_scheduler.add_many(self.tl_offsets.items())
+        self.changed_lights = []
+
+    def sync_lights(self):
+        """
+        Pone al día el `timer` de todos los semáforos (el planificador
+        solo los actualiza al cambiar de color).
+        """
+        self.light_scheduler.sync()
 
     # -------------------------------------------------------
     def update(self):
         self.frame_count += 1
+        if self.layout_version != self.city.layout_version:
+            self._build_layout()
 
-        # Semáforos
-        for tl, offset in self.tl_offsets.items():
-            if (self.frame_count - offset) % self.update_interval == 0:
-                tl.update_state()
+        # Semáforos: solo los que cambian de color en este frame
+        self.changed_lights = self.light_scheduler.advance(self.frame_count)
 
         # Vehículos
-        for v in self.city.vehicles:
-            if can_vehicle_proceed(v, self.city.traffic_lights):
-                v.move()
+        if self._vector is not None:
+            self._vector.step(self)
+        elif self.lanes is not None:
+            self._update_following()
+        else:
+            for v in self.city.vehicles:
+                if can_vehicle_proceed(v, self.city.traffic_lights, index=self.tl_index):
+                    v.move()
+                    v.moving = True
+                else:
+                    v.moving = False
+
+                align_to_road(v, self.h_roads, self.v_roads)
+                clamp_and_bounce_on_road(v, self.h_ext, self.v_ext)
+                reorient_vehicle(v, self.city.intersections, index=self.ix_index, rng=self.rng,
+                                 router=self._router)
+
+        if self._vehicle_index is not None:
+            self._refresh_vehicle_index()
+
+    def _update_following(self):
+        """
+        `update()` con seguimiento de vehículos.  El avance permitido se
+        calcula para todos con las posiciones del inicio del tick, y los
+        cambios de carril se aplican al final, en el orden de la ciudad
+        (igual que el motor NumPy).
+        """
+        vehs, lanes = self.city.vehicles, self.lanes
+        lanes.sync(vehs, self.city.vehicles_version)
+        pasos = lanes.steps(vehs, self.min_gap)
+        lights, tl_index = self.city.traffic_lights, self.tl_index
+        inters, ix_index, rng, router = self.city.intersections, self.ix_index, self.rng, self._router
+        girados = []
+        for v, paso in zip(vehs, pasos):
+            inicio = _estado_inicial(v)
+            d = inicio[0]
+            if paso > 0 and can_vehicle_proceed(v, lights, index=tl_index):
+                v.move(paso)
                 v.moving = True
             else:
                 v.moving = False
 
             align_to_road(v, self.h_roads, self.v_roads)
             clamp_and_bounce_on_road(v, self.h_ext, self.v_ext)
-            reorient_vehicle(v, self.city.intersections)
+            reorient_vehicle(v, inters, index=ix_index, rng=rng, router=router)
+            if v.direction != d:
+                girados.append((v, inicio))
+        self._cambiar_carriles(girados)
+
+    def _cambiar_carriles(self, girados):
+        """
+        Aplica, en orden, los cambios de carril (v, estado inicial) del
+        tick.  Si en el carril de destino no queda `min_gap` libre, el
+        giro o rebote se deshace: el vehículo vuelve a donde empezó el
+        tick, detenido, y lo reintenta en el siguiente.
+        """
+        lanes, min_gap = self.lanes, self.min_gap
+        for v, inicio in girados:
+            if lanes.admits(v, min_gap):
+                lanes.update(v)
+            else:
+                _retener(v, inicio)
+
+    def instrument(self, observer):
+        """
+        Activa la instrumentación por fases: cada tick se ejecuta con
+        `update_phased` y se llama a `observer(inicio, duracion, tiempos)`.
+        Con `observer=None` se desactiva y `update` vuelve a ser el método
+        original, sin ningún coste añadido en el bucle.
+        """
+        if observer is None:
+            self.__dict__.pop("update", None)
+            self._observer = None
+            return
+        self._observer = observer
+        self._tiempos = {}
+        self.update = self._update_instrumented
+
+    def _update_instrumented(self):
+        tiempos = self._tiempos
+        tiempos.clear()
+        t0 = perf_counter()
+        self.update_phased(tiempos)
+        self._observer(t0, perf_counter() - t0, tiempos)
+
+    def update_phased(self, tiempos):
+        """
+        Equivalente a `update()`, pero ejecuta cada fase sobre todos los
+        vehículos antes de pasar a la siguiente y acumula en `tiempos`
+        (dict fase → segundos) lo que tarda cada una.  El resultado es
+        idéntico porque las fases de un vehículo no dependen de los demás.
+        """
+        t0 = perf_counter()
+        self.frame_count += 1
+        if self.layout_version != self.city.layout_version:
+            self._build_layout()
+        self.changed_lights = self.light_scheduler.advance(self.frame_count)
+        t1 = perf_counter()
+        tiempos["lights"] = tiempos.get("lights", 0.0) + (t1 - t0)
+
+        if self._vector is not None:
+            self._vector.step(self, tiempos=tiempos)
+        else:
+            self._phased_python(tiempos, t1)
+
+        if self._vehicle_index is not None:
+            t7 = perf_counter()
+            self._refresh_vehicle_index()
+            tiempos["index"] = tiempos.get("index", 0.0) + (perf_counter() - t7)
+
+    def _phased_python(self, tiempos, t1):
+        """Fases del motor Python de `update_phased`."""
+        vehs, lanes = self.city.vehicles, self.lanes
+        lights, tl_index = self.city.traffic_lights, self.tl_index
+        oks = [can_vehicle_proceed(v, lights, index=tl_index) for v in vehs]
+        if lanes is not None:
+            lanes.sync(vehs, self.city.vehicles_version)
+            pasos = lanes.steps(vehs, self.min_gap)
+            antes = [_estado_inicial(v) for v in vehs]
+        t2 = perf_counter()
+        if lanes is None:
+            for v, ok in zip(vehs, oks):
+                if ok:
+                    v.move()
+                v.moving = ok
+        else:
+            for v, ok, paso in zip(vehs, oks, pasos):
+                v.moving = ok and paso > 0
+                if v.moving:
+                    v.move(paso)
+        t3 = perf_counter()
+        for v in vehs:
+            align_to_road(v, self.h_roads, self.v_roads)
+        t4 = perf_counter()
+        for v in vehs:
+            clamp_and_bounce_on_road(v, self.h_ext, self.v_ext)
+        t5 = perf_counter()
+        inters, ix_index, rng = self.city.intersections, self.ix_index, self.rng
+        router = self._router
+        for v in vehs:
+            reorient_vehicle(v, inters, index=ix_index, rng=rng, router=router)
+        if lanes is not None:
+            self._cambiar_carriles(
+                [(v, inicio) for v, inicio in zip(vehs, antes) if v.direction != inicio[0]]
+            )
+        t6 = perf_counter()
+
+        for fase, dt in zip(PHASES[1:], (t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5)):
+            tiempos[fase] = tiempos.get(fase, 0.0) + dt
 
     # -------------------------------------------------------
     def get_snapshot(self):
         return self.city.get_snapshot()
+
+    def get_snapshot_delta(self, since=None):
+        eng = self._vector
+        columnas = None
+        if eng is not None and eng._version == self.city.vehicles_version:
+            # Motor al día: sus arrays siguen el orden de city.vehicles
+            columnas = (eng.x, eng.y, eng.speed, eng.dir, eng.moving)
+        return self.city.get_snapshot_delta(since, columnas)
@@ -0,0 +1,295 @@
+# simulacion_trafico/simulation/spatial.py
+"""
+Índices espaciales para consultas de proximidad en la simulación.
+"""
+
+import heapq
+import math
+from itertools import chain
+
+import numpy as np
+
+
+# ────────────────────────────────────────────────────────────
+#  Rejilla estática (semáforos, intersecciones)
+# ────────────────────────────────────────────────────────────
+class StaticGridIndex:
+    """
+    Rejilla hash para objetos que no se mueven una vez creada la ciudad.
+
+    Cada celda guarda ya la lista de objetos de su vecindad, de modo que
+    `candidatos(x, y)` es un único acceso a diccionario.  Sin `radio`, la
+    vecindad es el bloque 3×3 de celdas: con `cell >= tol` cualquier
+    objeto a distancia ≤ tol (en cada eje) de (x, y) aparece entre los
+    candidatos.  Con `radio`, cada objeto se apunta solo en las celdas
+    que toca su caja ±radio (casi siempre una), lo que garantiza lo mismo
+    para tol ≤ radio con muchas menos entradas en ciudades grandes.  La
+    comprobación exacta de la tolerancia la sigue haciendo quien consulta.
+
+    Con `radio` la rejilla se desplaza media celda (`origen`): los
+    trazados suelen usar coordenadas redondas, que así caen en el centro
+    de una celda y no en la frontera entre cuatro.
+
+    `xs` / `ys` guardan las coordenadas de `items` en arrays.  Las
+    listas por celda se construyen en la primera consulta: el motor NumPy
+    solo usa `xs` / `ys` y con un millón de objetos se ahorra ese coste.
+    """
+
+    def __init__(self, items, key, cell=10, radio=None):
+        self.cell = cell
+        self.radio = radio
+        self.origen = 0.0 if radio is None else cell / 2
+        self.items = list(items)
+        n = len(self.items)
+        xy = np.fromiter(chain.from_iterable(map(key, self.items)), np.float64, 2 * n)
+        self.xs, self.ys = xy[0::2], xy[1::2]
+        self._vecindad = None
+
+    def _construir(self):
+        if self.radio is not None:
+            self._vecindad = self._por_cajas(self.cell, self.radio)
+            return self._vecindad
+
+        celdas = {}
+        for it, x, y in zip(self.items, self.xs.tolist(), self.ys.tolist()):
+            celdas.setdefault(self._celda(x, y), []).append(it)
+
+        vecindad = self._vecindad = {}
+        for (cx, cy), bucket in celdas.items():
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    vecindad.setdefault((cx + dx, cy + dy), []).extend(bucket)
+        return vecindad
+
+    def _por_cajas(self, cell, radio):
+        # Celdas de cada caja en bloque; el reparto conserva el orden de
+        # `items` dentro de cada celda
+        o = self.origen
+        x, y = self.xs - o, self.ys - o
+        cajas = (np.floor((x - radio) / cell).astype(np.int64).tolist(),
+                 np.floor((x + radio) / cell).astype(np.int64).tolist(),
+                 np.floor((y - radio) / cell).astype(np.int64).tolist(),
+                 np.floor((y + radio) / cell).astype(np.int64).tolist())
+        vecindad = {}
+        nueva = vecindad.setdefault
+        for it, x0, x1, y0, y1 in zip(self.items, *cajas):
+            if x0 == x1 and y0 == y1:
+                nueva((x0, y0), []).append(it)
+                continue
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    nueva((cx, cy), []).append(it)
+        return vecindad
+
+    def _celda(self, x, y):
+        c, o = self.cell, self.origen
+        return (math.floor((x - o) / c), math.floor((y - o) / c))
+
+    def candidatos(self, x, y):
+        """
+        Objetos que pueden estar a distancia ≤ cell (o ≤ radio) de (x, y).
+        """
+        vecindad = self._vecindad
+        if vecindad is None:
+            vecindad = self._construir()
+        return vecindad.get(self._celda(x, y), ())
+
+    def vecindades(self):
+        """
+        Itera pares (celda, objetos de su vecindad).
+        """
+        vecindad = self._vecindad
+        if vecindad is None:
+            vecindad = self._construir()
+        return vecindad.items()
+
+    def __len__(self):
+        return len(self.items)
+
+
+# ────────────────────────────────────────────────────────────
+#  Rejilla dinámica (vehículos)
+# ────────────────────────────────────────────────────────────
+class VehicleGrid:
+    """
+    Rejilla uniforme de vehículos mantenida de forma incremental.
+
+    Cada celda de lado `cell` guarda el conjunto de vehículos que hay en
+    ella y cada vehículo recuerda su celda: al moverse solo se tocan los
+    que cambian de celda (con `cell` bastante mayor que la velocidad,
+    unos pocos por tick).  `sync()` incorpora altas y bajas y `refresh()`
+    los movimientos; el motor NumPy los detecta en bloque y llama a
+    `move()` solo para los que han cambiado.
+
+    Las consultas (`query_bbox`, `query_radius`, `nearest`) recorren
+    solo las celdas que tocan; si la zona pedida abarca más celdas de
+    las que hay ocupadas, recorren las ocupadas.
+    """
+
+    def __init__(self, cell=50.0):
+        self.cell = cell
+        self._celdas = {}       # (cx, cy) -> {vehículos}
+        self._celda_de = {}     # vehículo -> (cx, cy)
+        self.version = None     # `city.vehicles_version` incorporada
+
+    def __len__(self):
+        return len(self._celda_de)
+
+    def __contains__(self, vehicle):
+        return vehicle in self._celda_de
+
+    def celda(self, x, y):
+        c = self.cell
+        return (math.floor(x / c), math.floor(y / c))
+
+    # -------------------------------------------------------
+    #  Mantenimiento
+    # -------------------------------------------------------
+    def sync(self, vehicles, version):
+        """
+        Incorpora las altas y bajas desde la última llamada (solo si
+        `version` ha cambiado).  Devuelve True si ha habido que hacerlo.
+        """
+        if version == self.version:
+            return False
+        self.version = version
+        celda_de = self._celda_de
+        if celda_de:
+            presentes = set(vehicles)
+            for v in [v for v in celda_de if v not in presentes]:
+                self.remove(v)
+        for v in vehicles:
+            if v not in celda_de:
+                self.move(v, self.celda(v.x, v.y))
+        return True
+
+    def refresh(self, vehicles):
+        """Recoloca los vehículos que han cambiado de celda."""
+        celda_de, c, floor = self._celda_de, self.cell, math.floor
+        for v in vehicles:
+            nueva = (floor(v.x / c), floor(v.y / c))
+            if celda_de.get(v) != nueva:
+                self.move(v, nueva)
+
+    def move(self, vehicle, celda):
+        """Apunta `vehicle` en `celda` (y lo borra de la anterior)."""
+        anterior = self._celda_de.get(vehicle)
+        if anterior == celda:
+            return
+        if anterior is not None:
+            self._quitar(vehicle, anterior)
+        self._celda_de[vehicle] = celda
+        bucket = self._celdas.get(celda)
+        if bucket is None:
+            self._celdas[celda] = {vehicle}
+        else:
+            bucket.add(vehicle)
+
+    def remove(self, vehicle):
+        self._quitar(vehicle, self._celda_de.pop(vehicle))
+
+    def _quitar(self, vehicle, celda):
+        bucket = self._celdas[celda]
+        bucket.discard(vehicle)
+        if not bucket:
+            del self._celdas[celda]
+
+    def clear(self):
+        self._celdas.clear()
+        self._celda_de.clear()
+        self.version = None
+
+    # -------------------------------------------------------
+    #  Consultas
+    # -------------------------------------------------------
+    def _buckets(self, x0, y0, x1, y1):
+        """Conjuntos de las celdas ocupadas que toca el rectángulo."""
+        c = self.cell
+        celdas = self._celdas
+        if not celdas:
+            return
+        cx0, cy0, cx1, cy1 = (math.floor(v / c) if math.isfinite(v) else v
+                              for v in (x0, y0, x1, y1))
+        if not all(math.isfinite(v) for v in (cx0, cy0, cx1, cy1)):
+            # Semiplanos: los límites infinitos se recortan a la extensión
+            # de las celdas ocupadas (si no, inf·0 da nan y range() falla)
+            xs = [cx for cx, _ in celdas]
+            ys = [cy for _, cy in celdas]
+            cx0, cx1 = max(cx0, min(xs)), min(cx1, max(xs))
+            cy0, cy1 = max(cy0, min(ys)), min(cy1, max(ys))
+        if cx0 > cx1 or cy0 > cy1:
+            return
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(celdas):
+            for (cx, cy), bucket in celdas.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield bucket
+            return
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = celdas.get((cx, cy))
+                if bucket:
+                    yield bucket
+
+    def query_bbox(self, x0, y0, x1, y1):
+        """
+        Vehículos con x0 ≤ x ≤ x1 e y0 ≤ y ≤ y1 (admite ±inf para
+        semiplanos, p. ej. "todo lo que está a la derecha de x0").
+        """
+        return [v for bucket in self._buckets(x0, y0, x1, y1) for v in bucket
+                if x0 <= v.x <= x1 and y0 <= v.y <= y1]
+
+    def query_radius(self, x, y, r):
+        """Vehículos a distancia euclídea ≤ r de (x, y)."""
+        r2 = r * r
+        return [v for bucket in self._buckets(x - r, y - r, x + r, y + r) for v in bucket
+                if (v.x - x) ** 2 + (v.y - y) ** 2 <= r2]
+
+    def nearest(self, x, y, k=1):
+        """
+        Los `k` vehículos más cercanos a (x, y), del más cercano al más
+        lejano.  Recorre anillos de celdas alrededor del punto hasta que
+        ningún vehículo sin visitar puede mejorar el k-ésimo.
+        """
+        if k <= 0 or not self._celda_de:
+            return []
+        celdas, c = self._celdas, self.cell
+        cx, cy = self.celda(x, y)
+        mejores = []                # heap de (-d², n, vehículo), tamaño ≤ k
+        n = 0
+
+        def considerar(bucket):
+            nonlocal n
+            for v in bucket:
+                d2 = (v.x - x) ** 2 + (v.y - y) ** 2
+                n += 1
+                if len(mejores) < k:
+                    heapq.heappush(mejores, (-d2, n, v))
+                elif d2 < -mejores[0][0]:
+                    heapq.heapreplace(mejores, (-d2, n, v))
+
+        r = 0
+        while True:
+            anillo = 1 if r == 0 else 8 * r
+            if anillo > len(celdas):
+                # El anillo ya tiene más celdas que ocupadas hay: repasar
+                # las ocupadas que quedan fuera de lo ya visitado
+                for (bx, by), bucket in celdas.items():
+                    if max(abs(bx - cx), abs(by - cy)) >= r:
+                        considerar(bucket)
+                break
+            if r == 0:
+                considerar(celdas.get((cx, cy), ()))
+            else:
+                for i in range(-r, r + 1):
+                    for celda in ((cx + i, cy - r), (cx + i, cy + r)):
+                        considerar(celdas.get(celda, ()))
+                for j in range(-r + 1, r):
+                    for celda in ((cx - r, cy + j), (cx + r, cy + j)):
+                        considerar(celdas.get(celda, ()))
+            # Lo no visitado está al menos a r·cell del punto
+            if len(mejores) == k and -mejores[0][0] <= (r * c) ** 2:
+                break
+            if n >= len(self._celda_de):
+                break
+            r += 1
+        return [v for _, _, v in sorted(mejores, key=lambda t: (-t[0], t[1]))]
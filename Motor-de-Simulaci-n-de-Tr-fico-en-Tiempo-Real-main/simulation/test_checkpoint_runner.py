@@ -0,0 +1,95 @@
+# test_checkpoint_runner.py
+
+import os
+import tempfile
+
+from simulation.scenario import build_simulator
+from simulation.headless import state_digest
+from simulation.checkpoint import save_checkpoint, restore_checkpoint
+
+
+def _escenario():
+    return {"seed": 3, "update_interval": 30,
+            "generate": {"grid": {"rows": 8, "cols": 8, "spacing": 100},
+                         "timing": {"plan": "random", "green_time": 3, "yellow_time": 1,
+                                    "red_time": 3},
+                         "vehicles": {"count": 50, "speed": [1, 3]},
+                         "trips": {"count": 100, "centroids": 10, "speed": [1, 3]}}}
+
+
+def _rutas(sim):
+    return {v.id_: (tuple(v.route.nodes), v.route.index)
+            for v in sim.city.vehicles if v.route is not None}
+
+
+def _ida_y_vuelta(engine, ruta):
+    original = build_simulator(_escenario(), engine=engine)
+    for _ in range(200):
+        original.update()
+    save_checkpoint(original, ruta)
+
+    copia = build_simulator(_escenario(), engine=engine)
+    nveh, _ = restore_checkpoint(copia, ruta)
+    assert copia.rng.getstate() == original.rng.getstate()
+
+    assert nveh == len(original.city.vehicles)
+    assert state_digest(copia) == state_digest(original)
+    rutas = _rutas(original)
+    assert rutas and _rutas(copia) == rutas, "rutas perdidas al restaurar"
+
+    # La continuación es idéntica a la ejecución sin interrumpir
+    for _ in range(500):
+        original.update()
+        copia.update()
+    assert state_digest(copia) == state_digest(original)
+
+
+def test_checkpoint_con_rutas():
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "zona.ckpt")
+        for engine in ("python", "numpy"):
+            _ida_y_vuelta(engine, ruta)
+
+
+def test_trazado_distinto_no_toca_la_ciudad():
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "zona.ckpt")
+        save_checkpoint(build_simulator(_escenario()), ruta)
+        otro = _escenario()
+        otro["generate"]["grid"]["rows"] = 7
+        for engine in ("python", "numpy"):
+            sim = build_simulator(otro, engine=engine)
+            antes = state_digest(sim)
+            try:
+                restore_checkpoint(sim, ruta)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("rutas sobre otro trazado aceptadas")
+            assert state_digest(sim) == antes, "ciudad modificada por un checkpoint rechazado"
+
+
+def test_version_antigua_rechazada():
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "zona.ckpt")
+        sim = build_simulator(_escenario())
+        save_checkpoint(sim, ruta)
+        with open(ruta, "r+b") as f:
+            f.seek(8)
+            f.write((2).to_bytes(2, "little"))      # versión 2: sin generador
+        try:
+            restore_checkpoint(build_simulator(_escenario()), ruta)
+        except ValueError:
+            return
+        raise AssertionError("checkpoint de versión 2 aceptado")
+
+
+def main():
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("test_"):
+            prueba()
+            print(f"[OK] {nombre}")
+
+
+if __name__ == "__main__":
+    main()
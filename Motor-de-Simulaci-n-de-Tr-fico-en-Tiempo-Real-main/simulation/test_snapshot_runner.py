@@ -0,0 +1,127 @@
+# test_snapshot_runner.py
+
+import random
+
+from environment.Vehicle import Vehicle
+from environment import snapshot
+from simulation.scenario import build_simulator
+
+
+def _escenario():
+    return {"seed": 11, "update_interval": 30,
+            "generate": {"grid": {"rows": 5, "cols": 5, "spacing": 90},
+                         "timing": {"plan": "random", "green_time": 3, "yellow_time": 1,
+                                    "red_time": 3},
+                         "vehicles": {"count": 200, "speed": [1, 3]}}}
+
+
+class _Espejo:
+    """Copia de la ciudad reconstruida solo con deltas."""
+
+    def __init__(self):
+        self.version = None
+        self.semaforos = {}
+        self.vehiculos = {}
+        self.intersecciones = []
+
+    def aplicar(self, delta):
+        if delta["full"]:
+            self.vehiculos.clear()
+        layout = delta.get("layout")
+        if layout is not None:
+            self.intersecciones = layout["intersections"]
+            self.semaforos = {t["id"]: {**t, **self.semaforos.get(t["id"], {})}
+                              for t in layout["traffic_lights"]}
+        for t in delta["traffic_lights"]:
+            self.semaforos[t["id"]]["estado"] = t["estado"]
+        for id_ in delta["removed_vehicles"]:
+            self.vehiculos.pop(id_, None)
+        for v in delta["vehicles"]:
+            self.vehiculos[v["id"]] = v
+        self.version = delta["version"]
+
+    def snapshot(self):
+        return {"traffic_lights": sorted(self.semaforos.values(), key=lambda t: t["id"]),
+                "vehicles": sorted(self.vehiculos.values(), key=lambda v: v["id"]),
+                "intersections": self.intersecciones}
+
+
+def _completo(sim):
+    snap = sim.get_snapshot()
+    return {"traffic_lights": sorted(snap["traffic_lights"], key=lambda t: t["id"]),
+            "vehicles": sorted(snap["vehicles"], key=lambda v: v["id"]),
+            "intersections": snap["intersections"]}
+
+
+def _altas_y_bajas(sim, azar, fuera, k):
+    city = sim.city
+    ids = [v.id_ for v in city.vehicles]
+    fuera.extend(city.remove_vehicles(azar.sample(ids, azar.randrange(5))))
+    if fuera and azar.random() < 0.5:
+        city.add_vehicle(fuera.pop(azar.randrange(len(fuera))))    # reentrada
+    for _ in range(azar.randrange(4)):
+        k += 1
+        city.add_vehicle(Vehicle(f"N{k}", (90.0 * azar.randrange(5), 0.0), 2.0, "SUR"))
+    return k
+
+
+# ─────────────────────────────────────────────────────
+def test_deltas_igual_que_snapshot_completo():
+    for engine in ("python", "numpy"):
+        sim = build_simulator(_escenario(), engine=engine)
+        azar = random.Random(1)
+        cada_tick, cada_cinco = _Espejo(), _Espejo()
+        fuera, k = [], 0
+        for t in range(200):
+            k = _altas_y_bajas(sim, azar, fuera, k)
+            if t % 3 == 0:                              # con altas sin aplicar al motor
+                cada_tick.aplicar(sim.get_snapshot_delta(cada_tick.version))
+                assert cada_tick.snapshot() == _completo(sim), (engine, t)
+            sim.update()
+            cada_tick.aplicar(sim.get_snapshot_delta(cada_tick.version))
+            assert cada_tick.snapshot() == _completo(sim), (engine, t)
+            if t % 5 == 0:
+                cada_cinco.aplicar(sim.get_snapshot_delta(cada_cinco.version))
+                assert cada_cinco.snapshot() == _completo(sim), (engine, t)
+
+
+def test_delta_solo_con_lo_cambiado():
+    sim = build_simulator(_escenario())
+    version = sim.get_snapshot_delta()["version"]
+    delta = sim.get_snapshot_delta(version)
+    assert not delta["full"] and delta["version"] == version
+    assert not delta["vehicles"] and "layout" not in delta
+
+    v = sim.city.vehicles[7]
+    v.x += 1
+    delta = sim.get_snapshot_delta(version)
+    assert delta["version"] == version + 1
+    assert [d["id"] for d in delta["vehicles"]] == [v.id_]
+
+
+def test_consumidor_atrasado_recibe_completo():
+    sim = build_simulator(_escenario())
+    espejo = _Espejo()
+    espejo.aplicar(sim.get_snapshot_delta())
+    antigua = espejo.version
+    city = sim.city
+    for i in range(snapshot.MAX_BAJAS // 100 + 1):
+        city.add_vehicles([Vehicle(f"B{i}-{j}", (0.0, 0.0), 1.0, "ESTE") for j in range(100)])
+        sim.get_snapshot_delta(antigua)
+        city.remove_vehicles([f"B{i}-{j}" for j in range(100)])
+        sim.get_snapshot_delta(antigua)
+    delta = sim.get_snapshot_delta(antigua)
+    assert delta["full"]
+    espejo.aplicar(delta)
+    assert espejo.snapshot() == _completo(sim)
+
+
+def main():
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("test_"):
+            prueba()
+            print(f"[OK] {nombre}")
+
+
+if __name__ == "__main__":
+    main()
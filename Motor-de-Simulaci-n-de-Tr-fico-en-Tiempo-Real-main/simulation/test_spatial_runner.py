@@ -0,0 +1,104 @@
+# test_spatial_runner.py
+
+import math
+import random
+
+from environment.Vehicle import Vehicle
+from simulation.scenario import build_simulator
+from simulation.spatial import VehicleGrid
+
+INF = math.inf
+
+
+def _dist2(v, x, y):
+    return (v.x - x) ** 2 + (v.y - y) ** 2
+
+
+def _ids(vehs):
+    return sorted(v.id_ for v in vehs)
+
+
+def _comprobar(grid, vehs, azar, consultas=200):
+    """Consultas de la rejilla frente a recorrer todos los vehículos."""
+    for _ in range(consultas):
+        x, y = azar.uniform(-150, 650), azar.uniform(-150, 650)
+        ancho, alto = azar.choice((0, 10, 75, 400)), azar.choice((0, 10, 75, 400))
+        caja = (x, y, x + ancho, y + alto)
+        assert _ids(grid.query_bbox(*caja)) == _ids(
+            v for v in vehs if caja[0] <= v.x <= caja[2] and caja[1] <= v.y <= caja[3])
+
+        r = azar.choice((0, 5, 40, 300))
+        assert _ids(grid.query_radius(x, y, r)) == _ids(
+            v for v in vehs if _dist2(v, x, y) <= r * r)
+
+        k = azar.choice((1, 3, 20))
+        cercanos = grid.nearest(x, y, k)
+        esperado = sorted(_dist2(v, x, y) for v in vehs)[:k]
+        assert [_dist2(v, x, y) for v in cercanos] == esperado, (x, y, k)
+
+
+def _semiplanos(grid, vehs):
+    for caja in ((-INF, -INF, INF, INF), (100, -INF, INF, INF), (-INF, 100, 300, INF),
+                 (-INF, -INF, 0, 0), (-INF, 300, INF, 200), (INF, -INF, INF, INF)):
+        assert _ids(grid.query_bbox(*caja)) == _ids(
+            v for v in vehs if caja[0] <= v.x <= caja[2] and caja[1] <= v.y <= caja[3]), caja
+
+
+# ─────────────────────────────────────────────────────
+def test_igual_que_fuerza_bruta():
+    azar = random.Random(3)
+    grid = VehicleGrid(cell=50.0)
+    # Coordenadas redondas (fronteras de celda) y negativas incluidas
+    vehs = [Vehicle(f"V{i}", (azar.choice((azar.uniform(-100, 600), 50.0 * azar.randrange(-2, 12))),
+                              azar.uniform(-100, 600)), 1.0, "ESTE")
+            for i in range(400)]
+    grid.sync(vehs, 1)
+    _comprobar(grid, vehs, azar)
+    _semiplanos(grid, vehs)
+
+    # Movimientos, bajas y altas
+    for v in vehs:
+        v.x += azar.uniform(-60, 60)
+        v.y += azar.uniform(-60, 60)
+    grid.refresh(vehs)
+    vehs = vehs[50:] + [Vehicle(f"W{i}", (azar.uniform(0, 500), 0.0), 1.0, "NORTE")
+                        for i in range(30)]
+    grid.sync(vehs, 2)
+    assert len(grid) == len(vehs)
+    _comprobar(grid, vehs, azar)
+    _semiplanos(grid, vehs)
+
+
+def test_rejilla_vacia():
+    grid = VehicleGrid()
+    assert grid.query_bbox(-INF, -INF, INF, INF) == []
+    assert grid.query_radius(0, 0, 100) == [] and grid.nearest(0, 0, 3) == []
+
+
+def test_indice_del_simulador():
+    escenario = {"seed": 2, "update_interval": 30,
+                 "generate": {"grid": {"rows": 6, "cols": 6, "spacing": 100},
+                              "timing": {"plan": "random", "green_time": 3, "yellow_time": 1,
+                                         "red_time": 3},
+                              "vehicles": {"count": 300, "speed": [1, 3]}}}
+    for engine in ("python", "numpy"):
+        sim = build_simulator(escenario, engine=engine)
+        azar = random.Random(4)
+        for t in range(60):
+            city = sim.city
+            city.remove_vehicles(azar.sample([v.id_ for v in city.vehicles], 3))
+            city.add_vehicle(Vehicle(f"N{t}", (100.0 * azar.randrange(6), 0.0), 2.0, "SUR"))
+            sim.update()
+            if t % 10 == 0:
+                _comprobar(sim.vehicle_index, city.vehicles, azar, consultas=50)
+
+
+def main():
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("test_"):
+            prueba()
+            print(f"[OK] {nombre}")
+
+
+if __name__ == "__main__":
+    main()
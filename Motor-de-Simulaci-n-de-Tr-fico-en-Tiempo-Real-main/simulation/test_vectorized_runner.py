@@ -0,0 +1,64 @@
+# test_vectorized_runner.py
+
+import random
+
+from environment.Vehicle import Vehicle
+from simulation.scenario import build_simulator
+from simulation.headless import state_digest
+
+
+def _escenario():
+    return {"seed": 5, "update_interval": 30,
+            "generate": {"grid": {"rows": 6, "cols": 6, "spacing": 80},
+                         "timing": {"plan": "random", "green_time": 3, "yellow_time": 1,
+                                    "red_time": 3},
+                         "vehicles": {"count": 300, "speed": [1, 3]}}}
+
+
+def _con_altas_y_bajas(engine, ticks=300):
+    """Digest cada 25 ticks con altas, bajas y reentradas en cada tick."""
+    sim = build_simulator(_escenario(), engine=engine)
+    azar = random.Random(0)
+    fuera, digests, k = [], [], 0
+    for t in range(ticks):
+        city = sim.city
+        ids = [v.id_ for v in city.vehicles]
+        quitados = city.remove_vehicles(azar.sample(ids, azar.randrange(4)))
+        if fuera and azar.random() < 0.5:
+            city.add_vehicle(fuera.pop(0))          # el mismo objeto vuelve a entrar
+        fuera.extend(quitados)
+        for _ in range(azar.randrange(4)):
+            k += 1
+            city.add_vehicle(Vehicle(f"N{k}", (80.0 * azar.randrange(6), 0.0), 2.0, "NORTE"))
+        sim.update()
+        if t % 25 == 0:
+            digests.append(state_digest(sim))
+    return digests
+
+
+def test_paridad_con_altas_y_bajas():
+    assert _con_altas_y_bajas("python") == _con_altas_y_bajas("numpy")
+
+
+def test_filas_en_orden_de_la_ciudad():
+    sim = build_simulator(_escenario(), engine="numpy")
+    city = sim.city
+    for paso in range(20):
+        ids = [v.id_ for v in city.vehicles]
+        city.remove_vehicles(ids[paso::7])
+        city.add_vehicles([Vehicle(f"M{paso}-{i}", (0.0, 0.0), 1.0, "ESTE") for i in range(5)])
+        sim.update()
+        eng = sim._vector
+        assert eng.n == len(city.vehicles) == len(eng.x)
+        assert [v._idx for v in city.vehicles] == list(range(eng.n))
+
+
+def main():
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("test_"):
+            prueba()
+            print(f"[OK] {nombre}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,584 @@
+# simulacion_trafico/simulation/vectorized.py
+"""
+Motor vectorizado (struct-of-arrays) para `Simulator.update`.
+
+Las posiciones, velocidades, direcciones y flags de movimiento de todos
+los vehículos viven en arrays NumPy contiguos y cada fase del tick
+(semáforo en rojo, avance, alineado, rebote, giro) se ejecuta como una
+operación por lotes.  Los objetos de `city.vehicles` se sustituyen por
+`VehicleView`, que leen y escriben directamente sobre esos arrays, así
+que la GUI, los snapshots y la migración siguen funcionando igual.
+
+El resultado es idéntico, tick a tick, al recorrido objeto a objeto de
+`simulator.py` con la misma semilla: los giros aleatorios se resuelven
+en el mismo orden y con el mismo generador (`Simulator.rng`).
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from environment.enums import Direction, LightState
+from environment.Vehicle import Vehicle
+
+
+# Los arrays guardan el código entero de `Direction`
+DIRECCIONES = tuple(Direction)
+NORTE, SUR, ESTE, OESTE = (int(d) for d in DIRECCIONES)
+_GIROS_V = (ESTE, OESTE)
+_GIROS_H = (NORTE, SUR)
+
+# Desplazamiento unitario por código de dirección
+_DX = np.array([0.0, 0.0, 1.0, -1.0])
+_DY = np.array([1.0, -1.0, 0.0, 0.0])
+
+
+# ────────────────────────────────────────────────────────────
+#  Vista de vehículo sobre los arrays del motor
+# ────────────────────────────────────────────────────────────
+class VehicleView(Vehicle):
+    """
+    Vehículo cuyos atributos dinámicos se almacenan en un `VectorEngine`.
+    Mantiene la interfaz de `Vehicle` (x, y, position, speed, direction,
+    moving, move) para que el resto del código no note la diferencia.
+    """
+    __slots__ = ("_engine", "_idx")
+
+    def __init__(self, engine, idx, id_, route=None):
+        self.id_ = id_
+        self._engine = engine
+        self._idx = idx
+        self.route = route
+
+    @property
+    def x(self):
+        return float(self._engine.x[self._idx])
+
+    @x.setter
+    def x(self, value):
+        self._engine.x[self._idx] = value
+
+    @property
+    def y(self):
+        return float(self._engine.y[self._idx])
+
+    @y.setter
+    def y(self, value):
+        self._engine.y[self._idx] = value
+
+    @property
+    def position(self):
+        e, i = self._engine, self._idx
+        return (float(e.x[i]), float(e.y[i]))
+
+    @position.setter
+    def position(self, value):
+        e, i = self._engine, self._idx
+        e.x[i], e.y[i] = value
+
+    @property
+    def speed(self):
+        return float(self._engine.speed[self._idx])
+
+    @speed.setter
+    def speed(self, value):
+        self._engine.speed[self._idx] = value
+
+    @property
+    def direction(self):
+        return DIRECCIONES[self._engine.dir[self._idx]]
+
+    @direction.setter
+    def direction(self, value):
+        self._engine.dir[self._idx] = _codigo_direccion(value)
+
+    @property
+    def moving(self):
+        return bool(self._engine.moving[self._idx])
+
+    @moving.setter
+    def moving(self, value):
+        self._engine.moving[self._idx] = value
+
+
+class _Suelta:
+    """
+    Arrays propios de las `VehicleView` que han salido del motor (baja
+    o migración): conservan su último estado y siguen siendo vehículos
+    válidos, p. ej. si vuelven a entrar en la ciudad.
+    """
+    __slots__ = ("x", "y", "speed", "dir", "moving")
+
+    def __init__(self, motor, filas):
+        self.x, self.y = motor.x[filas], motor.y[filas]
+        self.speed, self.dir, self.moving = motor.speed[filas], motor.dir[filas], motor.moving[filas]
+
+
+def _codigo_direccion(direction):
+    return int(Direction.parse(direction))
+
+
+def _mas_cercana(roads, vals):
+    """
+    Devuelve, para cada valor, la carretera más próxima de `roads`
+    (ordenada).  En caso de empate gana la menor, igual que `min()`.
+    """
+    k = np.searchsorted(roads, vals)
+    lo = np.clip(k - 1, 0, len(roads) - 1)
+    hi = np.clip(k, 0, len(roads) - 1)
+    usa_lo = np.abs(roads[lo] - vals) <= np.abs(roads[hi] - vals)
+    return np.where(usa_lo, roads[lo], roads[hi])
+
+
+def _limites(roads, mins, maxs, coords):
+    """
+    Localiza cada coordenada entre los extremos de carretera
+    (equivalente vectorizado de `coord in ext`).
+    """
+    k = np.minimum(np.searchsorted(roads, coords), len(roads) - 1)
+    return roads[k] == coords, mins[k], maxs[k]
+
+
+class _IndiceVectorial:
+    """
+    Versión en arrays de un `StaticGridIndex`: las celdas se codifican en
+    un entero y se ordenan, de forma que los candidatos de cada vehículo
+    se obtienen con `searchsorted` en lugar de recorrer todos los objetos.
+    """
+
+    def __init__(self, index, items, ox, oy):
+        self.cell = index.cell
+        self.origen = index.origen
+        self.ox, self.oy = ox, oy
+
+        if index.radio is not None:
+            claves, objetos = self._por_cajas(index.radio)
+        else:
+            pos = {id(it): i for i, it in enumerate(items)}
+            claves, objetos = [], []
+            for (cx, cy), vecinos in index.vecindades():
+                for it in vecinos:
+                    claves.append(self._codifica(cx, cy))
+                    objetos.append(pos[id(it)])
+            claves = np.array(claves, dtype=np.int64)
+            objetos = np.array(objetos, dtype=np.int64)
+        orden = np.argsort(claves, kind="stable")
+        self.claves = claves[orden]
+        self.objetos = objetos[orden]
+        if len(self.claves):
+            _, repes = np.unique(self.claves, return_counts=True)
+            self.max_por_celda = int(repes.max())
+        else:
+            self.max_por_celda = 0
+
+    def _por_cajas(self, radio):
+        """
+        Mismas celdas que `StaticGridIndex` con `radio` (las que toca la
+        caja ±radio de cada objeto), calculadas en bloque.
+        """
+        c = self.cell
+        x, y = self.ox - self.origen, self.oy - self.origen
+        x0 = np.floor((x - radio) / c).astype(np.int64)
+        x1 = np.floor((x + radio) / c).astype(np.int64)
+        y0 = np.floor((y - radio) / c).astype(np.int64)
+        y1 = np.floor((y + radio) / c).astype(np.int64)
+        claves, objetos = [], []
+        todos = np.arange(len(x), dtype=np.int64)
+        ancho = int((x1 - x0).max(initial=0))
+        alto = int((y1 - y0).max(initial=0))
+        for dx in range(ancho + 1):
+            for dy in range(alto + 1):
+                sel = todos if dx == dy == 0 else np.flatnonzero((x0 + dx <= x1) & (y0 + dy <= y1))
+                claves.append(self._codifica(x0[sel] + dx, y0[sel] + dy))
+                objetos.append(sel)
+        return np.concatenate(claves), np.concatenate(objetos)
+
+    def buscar(self, x, y, tol):
+        """Primer objeto a distancia ≤ tol de un punto (-1 si no hay)."""
+        c, o = self.cell, self.origen
+        k = self._codifica(int(np.floor((x - o) / c)), int(np.floor((y - o) / c)))
+        lo = int(np.searchsorted(self.claves, k, side="left"))
+        hi = int(np.searchsorted(self.claves, k, side="right"))
+        for obj in self.objetos[lo:hi].tolist():
+            if abs(x - self.ox[obj]) <= tol and abs(y - self.oy[obj]) <= tol:
+                return obj
+        return -1
+
+    @staticmethod
+    def _codifica(cx, cy):
+        return (cx << 32) + (cy + (1 << 31))
+
+    def cerca(self, x, y, tol, activos=None):
+        """
+        Máscara de los puntos (x, y) que tienen algún objeto (activo) a
+        distancia ≤ tol en ambos ejes.
+        """
+        res = np.zeros(len(x), dtype=bool)
+        if not self.max_por_celda:
+            return res
+        c, o = self.cell, self.origen
+        k = self._codifica(np.floor((x - o) / c).astype(np.int64),
+                           np.floor((y - o) / c).astype(np.int64))
+        lo = np.searchsorted(self.claves, k, side="left")
+        hi = np.searchsorted(self.claves, k, side="right")
+        for j in range(self.max_por_celda):
+            cand = lo + j
+            sel = np.flatnonzero(cand < hi)
+            if not len(sel):
+                break
+            o = self.objetos[cand[sel]]
+            hit = (np.abs(x[sel] - self.ox[o]) <= tol) & (np.abs(y[sel] - self.oy[o]) <= tol)
+            if activos is not None:
+                hit &= activos[o]
+            res[sel[hit]] = True
+        return res
+
+
+# ────────────────────────────────────────────────────────────
+#  Motor struct-of-arrays
+# ────────────────────────────────────────────────────────────
+class VectorEngine:
+    """
+    Mantiene el estado dinámico de los vehículos de una ciudad en arrays
+    y ejecuta la parte vehicular de un tick en bloque.
+    """
+
+    def __init__(self, city):
+        self.city = city
+        self.n = 0
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.dir = np.zeros(0, dtype=np.int8)
+        self.moving = np.zeros(0, dtype=bool)
+        self._version = None
+        self._filas = []                # city.vehicles en la última sincronización
+        self._layout = None
+        self.lider = None               # índice del líder en su carril (-1: ninguno)
+        self._celdas = None             # (cx, cy) de cada vehículo en la rejilla
+        self.sincronizar()
+
+    # -------------------------------------------------------
+    def sincronizar(self):
+        """
+        Incorpora las altas y bajas de vehículos desde la última llamada,
+        conservando el orden de la ciudad, y convierte los vehículos
+        nuevos en `VehicleView`.  Solo hace algo si la ciudad ha cambiado;
+        con el registro de cambios de la ciudad (`vehicle_changes`) toca
+        solo las filas afectadas y, si no llega, reconstruye todo.
+        """
+        city = self.city
+        if self._version == city.vehicles_version:
+            return
+        cambios = city.vehicle_changes(self._version)
+        if cambios is None or not self._aplicar_cambios(*cambios):
+            self._reconstruir()
+        self._filas = city.vehicles
+        self._version = city.vehicles_version
+
+    def _propia(self, v):
+        return isinstance(v, VehicleView) and v._engine is self
+
+    def _aplicar_cambios(self, quitados, anadidos):
+        """
+        Bajas: una máscara booleana compacta los arrays.  Altas: van al
+        final de la ciudad (el registro conserva el orden de alta), así
+        que se añaden al final de los arrays con `np.concatenate`.  Solo
+        se renumeran las filas que se desplazan.  Devuelve False si la
+        ciudad no encaja con lo esperado (hay que reconstruir).
+        """
+        filas, n = self._filas, self.n
+        fuera = sorted({v._idx for v in quitados
+                        if self._propia(v) and v._idx < n and filas[v._idx] is v})
+        quedan = n - len(fuera)
+        vehs = self.city.vehicles
+        if len(vehs) < quedan:
+            return False
+        self._soltar(fuera)
+        cola = vehs[quedan:]
+
+        m = len(cola)
+        x, y, speed = np.empty(m), np.empty(m), np.empty(m)
+        dir_ = np.empty(m, dtype=np.int8)
+        moving = np.empty(m, dtype=bool)
+        for k, v in enumerate(cola):
+            x[k], y[k] = v.x, v.y
+            speed[k] = v.speed
+            dir_[k] = v.direction
+            moving[k] = v.moving
+
+        if fuera:
+            sigue = np.ones(n, dtype=bool)
+            sigue[fuera] = False
+            cols = (self.x[sigue], self.y[sigue], self.speed[sigue], self.dir[sigue],
+                    self.moving[sigue])
+            for i in range(fuera[0], quedan):
+                vehs[i]._idx = i
+        else:
+            cols = (self.x, self.y, self.speed, self.dir, self.moving)
+        if m:
+            cols = [np.concatenate((c, nueva)) for c, nueva in zip(cols, (x, y, speed, dir_, moving))]
+        self.x, self.y, self.speed, self.dir, self.moving = cols
+        self.n = quedan + m
+
+        if cola:
+            self.city.swap_vehicles([VehicleView(self, i, v.id_, v.route)
+                                     for i, v in enumerate(cola, quedan)])
+        return True
+
+    def _soltar(self, filas):
+        """Pasa las vistas de esas filas (ya fuera de la ciudad) a `_Suelta`."""
+        if not filas:
+            return
+        suelta = _Suelta(self, filas)
+        vistas = self._filas
+        for k, i in enumerate(filas):
+            v = vistas[i]
+            v._engine, v._idx = suelta, k
+
+    def _reconstruir(self):
+        vehs = list(self.city.vehicles)
+        presentes = set(map(id, vehs))
+        self._soltar([i for i, v in enumerate(self._filas) if id(v) not in presentes])
+        nuevos = False
+        n = len(vehs)
+        x, y = np.empty(n), np.empty(n)
+        speed = np.empty(n)
+        dir_ = np.empty(n, dtype=np.int8)
+        moving = np.empty(n, dtype=bool)
+
+        for i, v in enumerate(vehs):
+            if self._propia(v):
+                j = v._idx
+                x[i], y[i] = self.x[j], self.y[j]
+                speed[i], dir_[i], moving[i] = self.speed[j], self.dir[j], self.moving[j]
+                v._idx = i
+            else:
+                x[i], y[i] = v.x, v.y
+                speed[i] = v.speed
+                dir_[i] = v.direction
+                moving[i] = v.moving
+                vehs[i] = VehicleView(self, i, v.id_, v.route)
+                nuevos = True
+
+        self.x, self.y, self.speed, self.dir, self.moving = x, y, speed, dir_, moving
+        self.n = n
+        if nuevos:
+            self.city.replace_vehicles(vehs)
+
+    def cargar(self, ids, x, y, speed, dir_, moving):
+        """
+        Reemplaza todos los vehículos de la ciudad por los de los arrays
+        dados (copiándolos), sin pasar por objetos `Vehicle` intermedios.
+        """
+        self._soltar(list(range(len(self._filas))))
+        self.x = np.array(x, dtype=float)
+        self.y = np.array(y, dtype=float)
+        self.speed = np.array(speed, dtype=float)
+        self.dir = np.array(dir_, dtype=np.int8)
+        self.moving = np.array(moving, dtype=bool)
+        self.n = len(ids)
+        self.city.replace_vehicles([VehicleView(self, i, id_) for i, id_ in enumerate(ids)])
+        self._filas = self.city.vehicles
+        self._version = self.city.vehicles_version
+
+    # -------------------------------------------------------
+    def _cargar_layout(self, sim):
+        """
+        Traduce carreteras e índices estáticos del simulador a arrays.
+        Solo se ejecuta cuando cambia `sim.layout_version`.
+        """
+        city = self.city
+        self.hr = np.asarray(sim.h_roads, dtype=float)
+        self.h_min = np.array([sim.h_ext[r][0] for r in sim.h_roads], dtype=float)
+        self.h_max = np.array([sim.h_ext[r][1] for r in sim.h_roads], dtype=float)
+        self.vr = np.asarray(sim.v_roads, dtype=float)
+        self.v_min = np.array([sim.v_ext[r][0] for r in sim.v_roads], dtype=float)
+        self.v_max = np.array([sim.v_ext[r][1] for r in sim.v_roads], dtype=float)
+        lights, inters = city.traffic_lights, city.intersections
+        self.tl_index = _IndiceVectorial(sim.tl_index, lights, sim.tl_index.xs, sim.tl_index.ys)
+        self.ix_index = _IndiceVectorial(sim.ix_index, inters, sim.ix_index.xs, sim.ix_index.ys)
+        self._tl_pos = {id(tl): i for i, tl in enumerate(city.traffic_lights)}
+        self._layout = sim.layout_version
+        self._scheduler = None
+
+    def _actualizar_rojos(self, sim):
+        """
+        Mantiene la máscara de semáforos en ROJO.  Se recalcula entera
+        al cambiar el trazado o el planificador; en el resto de ticks
+        solo se tocan los semáforos que acaban de cambiar.
+        """
+        lights = self.city.traffic_lights
+        if self._scheduler is not sim.light_scheduler:
+            self.rojos = np.fromiter(
+                (tl.current_state == LightState.RED for tl in lights),
+                dtype=bool, count=len(lights),
+            )
+            self._scheduler = sim.light_scheduler
+            return
+        for tl in sim.changed_lights:
+            i = self._tl_pos.get(id(tl))
+            if i is not None:
+                self.rojos[i] = tl.current_state == LightState.RED
+
+    def _actualizar_lideres(self, lanes):
+        """
+        Mantiene `lider` al día con el `LaneIndex`: entero tras altas o
+        bajas (los índices se compactan), y si no solo para los vehículos
+        cuyo líder ha cambiado desde el último tick.
+        """
+        if lanes.cambios is None:
+            lanes.cambios = set()
+        vehs = self.city.vehicles
+        if lanes.sync(vehs, self.city.vehicles_version) or self.lider is None \
+                or len(self.lider) != self.n:
+            lider = lanes.leader
+            self.lider = np.fromiter(
+                (-1 if (l := lider(v)) is None else l._idx for v in vehs),
+                dtype=np.int64, count=self.n,
+            )
+        else:
+            lider, arr = lanes.leader, self.lider
+            for v in lanes.cambios:
+                if v in lanes:
+                    l = lider(v)
+                    arr[v._idx] = -1 if l is None else l._idx
+        lanes.cambios.clear()
+
+    def refrescar_rejilla(self, grid):
+        """
+        Pone al día una `VehicleGrid`: calcula las celdas de todos en
+        bloque y solo llama a `grid.move()` para los que han cambiado.
+        Tras altas o bajas (índices compactados) compara con la rejilla.
+        """
+        vehs = self.city.vehicles
+        c = grid.cell
+        cx = np.floor(self.x / c).astype(np.int64)
+        cy = np.floor(self.y / c).astype(np.int64)
+        if grid.sync(vehs, self.city.vehicles_version) or self._celdas is None \
+                or len(self._celdas[0]) != self.n:
+            for v, celda in zip(vehs, zip(cx.tolist(), cy.tolist())):
+                grid.move(v, celda)
+        else:
+            px, py = self._celdas
+            for i in np.flatnonzero((cx != px) | (cy != py)).tolist():
+                grid.move(vehs[i], (int(cx[i]), int(cy[i])))
+        self._celdas = (cx, cy)
+
+    def _hueco(self):
+        """Distancia de cada vehículo a su líder (inf si no tiene)."""
+        d = self.dir
+        avance = self.x * _DX[d] + self.y * _DY[d]
+        lider = self.lider
+        tiene = lider >= 0
+        return np.where(tiene, avance[np.where(tiene, lider, 0)] - avance, np.inf)
+
+    # -------------------------------------------------------
+    def step(self, sim, tol=5, prob=0.3, tiempos=None):
+        """
+        Ejecuta las fases vehiculares de un tick sobre los arrays.
+        Si se pasa `tiempos` (dict fase → segundos) acumula en él la
+        duración de cada fase.
+        """
+        if tiempos is not None:
+            marcas = [perf_counter()]
+        self.sincronizar()
+        if self._layout != sim.layout_version:
+            self._cargar_layout(sim)
+        self._actualizar_rojos(sim)
+        if not self.n:
+            return
+
+        x, y, s, d = self.x, self.y, self.speed, self.dir
+        horiz = d >= ESTE
+        lanes = sim.lanes
+        if lanes is not None:
+            self._actualizar_lideres(lanes)
+            antes, x0, y0 = d.copy(), x.copy(), y.copy()
+            rutas = {}                  # i -> (ruta, nodos, índice) antes de seguirla
+
+        # 1) ¿Puede avanzar?  (semáforos en ROJO sobre la siguiente posición)
+        nx = x + _DX[d] * s
+        ny = y + _DY[d] * s
+        ok = ~self.tl_index.cerca(nx, ny, tol, activos=self.rojos)
+        if tiempos is not None:
+            marcas.append(perf_counter())
+        if lanes is None:
+            np.copyto(x, nx, where=ok)
+            np.copyto(y, ny, where=ok)
+            self.moving[:] = ok
+        else:
+            # Seguimiento: como mucho hasta `min_gap` detrás del líder
+            paso = np.minimum(s, np.maximum(self._hueco() - sim.min_gap, 0.0))
+            ok &= paso > 0
+            np.copyto(x, x + _DX[d] * paso, where=ok)
+            np.copyto(y, y + _DY[d] * paso, where=ok)
+            self.moving[:] = ok
+        if tiempos is not None:
+            marcas.append(perf_counter())
+
+        # 2) Alinear al eje de la carretera más cercana
+        if len(self.hr):
+            y[horiz] = _mas_cercana(self.hr, y[horiz])
+        if len(self.vr):
+            x[~horiz] = _mas_cercana(self.vr, x[~horiz])
+        if tiempos is not None:
+            marcas.append(perf_counter())
+
+        # 3) Rebote en los extremos de la carretera
+        if len(self.hr):
+            idx = np.flatnonzero(horiz)
+            valido, mn, mx = _limites(self.hr, self.h_min, self.h_max, y[idx])
+            bajo = valido & (x[idx] < mn)
+            alto = valido & (x[idx] > mx)
+            x[idx[bajo]], d[idx[bajo]] = mn[bajo], ESTE
+            x[idx[alto]], d[idx[alto]] = mx[alto], OESTE
+        if len(self.vr):
+            idx = np.flatnonzero(~horiz)
+            valido, mn, mx = _limites(self.vr, self.v_min, self.v_max, x[idx])
+            bajo = valido & (y[idx] < mn)
+            alto = valido & (y[idx] > mx)
+            y[idx[bajo]], d[idx[bajo]] = mn[bajo], NORTE
+            y[idx[alto]], d[idx[alto]] = mx[alto], SUR
+        if tiempos is not None:
+            marcas.append(perf_counter())
+
+        # 4) Giro en intersecciones (solo vehículos en marcha): según su
+        #    ruta si la tienen, si no al azar
+        cerca = self.ix_index.cerca(x, y, tol) & self.moving
+        rng, router = sim.rng, sim._router
+        vehs = self.city.vehicles
+        for i in np.flatnonzero(cerca).tolist():
+            if router is not None and vehs[i].route is not None:
+                if lanes is not None:
+                    ruta = vehs[i].route
+                    rutas[i] = (ruta, ruta.nodes, ruta.index)
+                router.follow(vehs[i], self.ix_index.buscar(x[i], y[i], tol))
+                continue
+            opts = _GIROS_H if d[i] >= ESTE else _GIROS_V
+            if rng.random() < prob:
+                d[i] = rng.choice(opts)
+
+        # Cambios de carril (giros y rebotes), en el orden de la ciudad.
+        # Sin `min_gap` libre en el carril de destino se deshacen: el
+        # vehículo vuelve a su posición inicial, detenido (como el motor
+        # Python, ver `Simulator._cambiar_carriles`).
+        if lanes is not None:
+            min_gap = sim.min_gap
+            for i in np.flatnonzero(d != antes).tolist():
+                v = vehs[i]
+                if lanes.admits(v, min_gap):
+                    lanes.update(v)
+                    continue
+                x[i], y[i], d[i] = x0[i], y0[i], antes[i]
+                self.moving[i] = False
+                if i in rutas:
+                    ruta, nodos, indice = rutas[i]
+                    v.route = ruta
+                    ruta.nodes, ruta.index = nodos, indice
+
+        if tiempos is not None:
+            marcas.append(perf_counter())
+            fases = ("proceed", "move", "align", "clamp", "reorient")
+            for fase, t0, t1 in zip(fases, marcas, marcas[1:]):
+                tiempos[fase] = tiempos.get(fase, 0.0) + (t1 - t0)
@@ -0,0 +1,154 @@
+# simulacion_trafico/ui/camera.py
+"""
+Cámara 2D (zoom + desplazamiento) y nivel de detalle para la GUI.
+
+`Camera` traduce coordenadas de mundo a pantalla y devuelve, con una
+consulta vectorizada sobre los arrays del fotograma, qué entidades caen
+dentro de la ventana: solo esas se dibujan.
+
+Con poco zoom (o demasiados vehículos visibles) la GUI deja de dibujar
+vehículos sueltos y pinta cada tramo de carretera con un color según su
+ocupación (`RoadSegments`), de modo que el coste depende del tamaño de
+la pantalla y no del de la ciudad.
+"""
+
+import numpy as np
+
+ZOOM_MIN, ZOOM_MAX = 0.05, 8.0
+
+
+class Camera:
+    """
+    `zoom` píxeles por unidad de mundo; (`ox`, `oy`) es el punto del mundo
+    que aparece en la esquina superior izquierda de la pantalla.
+    """
+
+    def __init__(self, width, height, zoom=1.0, ox=0.0, oy=0.0):
+        self.width, self.height = width, height
+        self.zoom = zoom
+        self.ox, self.oy = ox, oy
+        self.version = 0            # cambia con cada zoom/desplazamiento
+
+    # -------------------------------------------------------
+    def to_screen(self, x, y):
+        z = self.zoom
+        return (x - self.ox) * z, (y - self.oy) * z
+
+    def to_world(self, sx, sy):
+        z = self.zoom
+        return self.ox + sx / z, self.oy + sy / z
+
+    def bounds(self, margen=0.0):
+        """Rectángulo visible en coordenadas de mundo (x0, y0, x1, y1)."""
+        z = self.zoom
+        return (self.ox - margen, self.oy - margen,
+                self.ox + self.width / z + margen, self.oy + self.height / z + margen)
+
+    def visible(self, xs, ys, margen=0.0):
+        """Máscara de los puntos (arrays) que caen en la ventana."""
+        x0, y0, x1, y1 = self.bounds(margen)
+        return (xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1)
+
+    # -------------------------------------------------------
+    def pan(self, dx_px, dy_px):
+        """Desplaza la vista `dx_px`, `dy_px` píxeles de pantalla."""
+        self.ox += dx_px / self.zoom
+        self.oy += dy_px / self.zoom
+        self.version += 1
+
+    def zoom_at(self, factor, sx, sy):
+        """Multiplica el zoom manteniendo fijo el punto de pantalla (sx, sy)."""
+        wx, wy = self.to_world(sx, sy)
+        self.zoom = min(ZOOM_MAX, max(ZOOM_MIN, self.zoom * factor))
+        self.ox, self.oy = wx - sx / self.zoom, wy - sy / self.zoom
+        self.version += 1
+
+    def fit(self, x0, y0, x1, y1, margen=50.0):
+        """Encuadra el rectángulo de mundo dado."""
+        w, h = max(x1 - x0, 1.0) + 2 * margen, max(y1 - y0, 1.0) + 2 * margen
+        self.zoom = min(ZOOM_MAX, max(ZOOM_MIN, min(self.width / w, self.height / h)))
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        self.ox, self.oy = cx - self.width / (2 * self.zoom), cy - self.height / (2 * self.zoom)
+        self.version += 1
+
+
+class RoadSegments:
+    """
+    Tramos de carretera entre intersecciones consecutivas, deducidos del
+    trazado igual que `draw_roads` (cruces alineados con tolerancia `tol`).
+    `densidad()` reparte los vehículos del fotograma entre los tramos.
+    """
+
+    # Separación entre claves de carreteras distintas (mayor que el mundo)
+    _SEP = 1e9
+
+    def __init__(self, intersections, tol=10):
+        horiz, vert = {}, {}
+        for inter in intersections:
+            x, y = inter["x"], inter["y"]
+            horiz.setdefault(round(y / tol) * tol, []).append(x)
+            vert.setdefault(round(x / tol) * tol, []).append(y)
+
+        self.tol = tol
+        segmentos = []                      # (x0, y0, x1, y1)
+        self._h = self._tabla(horiz, segmentos, horizontal=True)
+        self._v = self._tabla(vert, segmentos, horizontal=False)
+        self.segments = np.array(segmentos, dtype=float).reshape(-1, 4)
+        self.longitud = np.maximum(
+            np.abs(self.segments[:, 2] - self.segments[:, 0])
+            + np.abs(self.segments[:, 3] - self.segments[:, 1]), 1.0)
+
+    def _tabla(self, carreteras, segmentos, horizontal):
+        """
+        Para cada carretera (eje fijo) guarda sus cortes; las claves
+        `fila * _SEP + corte` permiten localizar el tramo de todos los
+        vehículos con un único `searchsorted`.
+        """
+        ejes, claves, ids = [], [], []
+        for fila, (eje, cortes) in enumerate(sorted(carreteras.items())):
+            cortes = sorted(set(cortes))
+            ejes.append(eje)
+            for a, b in zip(cortes, cortes[1:]):
+                claves.append(fila * self._SEP + a)
+                ids.append(len(segmentos))
+                segmentos.append((a, eje, b, eje) if horizontal else (eje, a, eje, b))
+            # Marca de fin de carretera: lo que quede más allá no es tramo
+            claves.append(fila * self._SEP + cortes[-1])
+            ids.append(-1)
+        return (np.array(ejes, dtype=float), np.array(claves, dtype=float),
+                np.array(ids, dtype=np.int64))
+
+    def _localizar(self, tabla, eje, pos):
+        ejes, claves, ids = tabla
+        if len(ejes) == 0 or len(eje) == 0:
+            return np.zeros(0, dtype=np.int64)
+        fila = np.clip(np.searchsorted(ejes, eje), 0, len(ejes) - 1)
+        abajo = np.clip(fila - 1, 0, len(ejes) - 1)
+        fila = np.where(np.abs(ejes[abajo] - eje) < np.abs(ejes[fila] - eje), abajo, fila)
+        sobre = np.abs(ejes[fila] - eje) <= self.tol
+        k = np.searchsorted(claves, fila * self._SEP + pos, side="right") - 1
+        # Antes del primer corte o más allá del último cae en una marca
+        # de fin de carretera (-1)
+        seg = np.where(k >= 0, ids[np.maximum(k, 0)], -1)
+        return seg[sobre & (seg >= 0)]
+
+    def densidad(self, xs, ys, horizontal):
+        """
+        Vehículos por unidad de longitud en cada tramo.  `horizontal` indica, por vehículo, si circula por una carretera
+        horizontal (ESTE/OESTE).
+        """
+        n = len(self.segments)
+        if n == 0:
+            return np.zeros(0)
+        seg_h = self._localizar(self._h, ys[horizontal], xs[horizontal])
+        seg_v = self._localizar(self._v, xs[~horizontal], ys[~horizontal])
+        cuenta = np.bincount(np.concatenate([seg_h, seg_v]), minlength=n)
+        return cuenta / self.longitud
+
+
+def color_densidad(d, largo=20.0):
+    """Rampa verde → amarillo → rojo según la ocupación (array → (n, 3) uint8)."""
+    t = np.clip(d * largo, 0.0, 1.0)
+    r = np.clip(2 * t, 0, 1) * 255
+    g = np.clip(2 - 2 * t, 0, 1) * 200
+    return np.stack([r, g, np.full_like(t, 40)], axis=1).astype(np.uint8)
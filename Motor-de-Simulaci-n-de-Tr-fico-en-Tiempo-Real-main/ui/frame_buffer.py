@@ -0,0 +1,187 @@
+# simulacion_trafico/ui/frame_buffer.py
+"""
+Intercambio de fotogramas entre el hilo de simulación y el de dibujo.
+
+El hilo de simulación publica tras cada tick en un par de búferes
+preasignados (front/back): escribe siempre en el de atrás y después lo
+promociona a frontal cambiando un índice.  Cada búfer lleva un contador
+de secuencia (seqlock): impar mientras se escribe, par cuando está
+completo.
+
+El renderer copia el búfer frontal a un `Frame` propio de trabajo
+(también preasignado, `np.copyto` sin reservar memoria) y comprueba que
+la secuencia no ha cambiado durante la copia.  Si es así, ese `Frame`
+pasa a ser el visible; si una publicación posterior la ha pisado,
+reintenta con el nuevo frontal y, mientras tanto, sigue mostrando el
+último fotograma completo.  Así nunca dibuja un tick a medias y ninguno
+de los dos hilos espera al otro.
+"""
+
+import hashlib
+
+import numpy as np
+
+from environment.enums import LightState
+
+# Colores de semáforo por código de `LightState`
+COLORES_ESTADO = {
+    LightState.RED: (255, 0, 0),
+    LightState.YELLOW: (255, 255, 0),
+    LightState.GREEN: (0, 255, 0),
+}
+
+
+def color_from_id(id_str):
+    h = hashlib.md5(str(id_str).encode()).digest()
+    return (h[0], h[1], h[2])
+
+
+class Frame:
+    """
+    Estado dibujable de un tick en arrays contiguos.  Solo las primeras
+    `n` (vehículos) y `ntl` (semáforos) posiciones son válidas.
+    """
+
+    def __init__(self, capacidad=256, capacidad_tl=64):
+        self.seq = 0
+        self.tick = 0
+        self.n = 0
+        self.ntl = 0
+        self.intersections = ()
+        self.layout_version = None
+        self.colores_version = None
+        self._reservar(capacidad, capacidad_tl)
+
+    def _reservar(self, capacidad, capacidad_tl):
+        self.x = np.zeros(capacidad, dtype=np.float32)
+        self.y = np.zeros(capacidad, dtype=np.float32)
+        self.dir = np.zeros(capacidad, dtype=np.int8)
+        self.moving = np.zeros(capacidad, dtype=bool)
+        self.color = np.zeros((capacidad, 3), dtype=np.uint8)
+        self.tl_x = np.zeros(capacidad_tl, dtype=np.float32)
+        self.tl_y = np.zeros(capacidad_tl, dtype=np.float32)
+        self.tl_estado = np.zeros(capacidad_tl, dtype=np.int8)
+
+    def asegurar(self, n, ntl):
+        """Amplía (al doble) si no caben `n` vehículos o `ntl` semáforos."""
+        cap, cap_tl = len(self.x), len(self.tl_x)
+        if n > cap or ntl > cap_tl:
+            while cap < n:
+                cap *= 2
+            while cap_tl < ntl:
+                cap_tl *= 2
+            self._reservar(cap, cap_tl)
+            self.colores_version = None
+
+    def copiar_de(self, otro):
+        n, ntl = otro.n, otro.ntl
+        self.asegurar(n, ntl)
+        np.copyto(self.x[:n], otro.x[:n])
+        np.copyto(self.y[:n], otro.y[:n])
+        np.copyto(self.dir[:n], otro.dir[:n])
+        np.copyto(self.moving[:n], otro.moving[:n])
+        np.copyto(self.color[:n], otro.color[:n])
+        np.copyto(self.tl_x[:ntl], otro.tl_x[:ntl])
+        np.copyto(self.tl_y[:ntl], otro.tl_y[:ntl])
+        np.copyto(self.tl_estado[:ntl], otro.tl_estado[:ntl])
+        self.n, self.ntl, self.tick = n, ntl, otro.tick
+        self.intersections = otro.intersections
+        self.layout_version = otro.layout_version
+        self.colores_version = otro.colores_version
+
+
+class FrameExchange:
+    """
+    Front/back de fotogramas con seqlock.  Un único escritor
+    (`publish`, hilo de simulación) y un único lector (`read`, renderer).
+    """
+
+    REINTENTOS = 3
+
+    def __init__(self):
+        self._bufs = (Frame(), Frame())
+        self._front = 0
+        self._colores = {}                  # id -> (r, g, b), solo vehículos presentes
+        # Lado lector: fotograma visible y fotograma de trabajo
+        self._visible = Frame()
+        self._trabajo = Frame()
+        self._visto = (None, -1)            # (búfer, seq) ya copiado
+
+    # -------------------------------------------------------
+    #  Escritor
+    # -------------------------------------------------------
+    def publish(self, sim):
+        """Vuelca el estado actual de `sim` y lo hace visible (on_tick)."""
+        city = sim.city
+        back = self._bufs[1 - self._front]
+        back.seq += 1                       # impar: escribiendo
+
+        vehs = city.vehicles
+        lights = city.traffic_lights
+        n, ntl = len(vehs), len(lights)
+        back.asegurar(n, ntl)
+
+        eng = getattr(sim, "_vector", None)
+        if eng is not None and eng._version == city.vehicles_version:
+            # Motor NumPy al día: copia directa de sus arrays
+            np.copyto(back.x[:n], eng.x, casting="unsafe")
+            np.copyto(back.y[:n], eng.y, casting="unsafe")
+            np.copyto(back.dir[:n], eng.dir)
+            np.copyto(back.moving[:n], eng.moving)
+        else:
+            x, y, d, m = back.x, back.y, back.dir, back.moving
+            for i, v in enumerate(vehs):
+                x[i], y[i], d[i], m[i] = v.x, v.y, v.direction, v.moving
+
+        # Los colores solo cambian con altas/bajas.  La caché se rehace
+        # con los vehículos presentes: los ids dados de baja (p. ej. los
+        # que migran a otra zona) no se acumulan.
+        if back.colores_version != city.vehicles_version:
+            previos, colores, color = self._colores, {}, back.color
+            for i, v in enumerate(vehs):
+                c = previos.get(v.id_)
+                if c is None:
+                    c = color_from_id(v.id_)
+                colores[v.id_] = color[i] = c
+            self._colores = colores
+            back.colores_version = city.vehicles_version
+
+        for i, tl in enumerate(lights):
+            back.tl_x[i], back.tl_y[i], back.tl_estado[i] = tl.x, tl.y, tl.current_state
+
+        if back.layout_version != city.layout_version:
+            back.layout_version = city.layout_version
+            back.intersections = tuple(
+                {"x": ix.location[0], "y": ix.location[1]} for ix in city.intersections
+            )
+
+        back.n, back.ntl, back.tick = n, ntl, sim.frame_count
+        back.seq += 1                       # par: completo
+        self._front = 1 - self._front
+
+    # -------------------------------------------------------
+    #  Lector
+    # -------------------------------------------------------
+    def read(self):
+        """
+        Devuelve el último tick completo (un `Frame` del lector, válido
+        hasta la siguiente llamada).  Si no hay nada nuevo, o no se pudo
+        copiar sin interferencias, devuelve el anterior.
+        """
+        for _ in range(self.REINTENTOS):
+            front = self._front
+            buf = self._bufs[front]
+            seq = buf.seq
+            if seq & 1:
+                continue
+            if self._visto == (front, seq):
+                break
+            trabajo = self._trabajo
+            trabajo.copiar_de(buf)
+            if buf.seq == seq:
+                trabajo.seq = seq
+                self._visto = (front, seq)
+                self._trabajo, self._visible = self._visible, trabajo
+                break
+        return self._visible
+
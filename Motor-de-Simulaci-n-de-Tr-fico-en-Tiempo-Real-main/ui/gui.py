@@ -1,17 +1,20 @@
 # simulacion_trafico/ui/gui.py
 
+import os
 import threading
 import asyncio
 import pygame
-import hashlib
 import random
 
-from environment.City         import City
+import numpy as np
+
+from environment.enums        import Direction, LightState
 from environment.Vehicle      import Vehicle
-from environment.TrafficLight import TrafficLight
-from environment.intersection import Intersection
 from simulation.simulator     import Simulator
-from concurrency.tasks        import run_simulation_tasks
+from simulation.scenario      import build_city
+from concurrency.tasks        import TickScheduler, run_simulation_tasks
+from ui.frame_buffer          import FrameExchange, COLORES_ESTADO
+from ui.camera                import Camera, RoadSegments, color_densidad
 
 WIDTH, HEIGHT = 800, 600
 BG_COLOR    = (30, 30, 30)
@@ -20,8 +23,14 @@ BOUND_COLOR = (200, 200, 200)
 FONT_COLOR  = (255, 255, 255)
 FPS_COLOR   = (200, 200, 200)
 STOP_COLOR  = (200,   0,   0)
+VEH_LARGO, VEH_ANCHO = 20, 10
+ZOOM_LOD    = 0.35      # por debajo: mapa de densidad por tramo
+MAX_SPRITES = 20_000    # más vehículos visibles que esto: ídem
+ZOOM_PASO   = 1.25
 
-def draw_roads(screen, intersections, tol=10):
+def draw_roads(screen, intersections, tol=10, camera=None):
+    to_screen = camera.to_screen if camera is not None else (lambda x, y: (x, y))
+    ancho = max(1, round(5 * camera.zoom)) if camera is not None else 5
     horiz, vert = {}, {}
     for inter in intersections:
         x, y = inter["x"], inter["y"]
@@ -32,68 +41,100 @@ def draw_roads(screen, intersections, tol=10):
     for y, xs in horiz.items():
         if len(xs) >= 2:
             xs = sorted(xs)
-            pygame.draw.line(screen, ROAD_COLOR, (xs[0], y), (xs[-1], y), 5)
+            pygame.draw.line(screen, ROAD_COLOR, to_screen(xs[0], y), to_screen(xs[-1], y), ancho)
     for x, ys in vert.items():
         if len(ys) >= 2:
             ys = sorted(ys)
-            pygame.draw.line(screen, ROAD_COLOR, (x, ys[0]), (x, ys[-1]), 5)
-
-def color_from_id(id_str):
-    h = hashlib.md5(id_str.encode()).digest()
-    return (h[0], h[1], h[2])
+            pygame.draw.line(screen, ROAD_COLOR, to_screen(x, ys[0]), to_screen(x, ys[-1]), ancho)
 
-async def spawn_vehicles_periodically(city, limit=20):
+async def spawn_vehicles_periodically(city, limit=20, rng=random):
     """
     Genera vehículos nuevos cada pocos segundos en los bordes de la zona,
     hasta alcanzar un total de 'limit' vehículos generados.
+    `rng` permite pasar un `random.Random` con semilla fija.
     """
     cnt = 0
     while cnt < limit:
         await asyncio.sleep(3)  # cada 3 segundos
         # Entra desde Oeste o Norte
-        if random.random() < 0.5:
-            pos = (0, random.uniform(100, 500))
+        if rng.random() < 0.5:
+            pos = (0, rng.uniform(100, 500))
             dir = "ESTE"
         else:
-            pos = (random.uniform(100, 700), 0)
+            pos = (rng.uniform(100, 700), 0)
             dir = "SUR"
         cnt += 1
         veh = Vehicle(f"DYN-{cnt}", pos, speed=1.5, direction=dir)
         city.add_vehicle(veh)
     # Cuando cnt == limit, la corrutina termina y deja de generar.
 
+# Cuadrícula 3×4 (y=100, 300, 500; x=100…700) con semáforos alternos
+DEMO_SCENARIO = {
+    "generate": {
+        "grid": {"rows": 3, "cols": 4, "spacing": 200, "origin": [100, 100]},
+        "timing": {"plan": "alternate", "green_time": 3, "yellow_time": 1, "red_time": 3},
+    },
+    # Vehículos iniciales estáticos
+    "vehicles": [
+        {"id": "V1", "x": 150, "y": 150, "speed": 2.0, "direction": "ESTE"},
+        {"id": "V2", "x": 700, "y": 300, "speed": 2.0, "direction": "OESTE"},
+    ],
+}
+
+def build_demo_city(city_name):
+    """Cuadrícula 3×4 de semáforos/intersecciones con dos vehículos."""
+    return build_city({**DEMO_SCENARIO, "name": city_name})
+
 class GUISimulation:
-    def __init__(self, city_name):
+    """
+    Ventana Pygame con la simulación.  Con `headless=True` no abre
+    ventana ni necesita servidor gráfico: dibuja en una superficie en
+    memoria (ver `ui.offscreen`).  `sim` permite dibujar un simulador ya
+    construido (p. ej. desde un escenario) en lugar de la cuadrícula demo.
+    """
+    def __init__(self, city_name, sim=None, headless=False):
+        self.headless = headless
+        if headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
         pygame.init()
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption(f"Simulación {city_name}")
+        if headless:
+            self.screen = pygame.Surface((WIDTH, HEIGHT))
+        else:
+            self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+            pygame.display.set_caption(f"Simulación {city_name}")
         self.clock  = pygame.time.Clock()
         self.font   = pygame.font.SysFont(None, 20)
 
-        # 1) Construye la ciudad y el grid de intersecciones/semaforos
-        self.city = City(name=city_name)
-        ys = [100, 300, 500]
-        xs = [100, 300, 500, 700]
-        idx = 1
-        for y in ys:
-            for x in xs:
-                tl = TrafficLight(id_=f"T{idx}", x=x, y=y,
-                                  green_time=3, yellow_time=1, red_time=3)
-                tl.current_state = "GREEN" if idx % 2 == 0 else "RED"
-                tl.timer = 0
-                self.city.add_traffic_light(tl)
-
-                inter = Intersection(id_=f"I{idx}", location=(x, y))
-                self.city.add_intersection(inter)
-                idx += 1
-
-        # Vehículos iniciales estáticos
-        self.city.add_vehicle(Vehicle("V1", (150,150), 2.0, "ESTE"))
-        self.city.add_vehicle(Vehicle("V2", (700,300), 2.0, "OESTE"))
-
-        # 2) Prepara el simulador
-        self.sim = Simulator(self.city)
+        # 1) Ciudad y 2) simulador
+        if sim is None:
+            sim = Simulator(build_demo_city(city_name))
+        self.sim = sim
+        self.city = sim.city
         self.running = True
+        # Ritmo de la simulación: ESPACIO pausa, N avanza un tick,
+        # +/- aceleran o frenan (time-warp)
+        self.reloj = TickScheduler(0.05)
+
+        # Fotogramas publicados por el hilo de simulación tras cada tick
+        self.frames = FrameExchange()
+        self.frames.publish(self.sim)
+
+        # Cachés de dibujo: capa estática (fondo + carreteras) por versión
+        # del trazado, etiquetas de semáforo, textos y sprites por color
+        self._fondo = None
+        self._fondo_version = object()
+        self._tramos = None                 # RoadSegments del trazado actual
+        self._tramos_version = object()
+
+        # Cámara: rueda = zoom, arrastrar = desplazar, flechas, F = encuadrar
+        self.camera = Camera(WIDTH, HEIGHT)
+        self._arrastrando = False
+        self._etiquetas = {e.value: self.font.render(e.name, True, FONT_COLOR) for e in LightState}
+        self._textos = {}
+        self._sprites = {}
+        self._sprites_veh = ([], [])        # (horizontal, vertical) por índice
+        self._sprites_version = (None, None)   # (colores_version, tamaño)
+        self._sprite_stop = (self._sprite(STOP_COLOR, True), self._sprite(STOP_COLOR, False))
 
     def start_sim(self):
         """
@@ -101,45 +142,185 @@ class GUISimulation:
         """
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        coros = run_simulation_tasks(self.sim, update_interval=0.05)
+        coros = run_simulation_tasks(self.sim, update_interval=0.05,
+                                     scheduler=self.reloj, on_tick=self.frames.publish)
         # Agregamos el spawn con límite de 20 vehículos
         coros.append(spawn_vehicles_periodically(self.city, limit=20))
         loop.run_until_complete(asyncio.gather(*coros))
 
+    # -------------------------------------------------------
+    #  Cachés de dibujo
+    # -------------------------------------------------------
+    def _capa_estatica(self, f):
+        """
+        Fondo, borde y carreteras; solo se rehace si cambia el trazado o
+        la cámara.
+        """
+        clave = (f.layout_version, self.camera.version)
+        if self._fondo_version != clave:
+            fondo = self._superficie((WIDTH, HEIGHT))
+            fondo.fill(BG_COLOR)
+            pygame.draw.rect(fondo, BOUND_COLOR, (0,0,WIDTH,HEIGHT), 2)
+            draw_roads(fondo, f.intersections, camera=self.camera)
+            self._fondo, self._fondo_version = fondo, clave
+        return self._fondo
+
+    def _superficie(self, size):
+        """Superficie en el formato de la pantalla (si hay ventana)."""
+        sup = pygame.Surface(size)
+        return sup if self.headless else sup.convert()
+
+    def _tramos_de(self, f):
+        if self._tramos_version != f.layout_version:
+            self._tramos = RoadSegments(f.intersections)
+            self._tramos_version = f.layout_version
+        return self._tramos
+
+    def _tam_vehiculo(self):
+        z = self.camera.zoom
+        return max(2, round(VEH_LARGO * z)), max(1, round(VEH_ANCHO * z))
+
+    def _sprite(self, color, horizontal):
+        clave = (color, horizontal)
+        sp = self._sprites.get(clave)
+        if sp is None:
+            largo, ancho = self._tam_vehiculo()
+            size = (largo, ancho) if horizontal else (ancho, largo)
+            sp = self._sprites[clave] = self._superficie(size)
+            sp.fill(color)
+        return sp
+
+    def _sprites_vehiculos(self, f):
+        """Sprites (horizontal, vertical) de cada vehículo del fotograma."""
+        clave = (f.colores_version, self._tam_vehiculo())
+        if self._sprites_version != clave:
+            colores = [tuple(c) for c in f.color[:f.n].tolist()]
+            # Cambio de zoom (otro tamaño) o demasiados colores ya sin uso
+            if clave[1] != self._sprites_version[1] or len(self._sprites) > 4 * len(colores) + 16:
+                self._sprites.clear()
+                self._sprite_stop = (self._sprite(STOP_COLOR, True), self._sprite(STOP_COLOR, False))
+            self._sprites_veh = (
+                [self._sprite(c, True) for c in colores],
+                [self._sprite(c, False) for c in colores],
+            )
+            self._sprites_version = clave
+        return self._sprites_veh
+
+    def _texto(self, texto, color):
+        sup = self._textos.get((texto, color))
+        if sup is None:
+            if len(self._textos) > 256:
+                self._textos.clear()
+            sup = self._textos[(texto, color)] = self.font.render(texto, True, color)
+        return sup
+
+    # -------------------------------------------------------
     def draw(self):
-        snap = self.sim.get_snapshot()
-        self.screen.fill(BG_COLOR)
-        pygame.draw.rect(self.screen, BOUND_COLOR, (0,0,WIDTH,HEIGHT), 2)
+        # Último tick completo publicado por el hilo de simulación
+        f = self.frames.read()
+        n, ntl = f.n, f.ntl
+        screen, cam = self.screen, self.camera
+        z = cam.zoom
+        screen.blit(self._capa_estatica(f), (0, 0))
 
-        # Dibuja carreteras
-        draw_roads(self.screen, snap["intersections"])
+        # Solo lo que cae dentro de la ventana
+        x, y = f.x[:n], f.y[:n]
+        dentro = np.flatnonzero(cam.visible(x, y, margen=VEH_LARGO))
+        densidad = z < ZOOM_LOD or len(dentro) > MAX_SPRITES
+
+        if densidad:
+            self._draw_densidad(f)
 
         # Dibuja semáforos
-        for tl in snap["traffic_lights"]:
-            x, y = int(tl["x"]), int(tl["y"])
-            st = tl["estado"].upper()
-            col = {"RED":(255,0,0),"YELLOW":(255,255,0),"GREEN":(0,255,0)}[st]
-            pygame.draw.circle(self.screen, col, (x, y), 12)
-            label = self.font.render(st, True, FONT_COLOR)
-            self.screen.blit(label, (x-20, y+15))
-
-        # Dibuja vehículos
-        for v in snap["vehicles"]:
-            x, y = v["x"], v["y"]
-            base = color_from_id(v["id"])
-            col  = base if v.get("moving", True) else STOP_COLOR
-            if v["direction"] in ("NORTE","SUR"):
-                w, h = 10, 20
-            else:
-                w, h = 20, 10
-            rect = pygame.Rect(int(x-w/2), int(y-h/2), w, h)
-            pygame.draw.rect(self.screen, col, rect)
+        tl_x, tl_y = f.tl_x[:ntl], f.tl_y[:ntl]
+        visibles = np.flatnonzero(cam.visible(tl_x, tl_y, margen=12))
+        etiquetas = self._etiquetas if z >= 0.75 else None
+        radio = max(2, round(12 * z))
+        sx, sy = cam.to_screen(tl_x[visibles], tl_y[visibles])
+        for px, py, e in zip(sx.astype(np.int32).tolist(), sy.astype(np.int32).tolist(),
+                             f.tl_estado[:ntl][visibles].tolist()):
+            pygame.draw.circle(screen, COLORES_ESTADO[e], (px, py), radio)
+            if etiquetas is not None:
+                screen.blit(etiquetas[e], (px-20, py+15))
+
+        # Dibuja vehículos: esquinas calculadas en bloque y un solo blits()
+        if len(dentro) and not densidad:
+            horiz = f.dir[:n][dentro] >= Direction.ESTE
+            largo, ancho = self._tam_vehiculo()
+            sx, sy = cam.to_screen(x[dentro], y[dentro])
+            ox = (sx - np.where(horiz, largo / 2, ancho / 2)).astype(np.int32)
+            oy = (sy - np.where(horiz, ancho / 2, largo / 2)).astype(np.int32)
+            sh, sv = self._sprites_vehiculos(f)
+            stop_h, stop_v = self._sprite_stop
+            screen.blits([
+                ((sh[i] if m else stop_h) if h else (sv[i] if m else stop_v), (px, py))
+                for i, h, m, px, py in zip(dentro.tolist(), horiz.tolist(),
+                                           f.moving[:n][dentro].tolist(), ox.tolist(), oy.tolist())
+            ], doreturn=False)
 
         # Texto de estadísticas
-        info1 = self.font.render(f"Vehículos: {len(snap['vehicles'])}", True, FONT_COLOR)
-        info2 = self.font.render(f"FPS: {int(self.clock.get_fps())}", True, FPS_COLOR)
-        self.screen.blit(info1, (10, 10))
-        self.screen.blit(info2, (10, 30))
+        estado = "PAUSA" if self.reloj.paused else f"x{self.reloj.warp:g}"
+        screen.blit(self._texto(f"Vehículos: {n}", FONT_COLOR), (10, 10))
+        screen.blit(self._texto(f"FPS: {int(self.clock.get_fps())}", FPS_COLOR), (10, 30))
+        screen.blit(self._texto(f"Sim: {estado}", FPS_COLOR), (10, 50))
+        vista = "densidad" if densidad else f"{len(dentro)} visibles"
+        screen.blit(self._texto(f"Zoom: {z:.2f} ({vista})", FPS_COLOR), (10, 70))
+
+    def _draw_densidad(self, f):
+        """Colorea cada tramo visible según los vehículos que lo ocupan."""
+        tramos = self._tramos_de(f)
+        if not len(tramos.segments):
+            return
+        n = f.n
+        d = tramos.densidad(f.x[:n], f.y[:n], f.dir[:n] >= Direction.ESTE)
+        cam = self.camera
+        seg = tramos.segments
+        x0, y0, x1, y1 = cam.bounds()
+        vis = np.flatnonzero((np.maximum(seg[:, 0], seg[:, 2]) >= x0) & (np.minimum(seg[:, 0], seg[:, 2]) <= x1)
+                             & (np.maximum(seg[:, 1], seg[:, 3]) >= y0) & (np.minimum(seg[:, 1], seg[:, 3]) <= y1))
+        ax, ay = cam.to_screen(seg[vis, 0], seg[vis, 1])
+        bx, by = cam.to_screen(seg[vis, 2], seg[vis, 3])
+        ancho = max(2, round(8 * cam.zoom))
+        for col, a, b, c, e in zip(color_densidad(d[vis], VEH_LARGO).tolist(), ax.tolist(),
+                                   ay.tolist(), bx.tolist(), by.tolist()):
+            pygame.draw.line(self.screen, col, (a, b), (c, e), ancho)
+
+    def fit_camera(self):
+        """Encuadra todo el trazado."""
+        f = self.frames.read()
+        pts = [(i["x"], i["y"]) for i in f.intersections]
+        if pts:
+            xs, ys = zip(*pts)
+            self.camera.fit(min(xs), min(ys), max(xs), max(ys))
+
+    def handle_mouse(self, ev):
+        cam = self.camera
+        if ev.type == pygame.MOUSEWHEEL:
+            mx, my = pygame.mouse.get_pos()
+            cam.zoom_at(ZOOM_PASO ** ev.y, mx, my)
+        elif ev.type == pygame.MOUSEBUTTONDOWN and ev.button in (1, 3):
+            self._arrastrando = True
+        elif ev.type == pygame.MOUSEBUTTONUP and ev.button in (1, 3):
+            self._arrastrando = False
+        elif ev.type == pygame.MOUSEMOTION and self._arrastrando:
+            cam.pan(-ev.rel[0], -ev.rel[1])
+
+    def handle_key(self, key):
+        reloj = self.reloj
+        if key == pygame.K_SPACE:
+            reloj.resume() if reloj.paused else reloj.pause()
+        elif key == pygame.K_n:
+            reloj.step()
+        elif key in (pygame.K_PLUS, pygame.K_KP_PLUS, pygame.K_EQUALS):
+            reloj.set_warp(min(reloj.warp * 2, 64))
+        elif key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            reloj.set_warp(max(reloj.warp / 2, 1 / 8))
+        elif key in (pygame.K_f, pygame.K_HOME):
+            self.fit_camera()
+        elif key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN):
+            dx = {pygame.K_LEFT: -50, pygame.K_RIGHT: 50}.get(key, 0)
+            dy = {pygame.K_UP: -50, pygame.K_DOWN: 50}.get(key, 0)
+            self.camera.pan(dx, dy)
 
     def run(self):
         # Arranca simulación en segundo plano
@@ -150,6 +331,11 @@ class GUISimulation:
             for ev in pygame.event.get():
                 if ev.type == pygame.QUIT:
                     self.running = False
+                elif ev.type == pygame.KEYDOWN:
+                    self.handle_key(ev.key)
+                elif ev.type in (pygame.MOUSEWHEEL, pygame.MOUSEBUTTONDOWN,
+                                 pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION):
+                    self.handle_mouse(ev)
             self.draw()
             pygame.display.flip()
             self.clock.tick(60)
@@ -0,0 +1,179 @@
+# simulacion_trafico/ui/offscreen.py
+"""
+Renderizado sin pantalla a secuencia de imágenes.
+
+La simulación corre a máxima velocidad en el hilo principal y, cada
+`stride` ticks, `GUISimulation.draw` pinta el fotograma en una superficie
+en memoria (driver SDL "dummy", sin servidor gráfico).  Los píxeles se
+copian a bytes y se entregan a un `FrameWriter`, cuyo hilo los codifica
+y escribe a disco; si el disco no da abasto la cola se llena y los
+fotogramas sobrantes se descartan (y se cuentan), de modo que la
+simulación nunca espera a la escritura.
+
+    python -m ui.offscreen escenario_demo.json --ticks 20000 --stride 10 --output frames/
+    python -m ui.offscreen --format raw --output salida.rgb
+
+Formatos:
+  • png: `frame_000000.png`, `frame_000001.png`, …
+  • raw: un único fichero con los fotogramas RGB24 concatenados;
+    se convierte a vídeo con
+    `ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 30 -i salida.rgb out.mp4`
+"""
+
+import argparse
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+import pygame
+
+from ui.gui import GUISimulation, WIDTH, HEIGHT
+
+FORMATOS = ("png", "raw")
+
+
+class FrameWriter:
+    """
+    Hilo de escritura de fotogramas.  `submit()` nunca bloquea salvo con
+    `bloquear=True` (sin pérdidas, p. ej. para generar un vídeo completo).
+    """
+
+    def __init__(self, output, formato="png", size=(WIDTH, HEIGHT), cola=32, bloquear=False):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconocido: {formato!r}")
+        self.output = Path(output)
+        self.formato = formato
+        self.size = size
+        self.bloquear = bloquear
+        self.escritos = 0
+        self.descartados = 0
+        self._cola = queue.Queue(maxsize=cola)
+        self._error = None
+
+        if formato == "png":
+            self.output.mkdir(parents=True, exist_ok=True)
+            self._raw = None
+        else:
+            self.output.parent.mkdir(parents=True, exist_ok=True)
+            self._raw = open(self.output, "wb")
+        self._hilo = threading.Thread(target=self._run, name="frame-writer", daemon=True)
+        self._hilo.start()
+
+    def submit(self, surface):
+        """
+        Copia los píxeles de `surface` y los encola.  Devuelve False si el
+        fotograma se ha descartado por estar la cola llena.
+        """
+        if self._error is not None:
+            raise RuntimeError("FrameWriter detenido por un error") from self._error
+        datos = pygame.image.tobytes(surface, "RGB")
+        try:
+            self._cola.put(datos, block=self.bloquear)
+        except queue.Full:
+            self.descartados += 1
+            return False
+        return True
+
+    def close(self):
+        """Escribe lo pendiente y cierra."""
+        self._cola.put(None)
+        self._hilo.join()
+        if self._raw is not None:
+            self._raw.close()
+        if self._error is not None:
+            raise RuntimeError("Error escribiendo fotogramas") from self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -------------------------------------------------------
+    def _run(self):
+        while True:
+            datos = self._cola.get()
+            if datos is None:
+                break
+            if self._error is not None:
+                continue                    # vaciar la cola sin escribir
+            try:
+                self._escribir(datos)
+                self.escritos += 1
+            except Exception as exc:
+                self._error = exc
+
+    def _escribir(self, datos):
+        if self._raw is not None:
+            self._raw.write(datos)
+        else:
+            img = pygame.image.frombuffer(datos, self.size, "RGB")
+            pygame.image.save(img, str(self.output / f"frame_{self.escritos:06d}.png"))
+
+
+def render_headless(gui, ticks, stride, writer):
+    """
+    Ejecuta `ticks` actualizaciones seguidas y entrega un fotograma a
+    `writer` cada `stride` ticks (y el inicial).  Devuelve un informe.
+    """
+    sim, frames = gui.sim, gui.frames
+    t0 = time.perf_counter()
+    for i in range(ticks + 1):
+        if i:
+            sim.update()
+        if i % stride == 0:
+            frames.publish(sim)
+            gui.draw()
+            writer.submit(gui.screen)
+    segundos = time.perf_counter() - t0
+    return {
+        "ticks": ticks,
+        "segundos": segundos,
+        "fotogramas": ticks // stride + 1,
+        "descartados": writer.descartados,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Renderizado sin pantalla a imágenes")
+    parser.add_argument("escenario", nargs="?", default=None,
+                        help="Fichero JSON del escenario (por defecto, la cuadrícula demo)")
+    parser.add_argument("--ticks", type=int, default=1_000)
+    parser.add_argument("--stride", type=int, default=10, help="Ticks entre fotogramas")
+    parser.add_argument("--output", default="frames")
+    parser.add_argument("--format", choices=FORMATOS, default="png")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--engine", choices=("python", "numpy"), default="python")
+    parser.add_argument("--sin-perdidas", action="store_true",
+                        help="Esperar al disco en lugar de descartar fotogramas")
+    args = parser.parse_args(argv)
+    if args.stride < 1:
+        parser.error("--stride debe ser >= 1")
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    sim = None
+    nombre = "offscreen"
+    if args.escenario:
+        from simulation.scenario import load_scenario, build_simulator
+        cfg = load_scenario(args.escenario)
+        sim = build_simulator(cfg, engine=args.engine, seed=args.seed)
+        nombre = cfg.get("name", nombre)
+    gui = GUISimulation(nombre, sim=sim, headless=True)
+    gui.fit_camera()
+
+    writer = FrameWriter(args.output, args.format, bloquear=args.sin_perdidas)
+    with writer:
+        informe = render_headless(gui, args.ticks, args.stride, writer)
+    pygame.quit()
+
+    print(f"{informe['ticks']} ticks en {informe['segundos']:.3f} s — "
+          f"{writer.escritos} fotogramas escritos, {informe['descartados']} descartados "
+          f"→ {args.output}")
+    if args.format == "raw":
+        print(f"ffmpeg -f rawvideo -pix_fmt rgb24 -s {WIDTH}x{HEIGHT} -r 30 -i {args.output} out.mp4")
+
+
+if __name__ == "__main__":
+    main()